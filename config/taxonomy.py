@@ -139,7 +139,7 @@ FINTECH_SUBSECTORS = {
     'digital_banking': ['neobank', 'digital bank', 'online bank', 'revolut', 'n26', 'chime', 'monzo'],
     'payment_processor': ['payment', 'processor', 'stripe', 'square', 'paypal', 'adyen', 'worldpay'],
     'crypto_exchange': ['crypto', 'cryptocurrency', 'bitcoin', 'ethereum', 'exchange', 'coinbase', 'binance'],
-    'defi': ['defi', 'decentralized finance', 'smart contract', 'uniswap', 'compound'],
+    'defi': ['defi', 'decentralized finance', 'smart contract', 'uniswap', 'compound finance', 'compound protocol'],
     'lending': ['lending', 'loan', 'credit', 'p2p lending', 'lendingclub', 'kabbage'],
     'insurtech': ['insurance', 'insurtech', 'lemonade', 'root insurance'],
     'wealthtech': ['wealth', 'investment', 'robo-advisor', 'betterment', 'wealthfront'],
@@ -51,6 +51,8 @@ def create_navbar():
                                        style={'fontSize': '16px', 'fontWeight': '500'})),
                 dbc.NavItem(dbc.NavLink("📈 Analytics", href="/analytics", id="nav-analytics",
                                        style={'fontSize': '16px', 'fontWeight': '500'})),
+                dbc.NavItem(dbc.NavLink("🔎 Search", href="/search", id="nav-search",
+                                       style={'fontSize': '16px', 'fontWeight': '500'})),
                 dbc.NavItem(dbc.NavLink("🔄 Data Collection", href="/collection", id="nav-collection",
                                        style={'fontSize': '16px', 'fontWeight': '500'})),
             ], navbar=True, className="ms-auto")
@@ -77,8 +79,12 @@ app.layout = html.Div([
     })
 ])
 
+# Bring an existing database up to the current schema before the pages query it
+from src.database.schema import upgrade_database
+upgrade_database('data/threats.db')
+
 # Import page modules
-from pages import overview, mitre, taxonomy, analytics, data_collection
+from pages import overview, mitre, taxonomy, analytics, search, data_collection
 
 # Callback for page routing
 @app.callback(
@@ -92,6 +98,8 @@ def display_page(pathname):
         return taxonomy.layout
     elif pathname == '/analytics':
         return analytics.layout
+    elif pathname == '/search':
+        return search.layout
     elif pathname == '/collection':
         return data_collection.layout
     else:
@@ -4,17 +4,17 @@ Advanced Analytics Page with Export Functions
 from dash import html, callback, Input, Output
 import dash_bootstrap_components as dbc
 import pandas as pd
-import sqlite3
+from src.database.connection import read_connection
+from src.database import dashboard_queries as queries
 from datetime import datetime
 
 COLORS = {'primary': '#004F60', 'accent': '#5FABC5', 'success': '#C5D94D', 'warning': '#FCD24A'}
 
 def get_export_stats():
     """Get stats for export section"""
-    conn = sqlite3.connect('data/threats.db')
-    incidents = pd.read_sql_query('SELECT COUNT(*) as c FROM incidents', conn).iloc[0]['c']
-    mappings = pd.read_sql_query('SELECT COUNT(*) as c FROM mitre_mappings', conn).iloc[0]['c']
-    conn.close()
+    conn = read_connection()
+    incidents = pd.read_sql_query(queries.TOTAL_INCIDENTS, conn).iloc[0]['c']
+    mappings = pd.read_sql_query(queries.TOTAL_MAPPINGS, conn).iloc[0]['c']
     return incidents, mappings
 
 incidents, mappings = get_export_stats()
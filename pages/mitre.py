@@ -5,7 +5,11 @@ from dash import html, dcc
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 import pandas as pd
-import sqlite3
+import numpy as np
+from src.database.connection import read_connection
+from src.database import dashboard_queries as queries
+
+from src.analytics.technique_cooccurrence import TechniqueCooccurrence
 
 COLORS = {
     'white': '#FFFBFF', 'primary': '#004F60', 'dark': '#5B4750', 
@@ -15,13 +19,8 @@ COLORS = {
 
 def create_mitre_heatmap():
     """MITRE ATT&CK heatmap"""
-    conn = sqlite3.connect('data/threats.db')
-    df = pd.read_sql_query('''
-        SELECT tactic_name, technique_id, technique_name, COUNT(*) as count
-        FROM mitre_mappings GROUP BY tactic_name, technique_id, technique_name
-        ORDER BY count DESC LIMIT 20
-    ''', conn)
-    conn.close()
+    conn = read_connection()
+    df = pd.read_sql_query(queries.TECHNIQUE_HEATMAP, conn)
     
     if len(df) == 0:
         return go.Figure()
@@ -46,11 +45,53 @@ def create_mitre_heatmap():
     
     return fig
 
+def create_cooccurrence_heatmap(top_n=15):
+    """Lift of technique pairs seen in the same incidents"""
+    try:
+        result = TechniqueCooccurrence('data/threats.db').compute()
+    except ImportError:
+        return go.Figure()
+    
+    if len(result['techniques']) < 2:
+        return go.Figure()
+    
+    # compute() orders techniques by support, most frequent first
+    techniques = result['techniques'][:top_n]
+    labels = [f"{t}: {(result['names'].get(t) or '')[:25]}" for t in techniques]
+    lift = result['lift'][:top_n, :top_n].copy()
+    counts = result['cooccurrence'][:top_n, :top_n]
+    np.fill_diagonal(lift, np.nan)  # self-pairs
+    
+    fig = go.Figure(data=go.Heatmap(
+        z=lift,
+        x=labels,
+        y=labels,
+        customdata=counts,
+        colorscale='Viridis',
+        colorbar=dict(title="Lift"),
+        hovertemplate="%{y}<br>%{x}<br>Lift: %{z:.2f}<br>Incidents together: %{customdata}<extra></extra>"
+    ))
+    
+    fig.update_layout(
+        title=f"Technique Co-occurrence (Top {len(techniques)} Techniques, Lift)",
+        template='plotly_white',
+        height=650,
+        margin=dict(l=250, r=50, t=50, b=200),
+        yaxis=dict(autorange="reversed")
+    )
+    
+    return fig
+
 layout = dbc.Container([
     html.H2("🎯 MITRE ATT&CK Analysis", style={'color': COLORS['primary'], 'marginTop': '20px', 'marginBottom': '20px'}),
     dbc.Card([
         dbc.CardBody([
             dcc.Graph(figure=create_mitre_heatmap(), config={'displayModeBar': True})
         ])
-    ], style={'boxShadow': '0 1px 3px rgba(0,0,0,0.1)', 'border': 'none', 'borderRadius': '12px'})
+    ], style={'boxShadow': '0 1px 3px rgba(0,0,0,0.1)', 'border': 'none', 'borderRadius': '12px'}),
+    dbc.Card([
+        dbc.CardBody([
+            dcc.Graph(figure=create_cooccurrence_heatmap(), config={'displayModeBar': True})
+        ])
+    ], style={'boxShadow': '0 1px 3px rgba(0,0,0,0.1)', 'border': 'none', 'borderRadius': '12px', 'marginTop': '20px'})
 ], fluid=True, style={'padding': '20px', 'maxWidth': '1400px', 'margin': '0 auto'})
\ No newline at end of file
@@ -6,7 +6,8 @@ from dash import html, dcc
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 import pandas as pd
-import sqlite3
+from src.database.connection import read_connection
+from src.database import dashboard_queries as queries
 from datetime import datetime
 
 # Colors
@@ -24,25 +25,19 @@ COLORS = {
 
 def get_stats():
     """Get summary statistics"""
-    conn = sqlite3.connect('data/threats.db')
+    conn = read_connection()
     
-    total = pd.read_sql_query('SELECT COUNT(*) as c FROM incidents', conn).iloc[0]['c']
-    critical = pd.read_sql_query("SELECT COUNT(*) as c FROM incidents WHERE severity='critical'", conn).iloc[0]['c']
-    classified = pd.read_sql_query('SELECT COUNT(DISTINCT incident_id) as c FROM threat_classifications', conn).iloc[0]['c']
-    mitre = pd.read_sql_query('SELECT COUNT(DISTINCT technique_id) as c FROM mitre_mappings', conn).iloc[0]['c']
+    total = pd.read_sql_query(queries.TOTAL_INCIDENTS, conn).iloc[0]['c']
+    critical = pd.read_sql_query(queries.CRITICAL_INCIDENTS, conn).iloc[0]['c']
+    classified = pd.read_sql_query(queries.CLASSIFIED_INCIDENTS, conn).iloc[0]['c']
+    mitre = pd.read_sql_query(queries.MITRE_TECHNIQUES, conn).iloc[0]['c']
     
-    conn.close()
     return {'total': total, 'critical': critical, 'classified': classified, 'mitre': mitre}
 
 def create_timeline_chart():
     """Compact timeline"""
-    conn = sqlite3.connect('data/threats.db')
-    df = pd.read_sql_query('''
-        SELECT DATE(date_discovered) as date, COUNT(*) as count
-        FROM incidents WHERE date_discovered IS NOT NULL
-        GROUP BY DATE(date_discovered) ORDER BY date
-    ''', conn)
-    conn.close()
+    conn = read_connection()
+    df = pd.read_sql_query(queries.TIMELINE, conn)
     
     if len(df) == 0:
         return go.Figure()
@@ -68,12 +63,8 @@ def create_timeline_chart():
 
 def create_severity_chart():
     """Compact severity breakdown"""
-    conn = sqlite3.connect('data/threats.db')
-    df = pd.read_sql_query('''
-        SELECT severity, COUNT(*) as count FROM incidents 
-        WHERE severity IS NOT NULL GROUP BY severity
-    ''', conn)
-    conn.close()
+    conn = read_connection()
+    df = pd.read_sql_query(queries.SEVERITY_DISTRIBUTION, conn)
     
     if len(df) == 0:
         return go.Figure()
@@ -106,12 +97,8 @@ def create_severity_chart():
 
 def create_threat_types_chart():
     """Compact threat type distribution"""
-    conn = sqlite3.connect('data/threats.db')
-    df = pd.read_sql_query('''
-        SELECT tech_category, COUNT(*) as count FROM threat_classifications
-        WHERE tech_category IS NOT NULL GROUP BY tech_category ORDER BY count DESC LIMIT 5
-    ''', conn)
-    conn.close()
+    conn = read_connection()
+    df = pd.read_sql_query(queries.TOP_TECH_CATEGORIES, conn)
     
     if len(df) == 0:
         return go.Figure()
@@ -137,13 +124,8 @@ def create_threat_types_chart():
 
 def create_mitre_top3():
     """Top 3 MITRE techniques"""
-    conn = sqlite3.connect('data/threats.db')
-    df = pd.read_sql_query('''
-        SELECT technique_id, technique_name, COUNT(DISTINCT incident_id) as count
-        FROM mitre_mappings GROUP BY technique_id, technique_name
-        ORDER BY count DESC LIMIT 3
-    ''', conn)
-    conn.close()
+    conn = read_connection()
+    df = pd.read_sql_query(queries.TOP_TECHNIQUES, conn)
     
     if len(df) == 0:
         return go.Figure()
@@ -0,0 +1,102 @@
+"""
+Incident Search Page
+Full-text search over incident titles and descriptions
+"""
+from dash import html, callback, callback_context, Input, Output, State
+import dash_bootstrap_components as dbc
+from src.database.incident_search import search_incidents, MATCH_START, MATCH_END
+
+COLORS = {
+    'white': '#FFFBFF',
+    'primary': '#004F60',
+    'dark': '#5B4750',
+    'accent': '#5FABC5',
+    'success': '#C5D94D',
+    'warning': '#FCD24A',
+    'light': '#D6DBDE',
+    'secondary': '#A7CCCE',
+    'danger': '#DC3545'
+}
+
+SEVERITY_COLORS = {'critical': 'danger', 'high': 'warning', 'medium': 'info', 'low': 'success'}
+
+PAGE_SIZE = 20
+
+def highlighted(text):
+    """Render search markers as <mark> spans"""
+    parts = []
+    for i, chunk in enumerate((text or '').replace(MATCH_END, MATCH_START).split(MATCH_START)):
+        if chunk:
+            parts.append(html.Mark(chunk) if i % 2 else chunk)
+    return parts
+
+def result_card(result):
+    """One search hit"""
+    severity = result['severity'] or 'unscored'
+    title = highlighted(result['title_highlight'])
+
+    return dbc.Card([
+        dbc.CardBody([
+            html.H6(html.A(title, href=result['source_url'], target="_blank")
+                    if result['source_url'] else title,
+                    style={'color': COLORS['primary'], 'marginBottom': '6px'}),
+            html.Div([
+                dbc.Badge(severity, color=SEVERITY_COLORS.get(severity, 'secondary'), className="me-2"),
+                html.Small(f"{(result['date_discovered'] or '')[:10]} · {result['source_type'] or 'unknown'}",
+                          className="text-muted")
+            ], style={'marginBottom': '6px'}),
+            html.P(highlighted(result['snippet']), style={'color': '#6B7280', 'marginBottom': '0'})
+        ])
+    ], style={'border': 'none', 'borderRadius': '8px', 'marginBottom': '10px',
+             'boxShadow': '0 1px 3px rgba(0,0,0,0.1)'})
+
+layout = dbc.Container([
+    html.H2("🔎 Incident Search", style={'color': COLORS['primary'], 'marginTop': '20px', 'marginBottom': '20px'}),
+
+    dbc.Card([
+        dbc.CardBody([
+            dbc.InputGroup([
+                dbc.Input(id='search-query', type='search', debounce=True,
+                          placeholder='credential stuffing, "card skimming", bank* ...'),
+                dbc.Button("Search", id='search-button', color="primary")
+            ]),
+            html.Small('All words must match. Use "quotes" for exact phrases and * for prefixes.',
+                      className="text-muted")
+        ])
+    ], style={'boxShadow': '0 1px 3px rgba(0,0,0,0.1)', 'border': 'none', 'borderRadius': '12px',
+             'marginBottom': '20px'}),
+
+    html.Div(id='search-summary', className="text-muted", style={'marginBottom': '10px'}),
+    html.Div(id='search-results'),
+    dbc.Pagination(id='search-pagination', max_value=1, active_page=1,
+                   fully_expanded=False, className="justify-content-center mt-3")
+], fluid=True, style={'padding': '20px', 'maxWidth': '1400px', 'margin': '0 auto'})
+
+# A new query starts at page 1; the pagination pages through it
+@callback(
+    [Output('search-summary', 'children'),
+     Output('search-results', 'children'),
+     Output('search-pagination', 'max_value'),
+     Output('search-pagination', 'active_page')],
+    [Input('search-button', 'n_clicks'),
+     Input('search-query', 'n_submit'),
+     Input('search-pagination', 'active_page')],
+    State('search-query', 'value'),
+    prevent_initial_call=True
+)
+def run_search(n_clicks, n_submit, active_page, query):
+    """Search and render one page of results"""
+    triggered = callback_context.triggered[0]['prop_id'] if callback_context.triggered else ''
+    page = (active_page or 1) if triggered.startswith('search-pagination') else 1
+
+    response = search_incidents(query or '', page=page, page_size=PAGE_SIZE)
+
+    if not response['results']:
+        summary = f"No incidents match \"{query}\"" if (query or '').strip() else ""
+        return summary, [], 1, 1
+
+    pages = -(-response['total'] // PAGE_SIZE)
+    first = (page - 1) * PAGE_SIZE + 1
+    summary = f"{first}-{first + len(response['results']) - 1} of {response['total']} incidents"
+
+    return summary, [result_card(result) for result in response['results']], pages, page
@@ -5,7 +5,8 @@ from dash import html, dcc
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 import pandas as pd
-import sqlite3
+from src.database.connection import read_connection
+from src.database import dashboard_queries as queries
 
 COLORS = {
     'primary': '#004F60', 
@@ -16,13 +17,12 @@ COLORS = {
 }
 
 def get_taxonomy_data():
-    conn = sqlite3.connect('data/threats.db')
+    conn = read_connection()
     
-    tech = pd.read_sql_query('SELECT tech_category, COUNT(*) as c FROM threat_classifications WHERE tech_category IS NOT NULL GROUP BY tech_category', conn)
-    human = pd.read_sql_query('SELECT human_category, COUNT(*) as c FROM threat_classifications WHERE human_category IS NOT NULL GROUP BY human_category', conn)
-    proc = pd.read_sql_query('SELECT procedural_category, COUNT(*) as c FROM threat_classifications WHERE procedural_category IS NOT NULL GROUP BY procedural_category', conn)
+    tech = pd.read_sql_query(queries.category_counts('tech'), conn)
+    human = pd.read_sql_query(queries.category_counts('human'), conn)
+    proc = pd.read_sql_query(queries.category_counts('procedural'), conn)
     
-    conn.close()
     return tech, human, proc
 
 def create_dimension_chart(df, title, color):
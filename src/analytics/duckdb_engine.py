@@ -0,0 +1,247 @@
+"""
+DuckDB analytics engine
+Runs analytical queries (whole-table joins, group-bys, exports) in an
+in-process DuckDB over the Parquet snapshot, with vectorized, parallel
+execution instead of SQLite's row-at-a-time loop. SQLite stays the
+system of record and handles every write.
+
+Each snapshot table is exposed as a view of the same name: its Parquet
+files, minus the partitions changed since the snapshot, plus the current
+rows of those partitions and the incidents (and their child rows) added
+since, read from SQLite. Those pending rows are loaded once per snapshot;
+after a commit, a refresh only re-reads the partitions changed since the
+last one and the incidents the enrichers have not all processed yet.
+Queries therefore see current data, except for incidents archived since,
+which a snapshot written with --archive-dir keeps. Dates come back as
+timestamps rather than SQLite's text.
+
+analytics_query() routes through the engine when duckdb is installed and
+a snapshot exists, and otherwise runs the same SQL on SQLite, so routed
+queries stick to SQL both understand. Only ad-hoc analytics use it (the
+view_mitre samples, the command line below): dashboard counters and
+report aggregates read the trigger-maintained rollups, and the CSV
+exports stay on SQLite for its exact rows and date text.
+
+DuckDB's SQLite scanner is not used: the DATE columns hold timestamp
+text, which its declared-type checks reject.
+"""
+try:
+    import duckdb
+except ImportError:  # optional analytics backend
+    duckdb = None
+
+import threading
+import pandas as pd
+import argparse
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.database.connection import connect, read_connection
+from src.database.snapshot_changes import changed_partitions, processed_through
+from src.reports.parquet_snapshot import (ParquetSnapshot, SNAPSHOT_TABLES, DEFAULT_OUTPUT_DIR,
+                                          PARTITION_COLUMNS)
+
+# (db_path, parquet_dir) -> engine
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+class AnalyticsEngine:
+    """In-process DuckDB over the Parquet snapshot and the rows added since"""
+
+    def __init__(self, db_path='data/threats.db', parquet_dir=DEFAULT_OUTPUT_DIR):
+        if duckdb is None:
+            raise ImportError(
+                "The DuckDB analytics engine needs duckdb and pyarrow "
+                "(pip install -r requirements.txt)"
+            )
+
+        self.db_path = db_path
+        self.parquet_dir = parquet_dir
+        self.snapshot = ParquetSnapshot(db_path, parquet_dir)
+        self.duck = duckdb.connect()
+
+        # Own connection: data_version only moves for other connections' commits
+        self._sqlite = connect(db_path, read_only=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._state = None
+
+        # What the pending tables were loaded for (snapshot, SQLite schema
+        # version), the last change number they include, and the last
+        # incidents.id whose later changes the change log records
+        self._loaded = None
+        self._loaded_change = 0
+        self._stable_through = 0
+
+    def _parquet_source(self, table):
+        """read_parquet() over a table's snapshot files, or None if it has none"""
+        table_dir = os.path.join(self.parquet_dir, table)
+        has_files = any(name.endswith('.parquet')
+                        for _, _, names in os.walk(table_dir) for name in names)
+        if not has_files:
+            return None
+
+        pattern = os.path.join(table_dir, '**', '*.parquet').replace("'", "''")
+        hive_types = ', '.join(f"'{column}': VARCHAR" for column in PARTITION_COLUMNS)
+        return (f"read_parquet('{pattern}', hive_partitioning = true, "
+                f"hive_types = {{{hive_types}}}, union_by_name = true)")
+
+    def refresh(self):
+        """
+        Bring the rows added or changed since the snapshot up to date if the database changed
+
+        Cheap when nothing changed: one PRAGMA and a manifest read.
+        """
+        with self._lock:
+            after, last_change, updated = self.snapshot.last_snapshot()
+            data_version = self._sqlite.execute('PRAGMA data_version').fetchone()[0]
+
+            state = (after, last_change, updated, data_version)
+            if state == self._state:
+                return
+
+            # One read transaction, so the pending tables agree
+            self._sqlite.execute('BEGIN')
+            try:
+                loaded = (after, last_change, updated,
+                          self._sqlite.execute('PRAGMA schema_version').fetchone()[0])
+                if loaded == self._loaded:
+                    self._update_pending()
+                else:
+                    self._load_pending(after, last_change)
+                    self._loaded = loaded
+                self._stable_through = max(processed_through(self._sqlite), after)
+            finally:
+                self._sqlite.rollback()
+
+            self._state = state
+
+    def _load_pending(self, after, last_change):
+        """Load the rows past the snapshot and in its changed partitions, and create the views"""
+        current_change, partitions = changed_partitions(self._sqlite, last_change)
+        changes = (last_change, current_change) if partitions else None
+
+        self.duck.execute('''
+            CREATE OR REPLACE TABLE changed_partitions (
+                month VARCHAR, source_type VARCHAR, PRIMARY KEY (month, source_type)
+            )
+        ''')
+        if partitions:
+            self.duck.executemany('INSERT INTO changed_partitions VALUES (?, ?)', partitions)
+
+        for table in SNAPSHOT_TABLES:
+            self.duck.register('pending_rows', self.snapshot.pending_rows(self._sqlite, table, after, changes))
+            self.duck.execute(f'CREATE OR REPLACE TABLE pending_{table} AS SELECT * FROM pending_rows')
+            self.duck.unregister('pending_rows')
+
+            source = self._parquet_source(table)
+            view = f'SELECT * FROM pending_{table}'
+            if source:
+                # Changed partitions come from pending_{table} instead
+                view = f'''
+                    SELECT s.* FROM {source} s
+                    ANTI JOIN changed_partitions c
+                      ON c.month = COALESCE(s.month, '') AND c.source_type = COALESCE(s.source_type, '')
+                    UNION ALL BY NAME {view}
+                '''
+            self.duck.execute(f'CREATE OR REPLACE VIEW {table} AS {view}')
+
+        self._loaded_change = current_change
+
+    def _update_pending(self):
+        """
+        Re-read only the pending rows that may have changed since the last refresh
+
+        Those are the rows of incidents past _stable_through, which the
+        enrichers may have changed without the change log recording it,
+        and the rows of the partitions it recorded since _loaded_change.
+        """
+        current_change, partitions = changed_partitions(self._sqlite, self._loaded_change)
+        changes = (self._loaded_change, current_change) if partitions else None
+
+        self.duck.execute('CREATE OR REPLACE TEMP TABLE new_partitions (month VARCHAR, source_type VARCHAR)')
+        if partitions:
+            self.duck.executemany('INSERT INTO new_partitions VALUES (?, ?)', partitions)
+
+        # Incidents last: the child tables find their rows through pending_incidents
+        for table in reversed(SNAPSHOT_TABLES):
+            self.duck.execute(f'''
+                DELETE FROM pending_{table} p
+                WHERE p.incident_id IN (SELECT incident_id FROM pending_incidents WHERE id > ?)
+                   OR EXISTS (SELECT 1 FROM new_partitions n
+                              WHERE n.month = COALESCE(p.month, '') AND n.source_type = COALESCE(p.source_type, ''))
+            ''', [self._stable_through])
+            self.duck.register('pending_rows', self.snapshot.pending_rows(self._sqlite, table,
+                                                                          self._stable_through, changes))
+            self.duck.execute(f'INSERT INTO pending_{table} SELECT * FROM pending_rows')
+            self.duck.unregister('pending_rows')
+
+        self.duck.execute('INSERT OR IGNORE INTO changed_partitions SELECT * FROM new_partitions')
+        self._loaded_change = current_change
+
+    def query(self, sql, params=None):
+        """Run a query and return a DataFrame"""
+        self.refresh()
+        cursor = self.duck.cursor()  # one per call: DuckDB connections are not thread safe
+        try:
+            return cursor.execute(sql, params or []).df()
+        finally:
+            cursor.close()
+
+
+def engine_for(db_path='data/threats.db', parquet_dir=DEFAULT_OUTPUT_DIR):
+    """
+    Shared engine for a database, or None if DuckDB cannot serve it
+
+    None when duckdb or pyarrow is not installed or no snapshot has been
+    written yet (python src/reports/parquet_snapshot.py).
+    """
+    if duckdb is None or not os.path.exists(os.path.join(parquet_dir, 'manifest.json')):
+        return None
+
+    with _engines_lock:
+        key = (os.path.abspath(db_path), os.path.abspath(parquet_dir))
+        if key not in _engines:
+            try:
+                _engines[key] = AnalyticsEngine(db_path, parquet_dir)
+            except ImportError:
+                return None
+        return _engines[key]
+
+
+def analytics_query(sql, db_path='data/threats.db', params=None, parquet_dir=DEFAULT_OUTPUT_DIR):
+    """
+    Run an analytical query on DuckDB if available, else on SQLite
+
+    The SQL must run unchanged on both (plain joins, aggregates,
+    GROUP_CONCAT, substr, ...; no strftime or DATE()).
+
+    Returns:
+        DataFrame
+    """
+    engine = engine_for(db_path, parquet_dir)
+    if engine is not None:
+        return engine.query(sql, params)
+    return pd.read_sql_query(sql, read_connection(db_path), params=params)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a query on the DuckDB analytics engine")
+    parser.add_argument('sql')
+    parser.add_argument('--db', default='data/threats.db')
+    parser.add_argument('--parquet-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--compare', action='store_true',
+                        help="Also run the query on SQLite and compare timings")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    df = AnalyticsEngine(args.db, args.parquet_dir).query(args.sql)
+    print(df.to_string(index=False, max_rows=40))
+    print(f"\n🦆 DuckDB: {len(df)} rows in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    if args.compare:
+        started = time.perf_counter()
+        df = pd.read_sql_query(args.sql, read_connection(args.db))
+        print(f"🗄️  SQLite: {len(df)} rows in {(time.perf_counter() - started) * 1000:.1f}ms")
@@ -0,0 +1,245 @@
+"""
+MITRE ATT&CK technique co-occurrence
+Builds the incident x technique incidence matrix from mitre_mappings as a
+scipy sparse matrix; one product X^T X gives the co-occurrence counts of
+every technique pair, with per-technique support on the diagonal, from
+which lift and conditional confidence follow element-wise. Results are
+cached per database until the mappings' change counter moves; refreshes
+then only code the mappings added since.
+"""
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # scipy ships with the optional scikit-learn dependency
+    np = None
+
+import argparse
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.database.change_counters import change_count
+from src.database.connection import read_connection
+
+# db_path -> coded mappings and the result computed from them
+_cache = {}
+
+
+class TechniqueCooccurrence:
+    """Co-occurrence and lift of ATT&CK techniques within incidents"""
+
+    def __init__(self, db_path='data/threats.db'):
+        if np is None:
+            raise ImportError(
+                "Technique co-occurrence needs numpy and scipy "
+                "(pip install -r requirements.txt)"
+            )
+
+        self.db_path = db_path
+
+    def compute(self):
+        """
+        Co-occurrence statistics, recomputed only if mappings changed
+
+        Returns:
+            dict with
+                techniques:   technique ids (matrix order, by support)
+                names:        technique id -> name
+                incidents:    number of incidents with any mapping
+                support:      incidents per technique (array)
+                cooccurrence: incidents containing both techniques (matrix)
+                lift:         P(a and b) / (P(a) P(b)) (matrix)
+                confidence:   P(b | a), row a / column b (matrix)
+        """
+        conn = read_connection(self.db_path)
+        try:
+            version = change_count(conn, 'mitre_mappings')
+
+            # Without a counter nothing can tell the cache is stale
+            state = _cache.get(self.db_path) if version is not None else None
+            if state and state['version'] == version:
+                return state['result']
+
+            # One read transaction, so the row count and the rows agree
+            conn.execute('BEGIN')
+            if state is None or not self._append_new_mappings(conn, state):
+                state = self._load_mappings(conn)
+
+            names = dict(conn.execute(
+                'SELECT technique_id, MAX(technique_name) FROM mitre_technique_totals GROUP BY technique_id'
+            ))
+        finally:
+            if conn.in_transaction:
+                conn.rollback()  # end the read transaction
+
+        state['version'] = version
+        state['result'] = self._from_codes(state, names)
+        _cache[self.db_path] = state
+        return state['result']
+
+    def _load_mappings(self, conn):
+        """Code every mapping from scratch"""
+        state = {'incident_index': {}, 'technique_index': {},
+                 'incident_codes': np.zeros(0, dtype=np.int64),
+                 'technique_codes': np.zeros(0, dtype=np.int64),
+                 'max_id': 0, 'rows': 0}
+        self._append_new_mappings(conn, state)
+        return state
+
+    def _append_new_mappings(self, conn, state):
+        """
+        Code the mappings added since the state was built
+
+        Mapping keys are never rewritten (re-mapping an incident upserts
+        confidence and source in place), so only new rows and deletes
+        can change the matrix.
+
+        Returns:
+            False if rows were deleted and the state must be rebuilt
+        """
+        rows = conn.execute(
+            'SELECT id, incident_id, technique_id FROM mitre_mappings WHERE id > ? ORDER BY id',
+            (state['max_id'],)
+        ).fetchall()
+        total = conn.execute('SELECT COUNT(*) FROM mitre_mappings').fetchone()[0]
+        if total != state['rows'] + len(rows):
+            return False
+        if not rows:
+            return True
+
+        incident_index = state['incident_index']
+        technique_index = state['technique_index']
+        mapped = [(incident_id, technique_id) for _, incident_id, technique_id in rows
+                  if technique_id is not None]
+
+        incident_codes = np.fromiter(
+            (incident_index.setdefault(incident_id, len(incident_index)) for incident_id, _ in mapped),
+            dtype=np.int64, count=len(mapped)
+        )
+        technique_codes = np.fromiter(
+            (technique_index.setdefault(technique_id, len(technique_index)) for _, technique_id in mapped),
+            dtype=np.int64, count=len(mapped)
+        )
+
+        state['incident_codes'] = np.concatenate([state['incident_codes'], incident_codes])
+        state['technique_codes'] = np.concatenate([state['technique_codes'], technique_codes])
+        state['max_id'] = rows[-1][0]
+        state['rows'] = total
+        return True
+
+    def _from_codes(self, state, names):
+        """Compute the statistics from the coded mappings"""
+        incident_codes = state['incident_codes']
+        if len(incident_codes) == 0:
+            empty = np.zeros((0, 0))
+            return {'techniques': [], 'names': names, 'incidents': 0,
+                    'support': np.zeros(0, dtype=np.int64),
+                    'cooccurrence': empty, 'lift': empty, 'confidence': empty}
+
+        technique_ids = list(state['technique_index'])
+
+        # Binary incidence matrix: sub-technique rows of the same
+        # technique collapse into a single 1
+        incidence = sparse.csr_matrix(
+            (np.ones(len(incident_codes), dtype=np.int32), (incident_codes, state['technique_codes'])),
+            shape=(len(state['incident_index']), len(technique_ids))
+        )
+        incidence.data[:] = 1
+
+        cooccurrence = (incidence.T @ incidence).toarray()
+        support = cooccurrence.diagonal().copy()
+        incidents = incidence.shape[0]
+
+        # Most frequent techniques first
+        order = np.argsort(-support, kind='stable')
+        cooccurrence = cooccurrence[np.ix_(order, order)]
+        support = support[order]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lift = cooccurrence * incidents / np.outer(support, support)
+            confidence = cooccurrence / support[:, None]
+
+        return {
+            'techniques': [technique_ids[i] for i in order],
+            'names': names,
+            'incidents': incidents,
+            'support': support,
+            'cooccurrence': cooccurrence,
+            'lift': np.nan_to_num(lift),
+            'confidence': np.nan_to_num(confidence)
+        }
+
+    def pairs(self, min_incidents=1):
+        """
+        Technique pairs seen together in at least min_incidents incidents
+
+        Returns:
+            List of dicts, strongest lift first
+        """
+        result = self.compute()
+        techniques = result['techniques']
+        cooccurrence = result['cooccurrence']
+
+        rows, cols = np.nonzero(np.triu(cooccurrence >= min_incidents, k=1))
+
+        pairs = [{
+            'technique_a': techniques[a],
+            'technique_a_name': result['names'].get(techniques[a]),
+            'technique_b': techniques[b],
+            'technique_b_name': result['names'].get(techniques[b]),
+            'incidents_together': int(cooccurrence[a, b]),
+            'incidents_a': int(result['support'][a]),
+            'incidents_b': int(result['support'][b]),
+            'confidence_b_given_a': float(result['confidence'][a, b]),
+            'confidence_a_given_b': float(result['confidence'][b, a]),
+            'lift': float(result['lift'][a, b])
+        } for a, b in zip(rows, cols)]
+
+        pairs.sort(key=lambda pair: (-pair['lift'], -pair['incidents_together']))
+        return pairs
+
+    def export_csv(self, output_file='reports/technique_cooccurrence.csv', min_incidents=1):
+        """Export technique pairs with their co-occurrence statistics"""
+        import csv
+
+        pairs = self.pairs(min_incidents)
+
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=[
+                'technique_a', 'technique_a_name', 'technique_b', 'technique_b_name',
+                'incidents_together', 'incidents_a', 'incidents_b',
+                'confidence_b_given_a', 'confidence_a_given_b', 'lift'
+            ])
+            writer.writeheader()
+            writer.writerows(pairs)
+
+        print(f"✅ Exported {len(pairs)} technique pairs to {output_file}")
+        return output_file
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Technique co-occurrence and lift")
+    parser.add_argument('--db', default='data/threats.db')
+    parser.add_argument('--min-incidents', type=int, default=1,
+                        help="Only pairs seen together at least this often")
+    parser.add_argument('--output', default='reports/technique_cooccurrence.csv')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🔗 MITRE ATT&CK TECHNIQUE CO-OCCURRENCE")
+    print("=" * 60)
+
+    engine = TechniqueCooccurrence(args.db)
+
+    started = time.perf_counter()
+    result = engine.compute()
+    print(f"\n⏱️  {len(result['techniques'])} techniques over {result['incidents']} incidents "
+          f"in {time.perf_counter() - started:.2f}s")
+
+    for pair in engine.pairs(args.min_incidents)[:10]:
+        print(f"  {pair['technique_a']} + {pair['technique_b']}: "
+              f"{pair['incidents_together']} incidents, lift {pair['lift']:.2f}")
+
+    engine.export_csv(args.output, args.min_incidents)
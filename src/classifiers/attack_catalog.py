@@ -0,0 +1,306 @@
+"""
+Offline MITRE ATT&CK catalog
+Loads a local enterprise ATT&CK STIX bundle (enterprise-attack.json from
+https://github.com/mitre/cti) into a compact technique <-> tactic <->
+sub-technique <-> keyword index, cached next to the bundle so later runs
+never re-parse the multi-megabyte file, and matches incident text against
+every technique with one compiled keyword automaton.
+
+Without a bundle the catalog falls back to the curated MITRE_MAPPING.
+"""
+import argparse
+import json
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.taxonomy import MITRE_MAPPING
+from src.classifiers.keyword_matcher import KeywordMatcher
+
+DEFAULT_BUNDLE_PATH = 'data/enterprise-attack.json'
+DEFAULT_CACHE_PATH = 'data/attack_index.json'
+
+# Bumped whenever the cached index layout changes
+INDEX_FORMAT = 1
+
+# Base confidence of techniques without a curated MITRE_MAPPING entry
+DEFAULT_CONFIDENCE = 0.5
+
+# Single-word technique names shorter than this ('At', 'Cron', 'Services')
+# are too generic to match on; multi-word names are always used
+MIN_SINGLE_WORD_KEYWORD = 10
+
+
+def _attack_id(stix_object):
+    """ATT&CK id (T1566, T1566.001, TA0001) of a STIX object, or None"""
+    for reference in stix_object.get('external_references', []):
+        if reference.get('source_name') == 'mitre-attack':
+            return reference.get('external_id')
+    return None
+
+
+def _is_active(stix_object):
+    """False for revoked or deprecated STIX objects"""
+    return not stix_object.get('revoked') and not stix_object.get('x_mitre_deprecated')
+
+
+def _name_keywords(name):
+    """Keywords derived from a technique name"""
+    keyword = name.lower().strip()
+    if ' ' in keyword or len(keyword) >= MIN_SINGLE_WORD_KEYWORD:
+        return [keyword]
+    return []
+
+
+def build_index(bundle):
+    """
+    Build the compact index from a parsed STIX bundle
+
+    Returns:
+        dict with 'tactics' (TA id -> name) and 'techniques'
+        (T id -> name, tactics, parent, keywords)
+    """
+    objects = [obj for obj in bundle.get('objects', []) if _is_active(obj)]
+
+    tactics = {}
+    tactic_ids = {}  # kill chain phase name -> TA id
+    for obj in objects:
+        if obj.get('type') == 'x-mitre-tactic':
+            tactic_id = _attack_id(obj)
+            if tactic_id:
+                tactics[tactic_id] = obj['name']
+                tactic_ids[obj.get('x_mitre_shortname')] = tactic_id
+
+    techniques = {}
+    for obj in objects:
+        if obj.get('type') != 'attack-pattern':
+            continue
+        technique_id = _attack_id(obj)
+        if not technique_id:
+            continue
+
+        technique_tactics = [
+            tactic_ids[phase['phase_name']]
+            for phase in obj.get('kill_chain_phases', [])
+            if phase.get('kill_chain_name') == 'mitre-attack' and phase['phase_name'] in tactic_ids
+        ]
+
+        techniques[technique_id] = {
+            'name': obj['name'],
+            'tactics': technique_tactics,
+            'parent': technique_id.split('.')[0] if '.' in technique_id else None,
+            'keywords': _name_keywords(obj['name'])
+        }
+
+    return {'tactics': tactics, 'techniques': dict(sorted(techniques.items()))}
+
+
+def fallback_index(tactics):
+    """Index of the curated MITRE_MAPPING techniques only"""
+    return {
+        'tactics': dict(tactics),
+        'techniques': {
+            technique_id: {
+                'name': data['name'],
+                'tactics': [data['tactic']],
+                'parent': None,
+                'keywords': []
+            }
+            for technique_id, data in MITRE_MAPPING.items()
+        }
+    }
+
+
+def _bundle_signature(bundle_path):
+    """Size and modification time identifying a bundle version"""
+    stat = os.stat(bundle_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def load_index(bundle_path=DEFAULT_BUNDLE_PATH, cache_path=DEFAULT_CACHE_PATH):
+    """
+    Load the catalog index, re-parsing the bundle only when it changed
+
+    Returns:
+        Index dict, or None if there is no bundle
+    """
+    if not os.path.exists(bundle_path):
+        return None
+
+    signature = _bundle_signature(bundle_path)
+
+    if os.path.exists(cache_path):
+        with open(cache_path, encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('format') == INDEX_FORMAT and cached.get('bundle') == signature:
+            return cached
+
+    started = time.perf_counter()
+    with open(bundle_path, encoding='utf-8') as f:
+        index = build_index(json.load(f))
+    index['format'] = INDEX_FORMAT
+    index['bundle'] = signature
+
+    # Write then rename so a crash never leaves a truncated cache
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+    os.replace(tmp_path, cache_path)
+
+    print(f"🗃️  Indexed ATT&CK bundle: {len(index['techniques'])} techniques, "
+          f"{len(index['tactics'])} tactics in {time.perf_counter() - started:.2f}s")
+
+    return index
+
+
+class AttackCatalog:
+    """ATT&CK techniques and sub-techniques matched with one automaton"""
+
+    def __init__(self, index):
+        """
+        Args:
+            index: dict from load_index(), build_index() or fallback_index()
+        """
+        self.tactics = index['tactics']
+        self.techniques = dict(index['techniques'])
+
+        # Curated techniques missing from the bundle (revoked ids) still match
+        for technique_id, entry in fallback_index(self.tactics)['techniques'].items():
+            self.techniques.setdefault(technique_id, entry)
+
+        # Curated techniques first (their order, keywords and confidence),
+        # then the rest of the catalog in id order
+        self.entry_ids = list(MITRE_MAPPING)
+        self.entry_ids += [technique_id for technique_id in self.techniques
+                           if technique_id not in MITRE_MAPPING]
+
+        entry_keywords = []
+        for technique_id in self.entry_ids:
+            keywords = list(self.techniques[technique_id]['keywords'])
+            if technique_id in MITRE_MAPPING:
+                keywords = MITRE_MAPPING[technique_id]['keywords'] + keywords
+            entry_keywords.append(list(dict.fromkeys(keywords)))
+
+        self.matcher = KeywordMatcher([kw for keywords in entry_keywords for kw in keywords])
+        keyword_ids = {kw: i for i, kw in enumerate(self.matcher.keywords)}
+
+        # Keyword id -> indexes of the entries listing it
+        self._postings = {}
+        for entry_index, keywords in enumerate(entry_keywords):
+            for kw in keywords:
+                self._postings.setdefault(keyword_ids[kw], []).append(entry_index)
+
+    def describe(self, attack_id):
+        """
+        Technique, sub-technique and tactic details of an ATT&CK id
+
+        Returns:
+            dict with technique_id/name, sub_technique_id/name and
+            tactic_id/name (unknown ids keep only the ids)
+        """
+        entry = self.techniques.get(attack_id, {})
+        parent_id = entry.get('parent') or (attack_id.split('.')[0] if '.' in attack_id else None)
+
+        if parent_id:
+            parent = self.techniques.get(parent_id, {})
+            technique_id, technique_name = parent_id, parent.get('name')
+            sub_technique_id, sub_technique_name = attack_id, entry.get('name')
+        else:
+            technique_id, technique_name = attack_id, entry.get('name')
+            sub_technique_id, sub_technique_name = None, None
+
+        # Curated tactic first, then the catalog's; sub-techniques unknown
+        # to the catalog inherit their parent's
+        tactic_id = None
+        for candidate in (attack_id, technique_id):
+            curated = MITRE_MAPPING.get(candidate)
+            tactics = self.techniques.get(candidate, {}).get('tactics')
+            tactic_id = curated['tactic'] if curated else (tactics or [None])[0]
+            if tactic_id:
+                break
+
+        return {
+            'technique_id': technique_id,
+            'technique_name': technique_name,
+            'sub_technique_id': sub_technique_id,
+            'sub_technique_name': sub_technique_name,
+            'tactic_id': tactic_id,
+            'tactic_name': self.tactics.get(tactic_id, 'Unknown')
+        }
+
+    def match(self, text):
+        """
+        Match lowercased incident text against every catalog entry
+
+        Returns:
+            List of matched technique dicts (describe() fields plus
+            confidence and matches), in catalog order
+        """
+        counts = {}
+        for keyword_id in self.matcher.find(text):
+            for entry_index in self._postings[keyword_id]:
+                counts[entry_index] = counts.get(entry_index, 0) + 1
+
+        matched_techniques = []
+        for entry_index in sorted(counts):
+            attack_id = self.entry_ids[entry_index]
+            matches = counts[entry_index]
+            base_confidence = MITRE_MAPPING.get(attack_id, {}).get('confidence', DEFAULT_CONFIDENCE)
+
+            # Calculate confidence based on keyword matches
+            confidence = min(matches * 0.3, 1.0)  # Max out at 1.0
+            confidence = max(confidence, base_confidence * 0.5)  # Use base confidence
+
+            technique = self.describe(attack_id)
+            technique['confidence'] = confidence
+            technique['matches'] = matches
+            matched_techniques.append(technique)
+
+        return matched_techniques
+
+
+# Catalogs built in this process, keyed by bundle and cache path
+_catalogs = {}
+
+
+def load_catalog(bundle_path=DEFAULT_BUNDLE_PATH, cache_path=DEFAULT_CACHE_PATH,
+                 fallback_tactics=None):
+    """
+    Return the ATT&CK catalog, building it once per process
+
+    Args:
+        bundle_path: Local enterprise ATT&CK STIX bundle
+        cache_path: Where the compact index is cached
+        fallback_tactics: TA id -> name used when there is no bundle
+    """
+    key = (bundle_path, cache_path)
+    if key not in _catalogs:
+        index = load_index(bundle_path, cache_path) or fallback_index(fallback_tactics or {})
+        _catalogs[key] = AttackCatalog(index)
+    return _catalogs[key]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index a local ATT&CK STIX bundle")
+    parser.add_argument('--bundle', default=DEFAULT_BUNDLE_PATH,
+                        help=f"Enterprise ATT&CK STIX JSON (default: {DEFAULT_BUNDLE_PATH})")
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help=f"Index cache file (default: {DEFAULT_CACHE_PATH})")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🗃️  MITRE ATT&CK CATALOG")
+    print("=" * 60)
+
+    if not os.path.exists(args.bundle):
+        print(f"\n❌ No bundle at {args.bundle}")
+        print("   Download enterprise-attack/enterprise-attack.json from https://github.com/mitre/cti")
+        sys.exit(1)
+
+    catalog = AttackCatalog(load_index(args.bundle, args.cache))
+    sub_techniques = sum(1 for entry in catalog.techniques.values() if entry['parent'])
+
+    print(f"\n✅ {len(catalog.techniques) - sub_techniques} techniques, "
+          f"{sub_techniques} sub-techniques, {len(catalog.tactics)} tactics, "
+          f"{len(catalog.matcher.keywords)} keywords")
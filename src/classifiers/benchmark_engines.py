@@ -0,0 +1,81 @@
+"""
+Benchmark the keyword and vectorized classification engines
+Classifies synthetic FinTech incident texts built from the taxonomy
+keywords with both engines, checks the labels are identical and
+reports throughput for each batch size.
+"""
+import argparse
+import random
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.taxonomy import TECH_TAXONOMY, HUMAN_TAXONOMY, PROCEDURAL_TAXONOMY
+from src.classifiers.threat_classifier import TAXONOMY_MATCHER, vectorized_engine
+
+FILLER_WORDS = [
+    'the', 'bank', 'customers', 'attackers', 'reported', 'payment', 'platform',
+    'said', 'on', 'monday', 'security', 'researchers', 'financial', 'services',
+    'incident', 'systems', 'users', 'were', 'affected', 'after', 'a', 'new'
+]
+
+
+def synthetic_texts(count, seed=42):
+    """Build lowercased incident texts mixing taxonomy keywords and filler"""
+    keywords = []
+    for taxonomy in (TECH_TAXONOMY, HUMAN_TAXONOMY, PROCEDURAL_TAXONOMY):
+        for data in taxonomy.values():
+            keywords.extend(data['keywords'])
+            for subcat_keywords in data['subcategories'].values():
+                keywords.extend(subcat_keywords)
+
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        words = [rng.choice(keywords) if rng.random() < 0.15 else rng.choice(FILLER_WORDS)
+                 for _ in range(rng.randint(20, 120))]
+        texts.append(' '.join(words))
+    return texts
+
+
+def benchmark(batch_sizes):
+    """Run both engines over each batch size and print a comparison"""
+    engine = vectorized_engine()
+
+    print(f"\n{'BATCH':>10} {'KEYWORD (s)':>12} {'VECTORIZED (s)':>15} {'SPEEDUP':>9} {'LABELS':>8}")
+    print("-" * 60)
+
+    for size in batch_sizes:
+        texts = synthetic_texts(size)
+
+        started = time.perf_counter()
+        keyword_results = [TAXONOMY_MATCHER.score(text) for text in texts]
+        keyword_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        vectorized_results = engine.score_batch(texts)
+        vectorized_seconds = time.perf_counter() - started
+
+        labels_match = keyword_results == vectorized_results
+        speedup = keyword_seconds / vectorized_seconds if vectorized_seconds > 0 else 0.0
+
+        print(f"{size:>10,} {keyword_seconds:>12.2f} {vectorized_seconds:>15.2f} "
+              f"{speedup:>8.2f}x {'✅' if labels_match else '❌':>7}")
+
+        if not labels_match:
+            mismatches = sum(1 for a, b in zip(keyword_results, vectorized_results) if a != b)
+            print(f"  ⚠️  {mismatches} incidents labelled differently")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare keyword and vectorized engines")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000],
+                        help="Batch sizes to benchmark (default: 10000 50000)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⏱️  CLASSIFICATION ENGINE BENCHMARK")
+    print("=" * 60)
+
+    benchmark(args.sizes)
@@ -0,0 +1,328 @@
+"""
+Inverted keyword index for targeted reclassification
+Maps every word token of every incident to the incidents containing it,
+so a taxonomy edit only reclassifies incidents that contain one of the
+added or removed keywords instead of rescanning the whole corpus.
+"""
+from collections import Counter
+import argparse
+import json
+import re
+import sqlite3
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.classifiers.keyword_matcher import incident_text
+from src.classifiers.threat_classifier import (
+    ThreatClassifier, TAXONOMIES, TAXONOMY_FINGERPRINTS, UPDATE_CLASSIFICATION_SQL
+)
+from src.database.connection import write_connection
+from src.database.schema import ensure_schema_upgrades
+from src.database.watermark import get_watermark, set_watermark
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Bound on SQL variables per IN (...) list
+MAX_SQL_VARIABLES = 900
+
+
+def tokenize(text):
+    """Distinct word tokens of lowercased text"""
+    return set(TOKEN_PATTERN.findall(text))
+
+
+def taxonomy_keyword_counts(taxonomy):
+    """Counter of (category, subcategory or None, keyword) entries"""
+    counts = Counter()
+    for category, data in taxonomy.items():
+        for kw in data['keywords']:
+            counts[(category, None, kw)] += 1
+        for subcat, subcat_keywords in data['subcategories'].items():
+            for kw in subcat_keywords:
+                counts[(category, subcat, kw)] += 1
+    return counts
+
+
+def changed_keywords(old_taxonomy, new_taxonomy):
+    """Keywords added to or removed from any category/subcategory"""
+    old_counts = taxonomy_keyword_counts(old_taxonomy)
+    new_counts = taxonomy_keyword_counts(new_taxonomy)
+    difference = (old_counts - new_counts) + (new_counts - old_counts)
+    return {kw for _, _, kw in difference}
+
+
+def _chunks(items, size):
+    """Split a list into lists of at most size items"""
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+class KeywordIndex:
+    """Maintains term -> incident postings and applies taxonomy diffs"""
+
+    # Watermark stage name in processing_watermarks
+    STAGE = 'keyword_index'
+
+    def __init__(self, db_path='data/threats.db'):
+        self.db_path = db_path
+
+    def update(self, chunk_size=1000):
+        """
+        Index incidents added since the last run
+
+        Returns:
+            Number of incidents indexed
+        """
+        with write_connection(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            ensure_schema_upgrades(conn)
+            cursor = conn.cursor()
+
+            watermark = get_watermark(conn, self.STAGE)
+            vocabulary = dict(cursor.execute('SELECT term, term_id FROM index_terms'))
+
+            indexed_count = 0
+
+            while True:
+                incidents = cursor.execute('''
+                    SELECT id, title, description FROM incidents
+                    WHERE id > ? AND canonical_incident_id IS NULL ORDER BY id LIMIT ?
+                ''', (watermark, chunk_size)).fetchall()
+                if not incidents:
+                    break
+
+                postings = []
+                for incident in incidents:
+                    for term in tokenize(incident_text(incident)):
+                        term_id = vocabulary.get(term)
+                        if term_id is None:
+                            cursor.execute('INSERT INTO index_terms (term) VALUES (?)', (term,))
+                            term_id = vocabulary[term] = cursor.lastrowid
+                        postings.append((term_id, incident['id']))
+
+                cursor.executemany(
+                    'INSERT OR IGNORE INTO term_postings (term_id, incident_rowid) VALUES (?, ?)',
+                    postings
+                )
+
+                watermark = incidents[-1]['id']
+                set_watermark(conn, self.STAGE, watermark)
+                conn.commit()
+
+                indexed_count += len(incidents)
+
+            # Sections without a snapshot yet (first run); classifications
+            # fingerprinted under another taxonomy predate the index and
+            # cannot be diffed, so they are reclassified once instead
+            snapshots = self._load_snapshots(conn)
+            unseeded = [dimension for dimension in TAXONOMIES if dimension not in snapshots]
+            outdated = any(conn.execute(f'''
+                SELECT 1 FROM threat_classifications
+                WHERE {dimension}_taxonomy_hash IS NOT ? LIMIT 1
+            ''', (TAXONOMY_FINGERPRINTS[dimension],)).fetchone() for dimension in unseeded)
+
+        print(f"🗂️  Indexed {indexed_count} new incidents ({len(vocabulary)} terms)")
+
+        if unseeded:
+            if outdated:
+                print("⚠️  Classifications predate the keyword index's taxonomy snapshot; "
+                      "reclassifying them once")
+                ThreatClassifier(self.db_path).reclassify_changed()
+            # The taxonomy the index is diffed against from now on
+            with write_connection(self.db_path) as conn:
+                for dimension in unseeded:
+                    self._save_snapshot(conn, dimension, TAXONOMIES[dimension])
+
+        return indexed_count
+
+    def reindex(self, conn, changes):
+        """
+        Replace the postings of incidents whose text was rewritten (does not commit)
+
+        Only the terms that came or went are touched, by primary key.
+
+        Args:
+            changes: (incidents.id, old row, new row) of canonical incidents,
+                     rows with title and description; incidents past the
+                     watermark are left to update()
+        """
+        watermark = get_watermark(conn, self.STAGE)
+        removed, added = [], []
+        for rowid, old, new in changes:
+            if rowid > watermark:
+                continue
+            old_terms, new_terms = tokenize(incident_text(old)), tokenize(incident_text(new))
+            removed.extend((rowid, term) for term in old_terms - new_terms)
+            added.extend((rowid, term) for term in new_terms - old_terms)
+
+        conn.executemany('''
+            DELETE FROM term_postings
+            WHERE incident_rowid = ? AND term_id = (SELECT term_id FROM index_terms WHERE term = ?)
+        ''', removed)
+        conn.executemany('INSERT OR IGNORE INTO index_terms (term) VALUES (?)',
+                         [(term,) for _, term in added])
+        conn.executemany('''
+            INSERT OR IGNORE INTO term_postings (term_id, incident_rowid)
+            SELECT term_id, ? FROM index_terms WHERE term = ?
+        ''', added)
+
+    def candidates(self, conn, keyword):
+        """
+        Incident rowids that may contain keyword as a substring
+
+        Every word piece of the keyword must occur inside some token of
+        the incident, so the answer is the intersection, per piece, of
+        the postings of all vocabulary terms containing that piece.
+        """
+        pieces = sorted(set(TOKEN_PATTERN.findall(keyword)), key=len, reverse=True)
+        if not pieces:
+            return {row[0] for row in conn.execute('SELECT id FROM incidents')}
+
+        result = None
+        for piece in pieces:  # longest (most selective) piece first
+            term_ids = [row[0] for row in conn.execute(
+                'SELECT term_id FROM index_terms WHERE instr(term, ?) > 0', (piece,)
+            )]
+
+            incident_rowids = set()
+            for batch in _chunks(term_ids, MAX_SQL_VARIABLES):
+                placeholders = ','.join('?' * len(batch))
+                incident_rowids.update(row[0] for row in conn.execute(
+                    f'SELECT incident_rowid FROM term_postings WHERE term_id IN ({placeholders})',
+                    batch
+                ))
+
+            result = incident_rowids if result is None else result & incident_rowids
+            if not result:
+                break
+
+        return result
+
+    def apply_taxonomy_changes(self, chunk_size=500):
+        """
+        Reclassify only incidents affected by edits to config/taxonomy.py
+
+        Diffs the current taxonomy against the last applied snapshot,
+        looks up incidents containing any added or removed keyword and
+        reclassifies just those. Every other classification is still
+        valid and only has its taxonomy fingerprint bumped.
+
+        Returns:
+            Number of classifications recomputed
+        """
+        started = time.perf_counter()
+
+        self.update()
+
+        with write_connection(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+
+            snapshots = self._load_snapshots(conn)
+            keywords = set()
+            changed_dimensions = []
+
+            for dimension, taxonomy in TAXONOMIES.items():
+                old_fingerprint, old_taxonomy = snapshots[dimension]
+                if old_fingerprint == TAXONOMY_FINGERPRINTS[dimension]:
+                    continue
+
+                diff = changed_keywords(old_taxonomy, taxonomy)
+                if not diff:
+                    # Only order changed, which can flip ties anywhere
+                    print(f"⚠️  {dimension} taxonomy was reordered; running a full reclassify")
+                    updated = ThreatClassifier(self.db_path).reclassify_changed()
+                    self._save_all_snapshots()
+                    return updated
+
+                keywords |= diff
+                changed_dimensions.append((dimension, old_fingerprint))
+
+            if not changed_dimensions:
+                print("✅ Taxonomy unchanged since last applied; nothing to reclassify")
+                return 0
+
+            print(f"\n🔑 {len(keywords)} keywords changed: {', '.join(sorted(keywords))}")
+
+            affected = set()
+            for keyword in keywords:
+                affected |= self.candidates(conn, keyword)
+
+            print(f"🎯 {len(affected)} candidate incidents")
+
+            classifier = ThreatClassifier(self.db_path)
+            updated_count = 0
+
+            for batch in _chunks(sorted(affected), chunk_size):
+                placeholders = ','.join('?' * len(batch))
+                rows = cursor.execute(f'''
+                    SELECT tc.id AS classification_id,
+                           i.incident_id, i.title, i.description
+                    FROM incidents i
+                    JOIN threat_classifications tc ON tc.incident_id = i.incident_id
+                    WHERE i.id IN ({placeholders})
+                ''', batch).fetchall()
+
+                updates = [new_row[1:] + (row['classification_id'],)
+                           for row, new_row in zip(rows, classifier.classification_rows(rows))]
+                cursor.executemany(UPDATE_CLASSIFICATION_SQL, updates)
+                conn.commit()
+
+                updated_count += len(updates)
+
+            # Unaffected classifications are valid under the new taxonomy
+            for dimension, old_fingerprint in changed_dimensions:
+                cursor.execute(f'''
+                    UPDATE threat_classifications SET {dimension}_taxonomy_hash = ?
+                    WHERE {dimension}_taxonomy_hash = ?
+                ''', (TAXONOMY_FINGERPRINTS[dimension], old_fingerprint))
+
+            for dimension, taxonomy in TAXONOMIES.items():
+                self._save_snapshot(conn, dimension, taxonomy)
+
+        elapsed = time.perf_counter() - started
+        print(f"✅ Reclassified {updated_count} affected incidents in {elapsed:.2f}s")
+
+        return updated_count
+
+    def _load_snapshots(self, conn):
+        """dimension -> (fingerprint, taxonomy) of the last applied taxonomy"""
+        return {
+            row[0]: (row[1], json.loads(row[2]))
+            for row in conn.execute(
+                'SELECT dimension, fingerprint, taxonomy_json FROM taxonomy_snapshots'
+            )
+        }
+
+    def _save_snapshot(self, conn, dimension, taxonomy):
+        """Record a taxonomy section as applied"""
+        conn.execute('''
+            INSERT OR REPLACE INTO taxonomy_snapshots
+                (dimension, fingerprint, taxonomy_json, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (dimension, TAXONOMY_FINGERPRINTS[dimension], json.dumps(taxonomy)))
+
+    def _save_all_snapshots(self):
+        """Record every taxonomy section as applied"""
+        with write_connection(self.db_path) as conn:
+            for dimension, taxonomy in TAXONOMIES.items():
+                self._save_snapshot(conn, dimension, taxonomy)
+            conn.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the inverted keyword index")
+    parser.add_argument('--apply-taxonomy', action='store_true',
+                        help="Reclassify incidents affected by taxonomy edits")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🗂️  KEYWORD INDEX")
+    print("=" * 60)
+
+    index = KeywordIndex()
+    if args.apply_taxonomy:
+        index.apply_taxonomy_changes()
+    else:
+        index.update()
@@ -0,0 +1,260 @@
+"""
+Compiled multi-keyword matching for the taxonomy classifiers
+Builds an Aho-Corasick automaton once so every keyword of every
+taxonomy is found in a single linear scan of the incident text
+"""
+import hashlib
+import json
+
+
+def incident_text(incident):
+    """Combine title and description into the lowercased text we match on"""
+    return f"{incident['title']} {incident['description'] or ''}".lower()
+
+
+def text_hash(text):
+    """Stable hash of the exact text a classifier matched on"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def taxonomy_fingerprint(taxonomy):
+    """
+    Fingerprint a taxonomy section (keywords and their order)
+
+    Order is part of the fingerprint because it decides ties.
+    """
+    encoded = json.dumps(taxonomy, ensure_ascii=False).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+def is_word_char(ch):
+    """Letters, digits and '_': the characters words are made of"""
+    return ch.isalnum() or ch == '_'
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton reporting which keywords occur in a text"""
+
+    def __init__(self, keywords, whole_words=False):
+        # Unique keywords, in first-seen order (index = keyword id)
+        self.keywords = list(dict.fromkeys(keywords))
+
+        # Only report matches not flanked by word characters, so 'rce'
+        # is found in 'rce flaw' but not in 'source'
+        self.whole_words = whole_words
+
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        self._build_trie()
+        self._build_failure_links()
+
+    def _build_trie(self):
+        """Insert every keyword into the goto trie"""
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = next_state
+            self._out[state] = self._out[state] + (keyword_id,)
+
+    def _build_failure_links(self):
+        """Breadth-first pass linking each state to its longest proper suffix"""
+        queue = list(self._goto[0].values())
+        head = 0
+
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+
+                self._fail[next_state] = target
+                # Keywords ending at the suffix state also end here
+                self._out[next_state] = self._out[next_state] + self._out[target]
+
+    def find(self, text):
+        """Return the set of keyword ids occurring in text (as whole words if whole_words)"""
+        if self.whole_words:
+            return self._find_whole_words(text)
+
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+
+        found = set()
+        state = 0
+
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+
+        return found
+
+    def _find_whole_words(self, text):
+        """find() keeping only matches with no word character on either side"""
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        lengths = [len(keyword) for keyword in self.keywords]
+
+        found = set()
+        state = 0
+        last = len(text) - 1
+
+        for position, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state] and (position == last or not is_word_char(text[position + 1])):
+                for keyword_id in out[state]:
+                    start = position - lengths[keyword_id] + 1
+                    if start == 0 or not is_word_char(text[start - 1]):
+                        found.add(keyword_id)
+
+        return found
+
+    def find_keywords(self, text):
+        """Return the set of keywords occurring in text (as whole words if whole_words)"""
+        return {self.keywords[keyword_id] for keyword_id in self.find(text)}
+
+
+class TaxonomyMatcher:
+    """
+    Scores every dimension/category/subcategory of a set of taxonomies
+    from one scan of the text
+
+    Scores are identical to checking `kw in text` per keyword:
+    category keywords count once each, subcategory keywords count double,
+    and the first (category, subcategory) pair with the highest score wins.
+    """
+
+    def __init__(self, taxonomies):
+        """
+        Args:
+            taxonomies: dict of dimension name -> taxonomy dict
+                        (same shape as TECH_TAXONOMY in config/taxonomy.py)
+        """
+        self.dimensions = list(taxonomies)
+
+        all_keywords = []
+        for taxonomy in taxonomies.values():
+            for data in taxonomy.values():
+                all_keywords.extend(data['keywords'])
+                for subcat_keywords in data['subcategories'].values():
+                    all_keywords.extend(subcat_keywords)
+
+        self.matcher = KeywordMatcher(all_keywords)
+        keyword_ids = {kw: i for i, kw in enumerate(self.matcher.keywords)}
+
+        # Per dimension: ordered (category, subcategory) slots plus
+        # keyword id -> [category index] / [slot index] postings
+        self._categories = {}
+        self._slots = {}
+        self._category_postings = {}
+        self._slot_postings = {}
+
+        for dimension, taxonomy in taxonomies.items():
+            categories = list(taxonomy)
+            slots = []
+            category_postings = {}
+            slot_postings = {}
+
+            for cat_index, (category, data) in enumerate(taxonomy.items()):
+                # Duplicate keywords in a list count once per occurrence
+                for kw in data['keywords']:
+                    category_postings.setdefault(keyword_ids[kw], []).append(cat_index)
+
+                for subcat, subcat_keywords in data['subcategories'].items():
+                    slot_index = len(slots)
+                    slots.append((cat_index, category, subcat))
+                    for kw in subcat_keywords:
+                        slot_postings.setdefault(keyword_ids[kw], []).append(slot_index)
+
+            self._categories[dimension] = categories
+            self._slots[dimension] = slots
+            self._category_postings[dimension] = category_postings
+            self._slot_postings[dimension] = slot_postings
+
+    def slots(self, dimension):
+        """Ordered (category index, category, subcategory) slots of a dimension"""
+        return list(self._slots[dimension])
+
+    def slot_weights(self, dimension):
+        """
+        Yield (keyword id, slot index, weight) contributions of a dimension
+
+        A slot's score is the sum of weights of its found keywords: category
+        keywords weigh 1 in every slot of the category, subcategory keywords
+        weigh 2. Repeated triples add up (duplicate keywords in a list).
+        """
+        category_slots = {}
+        for slot_index, (cat_index, _, _) in enumerate(self._slots[dimension]):
+            category_slots.setdefault(cat_index, []).append(slot_index)
+
+        for keyword_id, cat_indexes in self._category_postings[dimension].items():
+            for cat_index in cat_indexes:
+                for slot_index in category_slots.get(cat_index, ()):
+                    yield keyword_id, slot_index, 1
+
+        for keyword_id, slot_indexes in self._slot_postings[dimension].items():
+            for slot_index in slot_indexes:
+                yield keyword_id, slot_index, 2
+
+    def score(self, text):
+        """
+        Classify lowercased text across all dimensions in one scan
+
+        Returns:
+            dict of dimension -> (category, subcategory, confidence)
+        """
+        found = self.matcher.find(text)
+        return {dimension: self.best_match(dimension, found)
+                for dimension in self.dimensions}
+
+    def best_match(self, dimension, found):
+        """Pick the best (category, subcategory) for a set of found keyword ids"""
+        category_scores = [0] * len(self._categories[dimension])
+        slot_scores = [0] * len(self._slots[dimension])
+
+        category_postings = self._category_postings[dimension]
+        slot_postings = self._slot_postings[dimension]
+
+        for keyword_id in found:
+            for cat_index in category_postings.get(keyword_id, ()):
+                category_scores[cat_index] += 1
+            for slot_index in slot_postings.get(keyword_id, ()):
+                slot_scores[slot_index] += 1
+
+        best_category = None
+        best_subcategory = None
+        best_score = 0
+
+        for slot_index, (cat_index, category, subcat) in enumerate(self._slots[dimension]):
+            total_score = category_scores[cat_index] + slot_scores[slot_index] * 2  # Weight subcategory higher
+
+            if total_score > best_score:
+                best_score = total_score
+                best_category = category
+                best_subcategory = subcat
+
+        # Calculate confidence (normalize to 0-1)
+        confidence = min(best_score / 5.0, 1.0) if best_score > 0 else 0.0
+
+        return best_category, best_subcategory, confidence
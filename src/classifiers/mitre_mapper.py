@@ -5,16 +5,51 @@ Based on: MITRE Enhanced Cyber Threat Model for Financial Services (2024)
 """
 import sqlite3
 from datetime import datetime
+import argparse
 import sys
 import os
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-from config.taxonomy import MITRE_MAPPING
+from src.classifiers.attack_catalog import load_catalog
+from src.classifiers.keyword_matcher import incident_text
+from src.database.connection import read_connection, write_connection
+from src.database.schema import ensure_schema_upgrades
+from src.database.watermark import get_watermark, set_watermark
+from src.reports.navigator_layers import build_layer
+
+# Upsert on the (incident_id, technique_id, sub_technique_id) key. A source
+# re-mapping an incident keeps its highest confidence; a second source
+# agreeing on a technique raises it (noisy-OR) and is appended to
+# mapping_source, so every source is merged exactly once.
+INSERT_MAPPING_SQL = '''
+    INSERT INTO mitre_mappings (
+        incident_id, tactic_id, tactic_name,
+        technique_id, technique_name,
+        sub_technique_id, sub_technique_name,
+        confidence, mapping_source, created_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (incident_id, technique_id, COALESCE(sub_technique_id, '')) DO UPDATE SET
+        tactic_id = COALESCE(mitre_mappings.tactic_id, excluded.tactic_id),
+        tactic_name = COALESCE(mitre_mappings.tactic_name, excluded.tactic_name),
+        technique_name = COALESCE(NULLIF(mitre_mappings.technique_name, ''), excluded.technique_name),
+        sub_technique_name = COALESCE(mitre_mappings.sub_technique_name, excluded.sub_technique_name),
+        confidence = CASE
+            WHEN instr('+' || COALESCE(mitre_mappings.mapping_source, '') || '+', '+' || excluded.mapping_source || '+') > 0
+            THEN MAX(mitre_mappings.confidence, excluded.confidence)
+            ELSE 1 - (1 - mitre_mappings.confidence) * (1 - excluded.confidence)
+        END,
+        mapping_source = CASE
+            WHEN instr('+' || COALESCE(mitre_mappings.mapping_source, '') || '+', '+' || excluded.mapping_source || '+') > 0
+            THEN mitre_mappings.mapping_source
+            ELSE COALESCE(mitre_mappings.mapping_source || '+', '') || excluded.mapping_source
+        END
+'''
 
 class MITREMapper:
     """Maps incidents to MITRE ATT&CK techniques"""
     
-    # MITRE ATT&CK Tactics (the "why" of an attack)
+    # MITRE ATT&CK Tactics (the "why" of an attack), used when no
+    # ATT&CK bundle is available (see attack_catalog.py)
     TACTICS = {
         'TA0001': 'Initial Access',
         'TA0002': 'Execution',
@@ -30,36 +65,55 @@ class MITREMapper:
         'TA0040': 'Impact'
     }
     
+    # Watermark stage name in processing_watermarks
+    STAGE = 'mitre_mapping'
+    
+    # New canonical incidents past the stage watermark (a primary-key range scan).
+    # Incidents already mapped by another source (OTX) are mapped too and
+    # re-mapping after a crash is harmless: INSERT_MAPPING_SQL merges.
+    # Workers append "AND id BETWEEN ? AND ?"
+    PENDING_SQL = '''
+        SELECT * FROM incidents
+        WHERE id > ? AND canonical_incident_id IS NULL
+    '''
+    
+    # Statement writing rows_for_incidents() output
+    WRITE_SQL = INSERT_MAPPING_SQL
+    
     def __init__(self, db_path='data/threats.db'):
         self.db_path = db_path
+        self.catalog = load_catalog(fallback_tactics=self.TACTICS)
     
     def map_all_unmapped(self):
         """Map all incidents that haven't been mapped to MITRE yet"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Get unmapped incidents
-        cursor.execute('''
-            SELECT * FROM incidents
-            WHERE incident_id NOT IN (
-                SELECT DISTINCT incident_id FROM mitre_mappings
-            )
-        ''')
-        
-        incidents = cursor.fetchall()
-        print(f"\n🎯 Found {len(incidents)} unmapped incidents")
-        
-        mapped_count = 0
-        total_techniques = 0
-        
-        for incident in incidents:
-            techniques = self.map_incident_to_mitre(incident)
-            if techniques > 0:
-                mapped_count += 1
-                total_techniques += techniques
-        
-        conn.close()
+        with write_connection(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            ensure_schema_upgrades(conn)
+            cursor = conn.cursor()
+            
+            # Get unmapped incidents past the watermark
+            watermark = get_watermark(conn, self.STAGE)
+            cursor.execute(self.PENDING_SQL + ' ORDER BY id', (watermark,))
+            
+            incidents = cursor.fetchall()
+            print(f"\n🎯 Found {len(incidents)} unmapped incidents")
+            
+            mapped_count = 0
+            rows = []
+            
+            for incident in incidents:
+                techniques = self.match_techniques(incident_text(incident))
+                if techniques:
+                    mapped_count += 1
+                    rows.extend(self.mapping_rows(incident['incident_id'], techniques))
+                    self._print_mapping(incident, techniques)
+            
+            # One bulk upsert; incidents with no matching technique are not revisited
+            cursor.executemany(INSERT_MAPPING_SQL, rows)
+            if incidents:
+                set_watermark(conn, self.STAGE, incidents[-1]['id'])
+            conn.commit()
+            total_techniques = len(rows)
         
         print(f"\n✅ Mapped {mapped_count}/{len(incidents)} incidents")
         print(f"📊 Total MITRE techniques identified: {total_techniques}")
@@ -76,90 +130,90 @@ class MITREMapper:
         Returns:
             Number of techniques mapped
         """
-        # Combine title and description for analysis
-        text = f"{incident['title']} {incident['description'] or ''}".lower()
+        techniques = self.match_techniques(incident_text(incident))
         
-        matched_techniques = []
+        # Save to database
+        if techniques:
+            self._save_mappings(incident['incident_id'], techniques)
+            self._print_mapping(incident, techniques)
         
-        # Check each MITRE technique
-        for technique_id, technique_data in MITRE_MAPPING.items():
-            # Count keyword matches
-            matches = sum(1 for keyword in technique_data['keywords'] if keyword in text)
-            
-            if matches > 0:
-                # Calculate confidence based on keyword matches
-                confidence = min(matches * 0.3, 1.0)  # Max out at 1.0
-                confidence = max(confidence, technique_data['confidence'] * 0.5)  # Use base confidence
-                
-                matched_techniques.append({
-                    'technique_id': technique_id,
-                    'technique_name': technique_data['name'],
-                    'tactic_id': technique_data['tactic'],
-                    'tactic_name': self.TACTICS.get(technique_data['tactic'], 'Unknown'),
-                    'confidence': confidence,
-                    'matches': matches
-                })
+        return len(techniques)
+    
+    def _print_mapping(self, incident, techniques):
+        """Print the top matched techniques of an incident"""
+        print(f"\n  📍 {incident['title'][:60]}")
+        for tech in sorted(techniques, key=lambda x: x['confidence'], reverse=True)[:3]:
+            print(f"     → {tech['technique_id']}: {tech['technique_name']} "
+                  f"({tech['tactic_name']}) - Confidence: {tech['confidence']:.2f}")
+    
+    def match_techniques(self, text):
+        """
+        Match lowercased incident text against MITRE ATT&CK techniques
+        and sub-techniques in one scan of the catalog automaton
         
-        # Save to database
-        if matched_techniques:
-            self._save_mappings(incident['incident_id'], matched_techniques)
-            
-            print(f"\n  📍 {incident['title'][:60]}")
-            for tech in sorted(matched_techniques, key=lambda x: x['confidence'], reverse=True)[:3]:
-                print(f"     → {tech['technique_id']}: {tech['technique_name']} "
-                      f"({tech['tactic_name']}) - Confidence: {tech['confidence']:.2f}")
+        Returns:
+            List of matched technique dicts
+        """
+        return self.catalog.match(text)
+    
+    def pending_incidents(self, conn, incidents):
+        """Incidents of a batch to map (all of them, mappings are merged)"""
+        return incidents
+    
+    def rows_for_incidents(self, incidents):
+        """Build the mitre_mappings rows for a batch of incidents (may be empty)"""
+        return self.rows_for_texts(incidents, [incident_text(incident) for incident in incidents])
+    
+    def rows_for_texts(self, incidents, texts):
+        """Same as rows_for_incidents, reusing already normalized incident texts"""
+        rows = []
+        for incident, text in zip(incidents, texts):
+            techniques = self.match_techniques(text)
+            rows.extend(self.mapping_rows(incident['incident_id'], techniques))
+        return rows
+    
+    def mapping_rows(self, incident_id, techniques):
+        """Convert matched techniques into INSERT_MAPPING_SQL rows"""
+        created_at = datetime.now()
         
-        return len(matched_techniques)
+        return [(
+            incident_id,
+            tech['tactic_id'],
+            tech['tactic_name'],
+            tech['technique_id'],
+            tech['technique_name'],
+            tech['sub_technique_id'],
+            tech['sub_technique_name'],
+            tech['confidence'],
+            'automated_keyword',
+            created_at
+        ) for tech in techniques]
     
     def _save_mappings(self, incident_id, techniques):
         """Save MITRE mappings to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        for tech in techniques:
-            try:
-                cursor.execute('''
-                    INSERT INTO mitre_mappings (
-                        incident_id, tactic_id, tactic_name,
-                        technique_id, technique_name, 
-                        confidence, mapping_source, created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    incident_id,
-                    tech['tactic_id'],
-                    tech['tactic_name'],
-                    tech['technique_id'],
-                    tech['technique_name'],
-                    tech['confidence'],
-                    'automated_keyword',
-                    datetime.now()
-                ))
-            except sqlite3.IntegrityError:
-                # Duplicate mapping, skip
-                continue
-        
-        conn.commit()
-        conn.close()
+        with write_connection(self.db_path) as conn:
+            conn.executemany(INSERT_MAPPING_SQL, self.mapping_rows(incident_id, techniques))
+            conn.commit()
     
     def get_attack_matrix_summary(self):
         """Generate ATT&CK matrix summary for visualization"""
-        conn = sqlite3.connect(self.db_path)
+        conn = read_connection(self.db_path)
         cursor = conn.cursor()
         
+        # Trigger-maintained aggregate: O(techniques), not O(mappings)
         cursor.execute('''
             SELECT 
                 tactic_name,
                 technique_id,
                 technique_name,
-                COUNT(*) as incident_count,
-                AVG(confidence) as avg_confidence
-            FROM mitre_mappings
+                SUM(mapping_count) as incident_count,
+                SUM(confidence_sum) / SUM(mapping_count) as avg_confidence
+            FROM mitre_technique_stats
             GROUP BY tactic_name, technique_id, technique_name
             ORDER BY incident_count DESC
         ''')
         
         results = cursor.fetchall()
-        conn.close()
         
         return results
     
@@ -171,65 +225,28 @@ class MITREMapper:
         import json
         import os
         
-        conn = sqlite3.connect(self.db_path)
+        conn = read_connection(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute('''
             SELECT 
                 technique_id,
-                COUNT(*) as count,
-                AVG(confidence) as avg_confidence
-            FROM mitre_mappings
+                SUM(mapping_count) as count,
+                SUM(confidence_sum) / SUM(mapping_count) as avg_confidence
+            FROM mitre_technique_totals
             GROUP BY technique_id
         ''')
         
         techniques = cursor.fetchall()
-        conn.close()
         
-        # Build ATT&CK Navigator layer
-        layer = {
-            "name": "FinTech Threat Taxonomy - Real Incidents",
-            "versions": {
-                "attack": "14",
-                "navigator": "4.9.1",
-                "layer": "4.5"
-            },
-            "domain": "enterprise-attack",
-            "description": f"Real FinTech cyber threats mapped to MITRE ATT&CK (Generated: {datetime.now().strftime('%Y-%m-%d')})",
-            "filters": {
-                "platforms": ["Windows", "Linux", "macOS", "Network", "Cloud"]
-            },
-            "sorting": 0,
-            "layout": {
-                "layout": "side",
-                "aggregateFunction": "average",
-                "showID": True,
-                "showName": True
-            },
-            "hideDisabled": False,
-            "techniques": []
-        }
+        layer = build_layer(
+            "FinTech Threat Taxonomy - Real Incidents",
+            f"Real FinTech cyber threats mapped to MITRE ATT&CK (Generated: {datetime.now().strftime('%Y-%m-%d')})",
+            techniques
+        )
         
-        # Add techniques with scores
-        for tech in techniques:
-            technique_id = tech[0]
-            count = tech[1]
-            confidence = tech[2]
-            
-            # Calculate score (0-100) based on frequency and confidence
-            score = min((count * 10) + (confidence * 50), 100)
-            
-            layer['techniques'].append({
-                "techniqueID": technique_id,
-                "score": score,
-                "color": self._get_color_for_score(score),
-                "comment": f"Incidents: {count}, Avg Confidence: {confidence:.2f}",
-                "enabled": True,
-                "metadata": []
-            })
-        
-        # Ensure reports directory exists
-        os.makedirs('reports', exist_ok=True)
+        # Ensure the output directory exists
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
         
         # Save JSON
         with open(output_file, 'w') as f:
@@ -239,20 +256,14 @@ class MITREMapper:
         print(f"   Import at: https://mitre-attack.github.io/attack-navigator/")
         
         return output_file
-    
-    def _get_color_for_score(self, score):
-        """Get color based on threat score"""
-        if score >= 75:
-            return "#ff0000"  # Red - Critical
-        elif score >= 50:
-            return "#ff6600"  # Orange - High
-        elif score >= 25:
-            return "#ffcc00"  # Yellow - Medium
-        else:
-            return "#00cc00"  # Green - Low
 
 # Run MITRE mapper
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Map unmapped incidents to MITRE ATT&CK")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Score incidents in N worker processes (default: single process)")
+    args = parser.parse_args()
+    
     print("=" * 70)
     print(" MITRE ATT&CK MAPPER FOR FINTECH")
     print("=" * 70)
@@ -260,7 +271,11 @@ if __name__ == "__main__":
     print("Based on: Top 10 techniques targeting financial services (2024)\n")
     
     mapper = MITREMapper()
-    mapper.map_all_unmapped()
+    if args.workers > 0:
+        from src.classifiers.parallel import run_parallel
+        run_parallel('mitre', db_path=mapper.db_path, workers=args.workers)
+    else:
+        mapper.map_all_unmapped()
     
     # Generate summary
     print("\n" + "=" * 70)
@@ -278,6 +293,7 @@ if __name__ == "__main__":
     # Generate ATT&CK Navigator JSON
     print("\n" + "=" * 70)
     mapper.generate_attack_navigator_json()
+    print("   Sliced and weekly diff layers: python src/reports/navigator_layers.py")
     
     print("\n MITRE mapping complete!")
     print("=" * 70)
\ No newline at end of file
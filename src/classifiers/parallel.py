@@ -0,0 +1,170 @@
+"""
+Multi-core classification and MITRE mapping
+Splits pending incidents into rowid ranges, scores each range in a
+worker process and funnels the results back to a single writer
+(the parent process), so SQLite only ever sees one writer.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import math
+import sqlite3
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.database.connection import connect, write_connection
+from src.database.schema import ensure_schema_upgrades
+from src.database.watermark import get_watermark, set_watermark
+
+
+def _stage_class(stage):
+    """Resolve a stage name to its scorer class (imported lazily)"""
+    if stage == 'classify':
+        from src.classifiers.threat_classifier import ThreatClassifier
+        return ThreatClassifier
+    if stage == 'mitre':
+        from src.classifiers.mitre_mapper import MITREMapper
+        return MITREMapper
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+# Per-process scorer, created once by the pool initializer
+_worker = None
+_worker_db_path = None
+
+
+def _init_worker(stage, db_path, scorer_options):
+    """Build the scorer (and its compiled matchers) once per worker process"""
+    global _worker, _worker_db_path
+    _worker = _stage_class(stage)(db_path=db_path, **scorer_options)
+    _worker_db_path = db_path
+
+
+def _read_only_connection(db_path):
+    """Open a read-only connection so workers can never take a write lock"""
+    conn = connect(db_path, read_only=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _score_range(watermark, id_range):
+    """
+    Score every pending incident with first_id <= id <= last_id
+
+    Returns:
+        (incident count, rows to insert)
+    """
+    conn = _read_only_connection(_worker_db_path)
+    incidents = conn.execute(_worker.PENDING_SQL + ' AND id BETWEEN ? AND ?',
+                             (watermark, *id_range)).fetchall()
+    conn.close()
+
+    return len(incidents), _worker.rows_for_incidents(incidents)
+
+
+def pending_id_ranges(conn, pending_sql, watermark, workers, chunk_size=5000):
+    """
+    Split pending incidents into contiguous rowid ranges
+
+    Ranges hold an equal number of pending incidents (at most chunk_size),
+    so gaps in the id sequence do not unbalance the workers.
+    """
+    ids = [row[0] for row in conn.execute(f'SELECT id FROM ({pending_sql}) ORDER BY id',
+                                          (watermark,))]
+
+    if not ids:
+        return []
+
+    size = max(1, min(chunk_size, math.ceil(len(ids) / workers)))
+    return [(ids[start], ids[min(start + size, len(ids)) - 1])
+            for start in range(0, len(ids), size)]
+
+
+def run_parallel(stage, db_path='data/threats.db', workers=None, chunk_size=5000,
+                 **scorer_options):
+    """
+    Score pending incidents for a stage across a process pool
+
+    Args:
+        stage: 'classify' (3-D taxonomy) or 'mitre' (ATT&CK mapping)
+        db_path: Path to SQLite database
+        workers: Number of worker processes (default: CPU count)
+        chunk_size: Maximum incidents per rowid range
+        scorer_options: Extra constructor arguments for the scorer
+                        (e.g. engine='vectorized' for classification)
+
+    Returns:
+        Number of incidents processed
+    """
+    workers = workers or os.cpu_count() or 1
+    scorer_class = _stage_class(stage)
+
+    started = time.perf_counter()
+
+    # The parent is the only writer; workers just read and score
+    with write_connection(db_path) as conn:
+        ensure_schema_upgrades(conn)
+        cursor = conn.cursor()
+
+        watermark = get_watermark(conn, scorer_class.STAGE)
+        ranges = pending_id_ranges(conn, scorer_class.PENDING_SQL, watermark, workers, chunk_size)
+
+        print(f"\n⚙️  {stage}: {len(ranges)} rowid ranges across {workers} workers")
+
+        processed = 0
+        written = 0
+
+        # Ranges finish out of order; the watermark only advances over the
+        # contiguous prefix of finished ranges
+        finished = [False] * len(ranges)
+        next_unfinished = 0
+
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(stage, db_path, scorer_options)) as pool:
+            futures = {pool.submit(_score_range, watermark, id_range): index
+                       for index, id_range in enumerate(ranges)}
+
+            for future in as_completed(futures):
+                count, rows = future.result()
+
+                cursor.executemany(scorer_class.WRITE_SQL, rows)
+
+                finished[futures[future]] = True
+                while next_unfinished < len(ranges) and finished[next_unfinished]:
+                    next_unfinished += 1
+                if next_unfinished:
+                    set_watermark(conn, scorer_class.STAGE, ranges[next_unfinished - 1][1])
+
+                conn.commit()
+
+                processed += count
+                written += len(rows)
+                print(f"  💾 {processed} incidents scored, {written} rows written")
+
+    elapsed = time.perf_counter() - started
+    rate = processed / elapsed if elapsed > 0 else 0.0
+
+    print(f"\n✅ {stage}: processed {processed} incidents in {elapsed:.2f}s "
+          f"({rate:,.0f} rows/sec)")
+
+    return processed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel classification and MITRE mapping")
+    parser.add_argument('stage', choices=['classify', 'mitre', 'all'])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--db', default='data/threats.db')
+    parser.add_argument('--engine', choices=['keyword', 'vectorized'], default='keyword',
+                        help="Classification backend (default: keyword)")
+    args = parser.parse_args()
+
+    if args.stage in ('classify', 'all'):
+        run_parallel('classify', db_path=args.db, workers=args.workers,
+                     chunk_size=args.chunk_size, engine=args.engine)
+    if args.stage in ('mitre', 'all'):
+        run_parallel('mitre', db_path=args.db, workers=args.workers,
+                     chunk_size=args.chunk_size)
@@ -0,0 +1,143 @@
+"""
+Severity scoring engine
+Applies SEVERITY_RULES from config/taxonomy.py (keywords and CVSS
+thresholds) to incidents that arrived without a severity, e.g. RSS news,
+and back-fills incidents.severity in batches.
+"""
+import argparse
+import sqlite3
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.taxonomy import SEVERITY_RULES
+from src.classifiers.keyword_matcher import KeywordMatcher, incident_text
+from src.database.connection import write_connection
+from src.database.schema import ensure_schema_upgrades
+from src.database.watermark import get_watermark, set_watermark
+
+# Severity levels from most to least severe (SEVERITY_RULES order)
+SEVERITY_LEVELS = list(SEVERITY_RULES)
+
+
+class SeverityScorer:
+    """Scores incident severity from keywords and CVSS in one pass"""
+
+    # Watermark stage name in processing_watermarks
+    STAGE = 'severity'
+
+    # New canonical incidents past the stage watermark that still have no severity
+    PENDING_SQL = '''
+        SELECT id, title, description, cvss_score FROM incidents
+        WHERE id > ? AND severity IS NULL AND canonical_incident_id IS NULL
+    '''
+
+    # Never overwrites a severity set by a collector or an analyst
+    UPDATE_SQL = 'UPDATE incidents SET severity = ? WHERE id = ? AND severity IS NULL'
+
+    # Statement writing rows_for_incidents() output
+    WRITE_SQL = UPDATE_SQL
+
+    def __init__(self, db_path='data/threats.db'):
+        self.db_path = db_path
+
+        keywords = [kw for rule in SEVERITY_RULES.values() for kw in rule['keywords']]
+        # Whole words only: 'rce' must not match 'source' or 'force'
+        self.matcher = KeywordMatcher(keywords, whole_words=True)
+
+        # Keyword id -> most severe level it appears in
+        self._keyword_levels = {}
+        for level_index, rule in enumerate(SEVERITY_RULES.values()):
+            for kw in rule['keywords']:
+                keyword_id = self.matcher.keywords.index(kw)
+                self._keyword_levels.setdefault(keyword_id, level_index)
+
+    def score_text(self, text, cvss_score=None):
+        """
+        Severity of lowercased incident text (None if no rule applies)
+
+        The most severe level wins whose keywords occur in the text as
+        whole words or whose cvss_min the CVSS score reaches.
+        """
+        levels = [self._keyword_levels[keyword_id] for keyword_id in self.matcher.find(text)]
+
+        if cvss_score is not None:
+            for level_index, rule in enumerate(SEVERITY_RULES.values()):
+                if cvss_score >= rule['cvss_min']:
+                    levels.append(level_index)
+                    break
+
+        return SEVERITY_LEVELS[min(levels)] if levels else None
+
+    def pending_incidents(self, conn, incidents):
+        """Incidents of a batch that have no severity yet"""
+        return [incident for incident in incidents if incident['severity'] is None]
+
+    def rows_for_incidents(self, incidents):
+        """Build (severity, id) UPDATE rows for incidents a rule applies to"""
+        return self.rows_for_texts(incidents, [incident_text(incident) for incident in incidents])
+
+    def rows_for_texts(self, incidents, texts):
+        """Same as rows_for_incidents, reusing already normalized incident texts"""
+        rows = []
+        for incident, text in zip(incidents, texts):
+            severity = self.score_text(text, incident['cvss_score'])
+            if severity:
+                rows.append((severity, incident['id']))
+        return rows
+
+    def backfill(self, chunk_size=1000):
+        """
+        Score every new incident lacking a severity
+
+        Idempotent: incidents at or below the watermark, or that already
+        have a severity, are never touched again.
+
+        Returns:
+            Number of incidents given a severity
+        """
+        started = time.perf_counter()
+
+        with write_connection(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            ensure_schema_upgrades(conn)
+            cursor = conn.cursor()
+
+            watermark = get_watermark(conn, self.STAGE)
+            scored_count = 0
+            checked_count = 0
+
+            while True:
+                incidents = cursor.execute(self.PENDING_SQL + ' ORDER BY id LIMIT ?',
+                                           (watermark, chunk_size)).fetchall()
+                if not incidents:
+                    break
+
+                rows = self.rows_for_incidents(incidents)
+                cursor.executemany(self.UPDATE_SQL, rows)
+
+                watermark = incidents[-1]['id']
+                set_watermark(conn, self.STAGE, watermark)
+                conn.commit()
+
+                checked_count += len(incidents)
+                scored_count += len(rows)
+
+        elapsed = time.perf_counter() - started
+        print(f"⚠️  Severity: scored {scored_count}/{checked_count} incidents "
+              f"without severity in {elapsed:.2f}s")
+
+        return scored_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Back-fill incident severity")
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⚠️  SEVERITY SCORING - SEVERITY_RULES")
+    print("=" * 60)
+
+    SeverityScorer().backfill(chunk_size=args.chunk_size)
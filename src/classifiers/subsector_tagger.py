@@ -0,0 +1,146 @@
+"""
+FinTech subsector tagging
+Matches incidents against the FINTECH_SUBSECTORS keywords in
+config/taxonomy.py and back-fills incidents.subsector in batches.
+"""
+import argparse
+import sqlite3
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config.taxonomy import FINTECH_SUBSECTORS
+from src.classifiers.keyword_matcher import KeywordMatcher, incident_text
+from src.database.connection import write_connection
+from src.database.schema import ensure_schema_upgrades
+from src.database.watermark import get_watermark, set_watermark
+
+
+class SubsectorTagger:
+    """Tags incidents with the FinTech subsector their text points to"""
+
+    # Watermark stage name in processing_watermarks
+    STAGE = 'subsector'
+
+    # New canonical incidents past the stage watermark that still have no subsector
+    PENDING_SQL = '''
+        SELECT id, title, description FROM incidents
+        WHERE id > ? AND subsector IS NULL AND canonical_incident_id IS NULL
+    '''
+
+    # Never overwrites a subsector set by a collector or an analyst
+    UPDATE_SQL = 'UPDATE incidents SET subsector = ? WHERE id = ? AND subsector IS NULL'
+
+    # Statement writing rows_for_incidents() output
+    WRITE_SQL = UPDATE_SQL
+
+    def __init__(self, db_path='data/threats.db'):
+        self.db_path = db_path
+        self.subsectors = list(FINTECH_SUBSECTORS)
+
+        keywords = [kw for subsector_keywords in FINTECH_SUBSECTORS.values()
+                    for kw in subsector_keywords]
+        # Whole words only: 'defi' must not match 'define'
+        self.matcher = KeywordMatcher(keywords, whole_words=True)
+
+        # Keyword id -> subsector indexes listing it
+        self._keyword_subsectors = {}
+        for subsector_index, subsector_keywords in enumerate(FINTECH_SUBSECTORS.values()):
+            for kw in subsector_keywords:
+                keyword_id = self.matcher.keywords.index(kw)
+                self._keyword_subsectors.setdefault(keyword_id, set()).add(subsector_index)
+
+    def tag_text(self, text):
+        """
+        Subsector of lowercased incident text (None if no keyword matches)
+
+        Keywords match as whole words. The subsector with the most
+        distinct keyword matches wins. Ties go to the subsector with the
+        longest (most specific) matched keyword, then to the first one in
+        FINTECH_SUBSECTORS order.
+        """
+        hits = {}
+        for keyword_id in self.matcher.find(text):
+            keyword_length = len(self.matcher.keywords[keyword_id])
+            for subsector_index in self._keyword_subsectors[keyword_id]:
+                count, longest = hits.get(subsector_index, (0, 0))
+                hits[subsector_index] = (count + 1, max(longest, keyword_length))
+
+        if not hits:
+            return None
+
+        best = min(hits, key=lambda index: (-hits[index][0], -hits[index][1], index))
+        return self.subsectors[best]
+
+    def pending_incidents(self, conn, incidents):
+        """Incidents of a batch that have no subsector yet"""
+        return [incident for incident in incidents if incident['subsector'] is None]
+
+    def rows_for_incidents(self, incidents):
+        """Build (subsector, id) UPDATE rows for incidents with a match"""
+        return self.rows_for_texts(incidents, [incident_text(incident) for incident in incidents])
+
+    def rows_for_texts(self, incidents, texts):
+        """Same as rows_for_incidents, reusing already normalized incident texts"""
+        rows = []
+        for incident, text in zip(incidents, texts):
+            subsector = self.tag_text(text)
+            if subsector:
+                rows.append((subsector, incident['id']))
+        return rows
+
+    def backfill(self, chunk_size=1000):
+        """
+        Tag every new incident lacking a subsector
+
+        Idempotent: incidents at or below the watermark, or that already
+        have a subsector, are never touched again.
+
+        Returns:
+            Number of incidents given a subsector
+        """
+        started = time.perf_counter()
+
+        with write_connection(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            ensure_schema_upgrades(conn)
+            cursor = conn.cursor()
+
+            watermark = get_watermark(conn, self.STAGE)
+            tagged_count = 0
+            checked_count = 0
+
+            while True:
+                incidents = cursor.execute(self.PENDING_SQL + ' ORDER BY id LIMIT ?',
+                                           (watermark, chunk_size)).fetchall()
+                if not incidents:
+                    break
+
+                rows = self.rows_for_incidents(incidents)
+                cursor.executemany(self.UPDATE_SQL, rows)
+
+                watermark = incidents[-1]['id']
+                set_watermark(conn, self.STAGE, watermark)
+                conn.commit()
+
+                checked_count += len(incidents)
+                tagged_count += len(rows)
+
+        elapsed = time.perf_counter() - started
+        print(f"🏦 Subsector: tagged {tagged_count}/{checked_count} incidents "
+              f"without subsector in {elapsed:.2f}s")
+
+        return tagged_count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Back-fill FinTech subsectors")
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🏦 SUBSECTOR TAGGING - FINTECH_SUBSECTORS")
+    print("=" * 60)
+
+    SubsectorTagger().backfill(chunk_size=args.chunk_size)
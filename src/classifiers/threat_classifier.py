@@ -4,6 +4,8 @@ Implements the 3-dimensional taxonomy from research
 """
 import sqlite3
 from datetime import datetime
+import argparse
+import time
 import sys
 import os
 
@@ -13,177 +15,396 @@ from config.taxonomy import (
     TECH_TAXONOMY, HUMAN_TAXONOMY, PROCEDURAL_TAXONOMY,
     FINTECH_SUBSECTORS, MITRE_MAPPING, SEVERITY_RULES
 )
+from src.classifiers.keyword_matcher import (
+    TaxonomyMatcher, incident_text, text_hash, taxonomy_fingerprint
+)
+from src.database.connection import write_connection
+from src.database.schema import ensure_schema_upgrades
+from src.database.watermark import get_watermark, set_watermark, incident_ids_with_rows
+
+# The three taxonomy dimensions, keyed as in threat_classifications columns
+TAXONOMIES = {
+    'tech': TECH_TAXONOMY,
+    'human': HUMAN_TAXONOMY,
+    'procedural': PROCEDURAL_TAXONOMY
+}
+
+# Compiled once per process from the three taxonomy dimensions
+TAXONOMY_MATCHER = TaxonomyMatcher(TAXONOMIES)
+
+# Version of each taxonomy section, stored with every classification
+TAXONOMY_FINGERPRINTS = {
+    dimension: taxonomy_fingerprint(taxonomy)
+    for dimension, taxonomy in TAXONOMIES.items()
+}
+
+_vectorized_engine = None
+
+def vectorized_engine():
+    """Build the sparse-matrix engine on first use (needs scipy)"""
+    global _vectorized_engine
+    if _vectorized_engine is None:
+        from src.classifiers.vectorized_engine import VectorizedEngine
+        _vectorized_engine = VectorizedEngine(TAXONOMIES)
+    return _vectorized_engine
+
+INSERT_CLASSIFICATION_SQL = '''
+    INSERT INTO threat_classifications (
+        incident_id, tech_category, tech_subcategory,
+        human_category, human_subcategory,
+        procedural_category, procedural_subcategory,
+        classification_method, confidence_score,
+        text_hash, tech_taxonomy_hash,
+        human_taxonomy_hash, procedural_taxonomy_hash
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Same values as INSERT_CLASSIFICATION_SQL minus incident_id, plus row id
+UPDATE_CLASSIFICATION_SQL = '''
+    UPDATE threat_classifications SET
+        tech_category = ?, tech_subcategory = ?,
+        human_category = ?, human_subcategory = ?,
+        procedural_category = ?, procedural_subcategory = ?,
+        classification_method = ?, confidence_score = ?,
+        text_hash = ?, tech_taxonomy_hash = ?,
+        human_taxonomy_hash = ?, procedural_taxonomy_hash = ?,
+        classified_at = CURRENT_TIMESTAMP
+    WHERE id = ?
+'''
 
 class ThreatClassifier:
     """Classifies cyber threats using multi-dimensional taxonomy"""
     
-    def __init__(self, db_path='data/threats.db'):
+    # Watermark stage name in processing_watermarks
+    STAGE = 'classification'
+    
+    # New canonical incidents past the stage watermark (a primary-key range scan);
+    # NOT EXISTS is an indexed probe guarding against double-classification
+    # on first run or after a crash. Workers append "AND id BETWEEN ? AND ?"
+    PENDING_SQL = '''
+        SELECT * FROM incidents
+        WHERE id > ? AND canonical_incident_id IS NULL
+        AND NOT EXISTS (
+            SELECT 1 FROM threat_classifications tc
+            WHERE tc.incident_id = incidents.incident_id
+        )
+    '''
+    
+    # Statement writing rows_for_incidents() output
+    WRITE_SQL = INSERT_CLASSIFICATION_SQL
+    
+    # Selectable scoring backends (labels are identical)
+    ENGINES = ('keyword', 'vectorized')
+    
+    def __init__(self, db_path='data/threats.db', engine='keyword'):
+        """
+        Args:
+            db_path: Path to SQLite database
+            engine: 'keyword' (compiled automaton, per incident) or
+                    'vectorized' (scipy sparse matrices, per batch)
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {self.ENGINES}")
+        
         self.db_path = db_path
+        self.engine = engine
     
     def classify_all_unclassified(self):
         """Classify all incidents that haven't been classified yet"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Get unclassified incidents
-        cursor.execute('''
-            SELECT * FROM incidents
-            WHERE incident_id NOT IN (
-                SELECT DISTINCT incident_id FROM threat_classifications
-            )
-        ''')
-        
-        incidents = cursor.fetchall()
-        print(f"\n🔍 Found {len(incidents)} unclassified incidents")
-        
-        classified_count = 0
-        for incident in incidents:
-            if self.classify_incident(incident):
-                classified_count += 1
-        
-        conn.close()
+        with write_connection(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            ensure_schema_upgrades(conn)
+            cursor = conn.cursor()
+            
+            # Get unclassified incidents past the watermark
+            watermark = get_watermark(conn, self.STAGE)
+            cursor.execute(self.PENDING_SQL + ' ORDER BY id', (watermark,))
+            
+            incidents = cursor.fetchall()
+            print(f"\n🔍 Found {len(incidents)} unclassified incidents")
+            
+            # PENDING_SQL only returns incidents without a classification
+            for incident in incidents:
+                self.classify_incident(conn, incident)
+            classified_count = len(incidents)
+            
+            if incidents:
+                set_watermark(conn, self.STAGE, incidents[-1]['id'])
+                conn.commit()
+        
         print(f"\n✅ Classified {classified_count}/{len(incidents)} incidents")
         
         return classified_count
     
-    def classify_incident(self, incident):
+    def classify_batch(self, chunk_size=500, verbose=False):
         """
-        Classify a single incident across all 3 dimensions
+        Classify the unclassified backlog in chunks
+        
+        Streams unclassified incidents with fetchmany, classifies a chunk
+        in memory and writes it with one executemany and one commit.
         
         Args:
-            incident: sqlite3.Row object with incident data
+            chunk_size: Incidents classified and committed per transaction
+            verbose: Print every classification instead of per-chunk progress
+            
+        Returns:
+            Number of incidents classified
         """
-        # Combine title and description for analysis
-        text = f"{incident['title']} {incident['description'] or ''}".lower()
+        started = time.perf_counter()
         
-        # Dimension 1: Technology-based threats
-        tech_cat, tech_subcat, tech_confidence = self._classify_technology(text)
+        with write_connection(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            ensure_schema_upgrades(conn)
+            read_cursor = conn.cursor()
+            write_cursor = conn.cursor()
+            
+            watermark = get_watermark(conn, self.STAGE)
+            read_cursor.execute(self.PENDING_SQL + ' ORDER BY id', (watermark,))
+            
+            print(f"\n🔍 Classifying unclassified incidents in chunks of {chunk_size}")
+            
+            classified_count = 0
+            
+            while True:
+                incidents = read_cursor.fetchmany(chunk_size)
+                if not incidents:
+                    break
+                
+                rows = self.classification_rows(incidents)
+                
+                write_cursor.executemany(INSERT_CLASSIFICATION_SQL, rows)
+                set_watermark(conn, self.STAGE, incidents[-1]['id'])
+                conn.commit()
+                
+                classified_count += len(rows)
+                
+                if verbose:
+                    for incident, row in zip(incidents, rows):
+                        self._print_classification(incident, row)
+                else:
+                    print(f"  💾 Committed {classified_count} classifications")
         
-        # Dimension 2: Human-originated threats
-        human_cat, human_subcat, human_confidence = self._classify_human(text)
+        elapsed = time.perf_counter() - started
+        rate = classified_count / elapsed if elapsed > 0 else 0.0
         
-        # Dimension 3: Procedural threats
-        proc_cat, proc_subcat, proc_confidence = self._classify_procedural(text)
+        print(f"\n✅ Classified {classified_count} incidents in {elapsed:.2f}s "
+              f"({rate:,.0f} rows/sec)")
         
-        # Determine overall confidence
-        avg_confidence = (tech_confidence + human_confidence + proc_confidence) / 3
+        return classified_count
+    
+    def reclassify_changed(self, chunk_size=1000):
+        """
+        Re-run classification only where its inputs changed
         
-        # Save classification
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('''
-                INSERT INTO threat_classifications (
-                    incident_id, tech_category, tech_subcategory,
-                    human_category, human_subcategory,
-                    procedural_category, procedural_subcategory,
-                    classification_method, confidence_score
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                incident['incident_id'],
-                tech_cat, tech_subcat,
-                human_cat, human_subcat,
-                proc_cat, proc_subcat,
-                'automated',
-                avg_confidence
-            ))
-            
-            conn.commit()
-            
-            print(f"  ✅ {incident['title'][:50]}...")
-            print(f"     Tech: {tech_cat}/{tech_subcat}")
-            print(f"     Human: {human_cat}/{human_subcat}")
-            print(f"     Proc: {proc_cat}/{proc_subcat}")
-            print(f"     Confidence: {avg_confidence:.2f}")
+        A classification is recomputed when the incident text no longer
+        matches its text_hash, or when the fingerprint of any taxonomy
+        section differs from the one stored with it. Unchanged rows are
+        skipped without being scored.
+        
+        Returns:
+            Number of classifications updated
+        """
+        started = time.perf_counter()
+        
+        with write_connection(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            ensure_schema_upgrades(conn)
+            cursor = conn.cursor()
             
-            return True
+            print(f"\n🔁 Checking classifications against taxonomy "
+                  f"tech={TAXONOMY_FINGERPRINTS['tech']} "
+                  f"human={TAXONOMY_FINGERPRINTS['human']} "
+                  f"procedural={TAXONOMY_FINGERPRINTS['procedural']}")
             
-        except sqlite3.IntegrityError:
-            print(f"  ⏭️  Already classified: {incident['title'][:50]}")
-            return False
-        
-        finally:
-            conn.close()
-    
-    def _classify_technology(self, text):
-        """Classify technology-based threat dimension"""
-        best_category = None
-        best_subcategory = None
-        best_score = 0
-        
-        for category, data in TECH_TAXONOMY.items():
-            # Check main keywords
-            category_score = sum(1 for kw in data['keywords'] if kw in text)
+            checked_count = 0
+            updated_count = 0
+            last_id = 0
             
-            # Check subcategories
-            for subcat, subcat_keywords in data['subcategories'].items():
-                subcat_score = sum(1 for kw in subcat_keywords if kw in text)
-                total_score = category_score + subcat_score * 2  # Weight subcategory higher
+            # Keyset pages over threat_classifications, so updates never touch
+            # the rows an open statement is still reading
+            while True:
+                rows = cursor.execute('''
+                    SELECT tc.id AS classification_id, tc.text_hash,
+                           tc.tech_taxonomy_hash, tc.human_taxonomy_hash,
+                           tc.procedural_taxonomy_hash,
+                           i.incident_id, i.title, i.description
+                    FROM threat_classifications tc
+                    JOIN incidents i ON i.incident_id = tc.incident_id
+                    WHERE tc.id > ?
+                    ORDER BY tc.id
+                    LIMIT ?
+                ''', (last_id, chunk_size)).fetchall()
+                if not rows:
+                    break
+                checked_count += len(rows)
+                last_id = rows[-1]['classification_id']
                 
-                if total_score > best_score:
-                    best_score = total_score
-                    best_category = category
-                    best_subcategory = subcat
+                stale = [row for row in rows if self._is_stale(row)]
+                if not stale:
+                    continue
+                
+                updates = [new_row[1:] + (row['classification_id'],)
+                           for row, new_row in zip(stale, self.classification_rows(stale))]
+                
+                cursor.executemany(UPDATE_CLASSIFICATION_SQL, updates)
+                conn.commit()
+                
+                updated_count += len(updates)
+                print(f"  💾 Reclassified {updated_count} of {checked_count} checked")
         
-        # Calculate confidence (normalize to 0-1)
-        confidence = min(best_score / 5.0, 1.0) if best_score > 0 else 0.0
+        elapsed = time.perf_counter() - started
+        print(f"\n✅ Reclassified {updated_count}/{checked_count} incidents in {elapsed:.2f}s "
+              f"({checked_count - updated_count} unchanged, skipped)")
         
-        return best_category, best_subcategory, confidence
+        return updated_count
     
-    def _classify_human(self, text):
-        """Classify human-originated threat dimension"""
-        best_category = None
-        best_subcategory = None
-        best_score = 0
+    def _is_stale(self, row):
+        """True if a stored classification's text or taxonomy inputs changed"""
+        return (
+            row['tech_taxonomy_hash'] != TAXONOMY_FINGERPRINTS['tech']
+            or row['human_taxonomy_hash'] != TAXONOMY_FINGERPRINTS['human']
+            or row['procedural_taxonomy_hash'] != TAXONOMY_FINGERPRINTS['procedural']
+            or row['text_hash'] != text_hash(incident_text(row))
+        )
+    
+    def classify_incident(self, conn, incident):
+        """
+        Classify a single incident across all 3 dimensions
         
-        for category, data in HUMAN_TAXONOMY.items():
-            category_score = sum(1 for kw in data['keywords'] if kw in text)
+        Args:
+            conn: Caller's write connection; the row is committed with
+                  the caller's transaction
+            incident: sqlite3.Row object with incident data
             
-            for subcat, subcat_keywords in data['subcategories'].items():
-                subcat_score = sum(1 for kw in subcat_keywords if kw in text)
-                total_score = category_score + subcat_score * 2
-                
-                if total_score > best_score:
-                    best_score = total_score
-                    best_category = category
-                    best_subcategory = subcat
+        Returns:
+            The INSERT_CLASSIFICATION_SQL row written
+        """
+        row = self.classification_row(incident)
         
-        confidence = min(best_score / 5.0, 1.0) if best_score > 0 else 0.0
+        # Save classification
+        conn.execute(INSERT_CLASSIFICATION_SQL, row)
+        self._print_classification(incident, row)
         
-        return best_category, best_subcategory, confidence
+        return row
+    
+    def pending_incidents(self, conn, incidents):
+        """Incidents of a batch that have no classification yet"""
+        done = incident_ids_with_rows(conn, 'threat_classifications',
+                                      (incident['incident_id'] for incident in incidents))
+        return [incident for incident in incidents if incident['incident_id'] not in done]
+    
+    def rows_for_incidents(self, incidents):
+        """Build the threat_classifications rows for a batch of incidents"""
+        return self.classification_rows(incidents)
     
-    def _classify_procedural(self, text):
-        """Classify procedural threat dimension"""
-        best_category = None
-        best_subcategory = None
-        best_score = 0
+    def rows_for_texts(self, incidents, texts):
+        """Same as rows_for_incidents, reusing already normalized incident texts"""
+        return self.classification_rows(incidents, texts)
+    
+    def classification_row(self, incident):
+        """
+        Build the threat_classifications row for an incident
         
-        for category, data in PROCEDURAL_TAXONOMY.items():
-            category_score = sum(1 for kw in data['keywords'] if kw in text)
+        Args:
+            incident: sqlite3.Row object with incident data
             
-            for subcat, subcat_keywords in data['subcategories'].items():
-                subcat_score = sum(1 for kw in subcat_keywords if kw in text)
-                total_score = category_score + subcat_score * 2
-                
-                if total_score > best_score:
-                    best_score = total_score
-                    best_category = category
-                    best_subcategory = subcat
+        Returns:
+            Tuple of values in INSERT_CLASSIFICATION_SQL order
+        """
+        return self.classification_rows([incident])[0]
+    
+    def classification_rows(self, incidents, texts=None):
+        """
+        Build threat_classifications rows for a batch of incidents
+        with the selected engine
+        """
+        # Combine title and description for analysis
+        if texts is None:
+            texts = [incident_text(incident) for incident in incidents]
+        
+        if self.engine == 'vectorized':
+            results = vectorized_engine().score_batch(texts)
+        else:
+            results = [TAXONOMY_MATCHER.score(text) for text in texts]
+        
+        return [self._row_from_scores(incident, scores, text)
+                for incident, scores, text in zip(incidents, results, texts)]
+    
+    def _row_from_scores(self, incident, scores, text):
+        """Convert per-dimension scores into an INSERT_CLASSIFICATION_SQL row"""
+        tech_cat, tech_subcat, tech_confidence = scores['tech']
+        human_cat, human_subcat, human_confidence = scores['human']
+        proc_cat, proc_subcat, proc_confidence = scores['procedural']
+        
+        # Determine overall confidence
+        avg_confidence = (tech_confidence + human_confidence + proc_confidence) / 3
+        
+        return (
+            incident['incident_id'],
+            tech_cat, tech_subcat,
+            human_cat, human_subcat,
+            proc_cat, proc_subcat,
+            'automated',
+            avg_confidence,
+            text_hash(text),
+            TAXONOMY_FINGERPRINTS['tech'],
+            TAXONOMY_FINGERPRINTS['human'],
+            TAXONOMY_FINGERPRINTS['procedural']
+        )
+    
+    def _print_classification(self, incident, row):
+        """Print one classification result"""
+        _, tech_cat, tech_subcat, human_cat, human_subcat, proc_cat, proc_subcat, _, confidence = row[:9]
         
-        confidence = min(best_score / 5.0, 1.0) if best_score > 0 else 0.0
+        print(f"  ✅ {incident['title'][:50]}...")
+        print(f"     Tech: {tech_cat}/{tech_subcat}")
+        print(f"     Human: {human_cat}/{human_subcat}")
+        print(f"     Proc: {proc_cat}/{proc_subcat}")
+        print(f"     Confidence: {confidence:.2f}")
+    
+    def classify_text(self, text):
+        """
+        Classify lowercased incident text across all 3 dimensions
+        in a single pass of the keyword automaton
         
-        return best_category, best_subcategory, confidence
+        Returns:
+            (tech, human, procedural) tuples of (category, subcategory, confidence)
+        """
+        scores = TAXONOMY_MATCHER.score(text)
+        return scores['tech'], scores['human'], scores['procedural']
 
 # Run classifier
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classify unclassified incidents")
+    parser.add_argument('--batch', action='store_true',
+                        help="Stream the backlog in chunks, one transaction per chunk")
+    parser.add_argument('--chunk-size', type=int, default=500,
+                        help="Incidents per transaction in batch mode (default: 500)")
+    parser.add_argument('--verbose', action='store_true',
+                        help="Print every classification in batch mode")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Score incidents in N worker processes (default: single process)")
+    parser.add_argument('--engine', choices=ThreatClassifier.ENGINES, default='keyword',
+                        help="Scoring backend for batch and worker modes (default: keyword)")
+    parser.add_argument('--reclassify', action='store_true',
+                        help="Recompute classifications whose text or taxonomy changed")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("🧠 THREAT CLASSIFIER - Multi-Dimensional Taxonomy")
     print("=" * 60)
     
-    classifier = ThreatClassifier()
-    classifier.classify_all_unclassified()
+    classifier = ThreatClassifier(engine=args.engine)
+    if args.reclassify:
+        classifier.reclassify_changed(chunk_size=args.chunk_size)
+    elif args.workers > 0:
+        from src.classifiers.parallel import run_parallel
+        run_parallel('classify', db_path=classifier.db_path, workers=args.workers,
+                     engine=args.engine)
+    elif args.batch:
+        classifier.classify_batch(chunk_size=args.chunk_size, verbose=args.verbose)
+    else:
+        classifier.classify_all_unclassified()
     
     print("\n" + "=" * 60)
     print("✅ Classification complete!")
@@ -0,0 +1,198 @@
+"""
+Sparse-matrix classification engine
+Turns a batch of incident texts into a sparse keyword-presence matrix and
+scores every category/subcategory of all taxonomy dimensions with one
+sparse matrix product against weights precomputed from config/taxonomy.py.
+Labels are identical to the keyword engine (TaxonomyMatcher).
+
+Keyword presence is computed without the pure-Python Aho-Corasick scan.
+The batch is split into whitespace-separated words by str.split, and each
+distinct word of the batch is searched once for the words of the keywords
+(in one joined string, with C str.find). A keyword without whitespace
+('phishing', 'zero-day') occurs in a text exactly when it occurs inside
+one of the text's words, so its presence follows from two sparse
+products. Multi-word keywords ('sql injection') are confirmed with
+`kw in text` only for texts containing every one of their words.
+"""
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # scipy is an optional dependency
+    np = None
+
+from bisect import bisect_right
+from itertools import chain
+
+from src.classifiers.keyword_matcher import TaxonomyMatcher
+
+# Joins the batch vocabulary for searching; whitespace, so in no word
+SEPARATOR = '\n'
+
+
+def _find_all(items, needles):
+    """
+    (item index, needle index) pairs where needle is a substring of item
+
+    Searches one joined string per needle with str.find, jumping to the
+    next item after every hit.
+    """
+    joined = SEPARATOR.join(items)
+    # Offset of each item in joined, plus one past the end
+    starts = [0]
+    for item in items:
+        starts.append(starts[-1] + len(item) + 1)
+
+    pairs = []
+    find = joined.find
+    for needle_index, needle in enumerate(needles):
+        position = find(needle)
+        while position != -1:
+            item_index = bisect_right(starts, position) - 1
+            pairs.append((item_index, needle_index))
+            position = find(needle, starts[item_index + 1])
+    return pairs
+
+
+class VectorizedEngine:
+    """Batch classifier backed by scipy sparse matrices"""
+
+    def __init__(self, taxonomies):
+        """
+        Args:
+            taxonomies: dict of dimension name -> taxonomy dict
+                        (same shape as TECH_TAXONOMY in config/taxonomy.py)
+        """
+        if np is None:
+            raise ImportError(
+                "The vectorized engine needs numpy and scipy "
+                "(pip install -r requirements.txt)"
+            )
+
+        self.taxonomy_matcher = TaxonomyMatcher(taxonomies)
+        self.dimensions = self.taxonomy_matcher.dimensions
+        matcher = self.taxonomy_matcher.matcher
+        self.keywords = matcher.keywords
+
+        # Words of every keyword; single-word keywords map straight to
+        # their word, the others are confirmed per candidate text
+        part_ids = {}
+        single_rows, single_cols = [], []
+        self._multi_word = []
+
+        for keyword_id, keyword in enumerate(self.keywords):
+            ids = sorted({part_ids.setdefault(part, len(part_ids))
+                          for part in keyword.split()})
+            if [keyword] == keyword.split():
+                single_rows.append(ids[0])
+                single_cols.append(keyword_id)
+            else:
+                self._multi_word.append((keyword_id, keyword, ids))
+        self.parts = list(part_ids)
+
+        self.part_keywords = sparse.csr_matrix(
+            (np.ones(len(single_rows), dtype=np.int32), (single_rows, single_cols)),
+            shape=(len(self.parts), len(self.keywords))
+        )
+
+        # One weight matrix for all dimensions: keyword x (dimension, slot),
+        # slot score = category keyword hits + 2 * subcategory keyword hits
+        rows, cols, weights = [], [], []
+        self._slot_labels = {}
+        self._slot_ranges = {}
+        offset = 0
+
+        for dimension in self.dimensions:
+            slots = self.taxonomy_matcher.slots(dimension)
+            for keyword_id, slot_index, weight in self.taxonomy_matcher.slot_weights(dimension):
+                rows.append(keyword_id)
+                cols.append(offset + slot_index)
+                weights.append(weight)
+
+            self._slot_labels[dimension] = [(category, subcat) for _, category, subcat in slots]
+            self._slot_ranges[dimension] = (offset, offset + len(slots))
+            offset += len(slots)
+
+        # Duplicate (keyword, slot) entries are summed on conversion
+        self.weights = sparse.coo_matrix(
+            (weights, (rows, cols)),
+            shape=(len(matcher.keywords), offset),
+            dtype=np.int32
+        ).tocsr()
+
+    def presence_matrix(self, texts):
+        """Sparse (texts x keywords) matrix, 1 exactly where `keyword in text`"""
+        # texts x distinct words of the batch
+        tokens = list(map(str.split, texts))
+        flat = list(chain.from_iterable(tokens))
+        words = list(dict.fromkeys(flat))
+        word_index = {word: i for i, word in enumerate(words)}
+        word_ids = np.fromiter(map(word_index.__getitem__, flat), dtype=np.int64, count=len(flat))
+        text_ids = np.repeat(np.arange(len(texts)), list(map(len, tokens)))
+        text_words = sparse.csr_matrix(
+            (np.ones(len(word_ids), dtype=np.int32), (text_ids, word_ids)),
+            shape=(len(texts), len(words))
+        )
+
+        # words x keyword parts, 1 where the part occurs inside the word
+        pairs = _find_all(words, self.parts)
+        word_parts = sparse.csr_matrix(
+            (np.ones(len(pairs), dtype=np.int32),
+             ([word for word, _ in pairs], [part for _, part in pairs])),
+            shape=(len(words), len(self.parts))
+        )
+
+        part_presence = (text_words @ word_parts).tocsc()
+        part_presence.data[:] = 1
+
+        rows, cols = [], []
+        for keyword_id, keyword, ids in self._multi_word:
+            if ids:
+                hits = np.asarray(part_presence[:, ids].sum(axis=1)).ravel()
+                candidates = np.flatnonzero(hits == len(ids)).tolist()
+            else:
+                candidates = range(len(texts))
+            for text_index in candidates:
+                if keyword in texts[text_index]:
+                    rows.append(text_index)
+                    cols.append(keyword_id)
+
+        multi_word = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (rows, cols)),
+            shape=(len(texts), len(self.keywords))
+        )
+        return part_presence.tocsr() @ self.part_keywords + multi_word
+
+    def score_matrix(self, texts):
+        """Return the dense (texts x all slots) score matrix for a batch"""
+        return (self.presence_matrix(texts) @ self.weights).toarray()
+
+    def score_batch(self, texts):
+        """
+        Classify a batch of lowercased texts
+
+        Returns:
+            List of dicts of dimension -> (category, subcategory, confidence),
+            one per text, in input order
+        """
+        scores = self.score_matrix(texts)
+        results = [{} for _ in range(scores.shape[0])]
+
+        for dimension in self.dimensions:
+            start, end = self._slot_ranges[dimension]
+            labels = self._slot_labels[dimension]
+            block = scores[:, start:end]
+
+            # argmax returns the first maximum, matching the keyword engine's
+            # "strictly greater wins" scan over slots in taxonomy order
+            best_slots = block.argmax(axis=1)
+            best_scores = block[np.arange(block.shape[0]), best_slots]
+            confidences = np.minimum(best_scores / 5.0, 1.0)
+
+            for i, (slot_index, best_score) in enumerate(zip(best_slots, best_scores)):
+                if best_score > 0:
+                    category, subcat = labels[slot_index]
+                    results[i][dimension] = (category, subcat, float(confidences[i]))
+                else:
+                    results[i][dimension] = (None, None, 0.0)
+
+        return results
@@ -1,8 +1,14 @@
 import requests
-import sqlite3
 from datetime import datetime, timedelta
 import time
 import hashlib
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.collectors.ingest import known_incident_ids
+from src.database.connection import write_connection
+from src.database.schema import ensure_schema_upgrades
 
 class CVECollector:
     """
@@ -163,41 +169,41 @@ class CVECollector:
     
     def save_to_database(self, cves):
         """Save CVEs to database as incidents"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # Generate incident IDs from CVE IDs; the NVD repeats CVEs
+        # modified during the window
+        candidates = {f"cve_{cve['cve_id'].lower().replace('-', '_')}": cve for cve in cves}
         
-        saved_count = 0
-        duplicate_count = 0
+        # Map CVSS severity to our severity scale
+        severity_map = {
+            'critical': 'critical',
+            'high': 'high',
+            'medium': 'medium',
+            'low': 'low',
+            'unknown': 'medium'
+        }
         
-        for cve in cves:
-            # Generate incident ID from CVE ID
-            incident_id = f"cve_{cve['cve_id'].lower().replace('-', '_')}"
-            
-            # Map CVSS severity to our severity scale
-            severity_map = {
-                'critical': 'critical',
-                'high': 'high',
-                'medium': 'medium',
-                'low': 'low',
-                'unknown': 'medium'
-            }
-            severity = severity_map.get(cve['severity'], 'medium')
-            
-            # Create title
-            title = f"{cve['cve_id']} - FinTech Vulnerability ({cve['severity'].upper()})"
+        with write_connection(self.db_path) as conn:
+            ensure_schema_upgrades(conn)
+            cursor = conn.cursor()
             
-            # Build source URL
-            source_url = f"https://nvd.nist.gov/vuln/detail/{cve['cve_id']}"
-            if cve['references']:
-                source_url = cve['references'][0]
+            known = known_incident_ids(conn, candidates)
             
-            try:
-                cursor.execute('''
-                INSERT INTO incidents (
-                    incident_id, title, description, date_discovered,
-                    source_url, source_type, severity, status, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
+            rows = []
+            for incident_id, cve in candidates.items():
+                if incident_id in known:
+                    continue
+                
+                severity = severity_map.get(cve['severity'], 'medium')
+                
+                # Create title
+                title = f"{cve['cve_id']} - FinTech Vulnerability ({cve['severity'].upper()})"
+                
+                # Build source URL
+                source_url = f"https://nvd.nist.gov/vuln/detail/{cve['cve_id']}"
+                if cve['references']:
+                    source_url = cve['references'][0]
+                
+                rows.append((
                     incident_id,
                     title,
                     cve['description'][:500],  # Truncate long descriptions
@@ -205,20 +211,24 @@ class CVECollector:
                     source_url,
                     'cve',
                     severity,
+                    cve['cvss_score'] or None,  # 0.0 means no CVSS metrics
                     'active',
                     datetime.now()
                 ))
-                saved_count += 1
-                
-            except sqlite3.IntegrityError:
-                duplicate_count += 1
-                continue
-        
-        conn.commit()
-        conn.close()
+            
+            # Only new CVEs reach SQLite, in one statement
+            cursor.executemany('''
+            INSERT OR IGNORE INTO incidents (
+                incident_id, title, description, date_discovered,
+                source_url, source_type, severity, cvss_score, status, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            saved_count = max(cursor.rowcount, 0)
+            
+            conn.commit()
         
         print(f"\n💾 Saved {saved_count} new CVEs")
-        print(f"⏭️  Skipped {duplicate_count} duplicates")
+        print(f"⏭️  Skipped {len(cves) - saved_count} duplicates")
         
         return saved_count
     
@@ -0,0 +1,274 @@
+"""
+Shared ingest helpers for the collectors
+Feeds are polled repeatedly and mostly return items we already stored.
+Collectors canonicalize item URLs, drop the items whose incident_id is
+already known with one batched lookup, and insert only the new ones with
+a single executemany, instead of attempting an INSERT per item and
+catching the IntegrityError.
+
+Feed summaries arrive as HTML. html_to_text() reduces them to the plain
+text stored in incidents.description and matched by the classifiers; the
+original markup can be kept zlib-compressed in incident_raw_bodies.
+Descriptions stored before this normalization are cleaned with:
+
+    python src/collectors/ingest.py --backfill [--keep-raw]
+"""
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # BeautifulSoup's parser is the slower fallback
+    lxml = None
+
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from bs4 import BeautifulSoup
+import argparse
+import sqlite3
+import html
+import time
+import zlib
+import re
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.classifiers.keyword_index import KeywordIndex
+from src.classifiers.mitre_mapper import MITREMapper
+from src.classifiers.severity_scorer import SeverityScorer
+from src.classifiers.subsector_tagger import SubsectorTagger
+from src.classifiers.threat_classifier import ThreatClassifier
+from src.database.connection import write_connection
+from src.database.schema import ensure_schema_upgrades
+from src.database.watermark import get_watermark, incident_ids_with_rows
+
+# Original bodies of incidents whose description was cleaned
+RAW_BODY_TABLE = 'incident_raw_bodies'
+
+# Query parameters that only track the click, never select the content
+TRACKING_PARAMS = re.compile(
+    r'^(utm_\w+|fbclid|gclid|dclid|msclkid|yclid|mc_cid|mc_eid|_hsenc|_hsmi|mkt_tok|'
+    r'igshid|ncid|cmpid|ref|ref_src|guccounter)$',
+    re.IGNORECASE
+)
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Elements that end a line of text; the rest run into their neighbours
+_BLOCK_TAGS = ('address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt',
+               'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+               'hr', 'li', 'ol', 'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul')
+
+
+def canonical_url(url):
+    """
+    Canonical form of an article URL, so tracking variants hash alike
+
+    Lowercases the scheme and host, drops default ports, the fragment
+    and tracking parameters, and sorts the remaining parameters.
+    """
+    url = (url or '').strip()
+    if not url:
+        return url
+
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if not TRACKING_PARAMS.match(key))
+
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+def known_incident_ids(conn, incident_ids):
+    """Subset of incident_ids already stored, in batched indexed lookups"""
+    return incident_ids_with_rows(conn, 'incidents', incident_ids)
+
+
+def _lxml_text(markup):
+    """Text of an HTML fragment parsed by lxml, or None if it cannot parse it"""
+    try:
+        root = lxml.html.fragment_fromstring(markup, create_parent='div')
+    except (etree.ParserError, ValueError):
+        return None
+    etree.strip_elements(root, 'script', 'style', etree.Comment, with_tail=False)
+    for element in root.iter(_BLOCK_TAGS):
+        element.tail = ' ' + (element.tail or '')
+    return ''.join(root.itertext())
+
+
+def html_to_text(markup):
+    """
+    Plain text of an HTML fragment, entities decoded, whitespace collapsed
+
+    Text without tags skips the parser. Scripts, styles and comments are
+    dropped, and block elements are separated by a space.
+    """
+    if not markup:
+        return ''
+    if '<' not in markup:
+        return ' '.join(html.unescape(markup).split())
+
+    text = _lxml_text(markup) if lxml is not None else None
+    if text is None:
+        soup = BeautifulSoup(markup, 'html.parser')
+        for element in soup(['script', 'style']):
+            element.decompose()
+        text = soup.get_text(' ')
+
+    # Some feeds escape their entities twice (&amp;#8217;); only markup
+    # with escaped ampersands or numeric references gets a second pass
+    if '&' in text and ('&amp;' in markup or '&#' in markup):
+        text = html.unescape(text)
+    return ' '.join(text.split())
+
+
+def compress_body(body):
+    """zlib-compressed UTF-8 of an original item body, for RAW_BODY_TABLE"""
+    return zlib.compress(body.encode('utf-8'))
+
+
+def raw_body(conn, incident_id):
+    """Original body kept for an incident, or None"""
+    row = conn.execute(f'SELECT body FROM {RAW_BODY_TABLE} WHERE incident_id = ?',
+                       (incident_id,)).fetchone()
+    return zlib.decompress(row[0]).decode('utf-8') if row else None
+
+
+def _refresh_enrichment(conn, changes, enrichers):
+    """
+    Re-derive what the enrichers computed from the old text (does not commit)
+
+    MITRE mappings are matched again and severity and subsector scored
+    again (news items carry neither from their feed), for the incidents
+    each stage has already processed; later ones get the new text anyway.
+    A severity or subsector is only replaced while it still equals what
+    the enricher derives from the old text; any other value was set by
+    hand and is kept. The keyword index swaps the terms that came or
+    went. Classifications are left to reclassify_changed(), which finds
+    them by text hash.
+
+    Args:
+        changes: (incidents.id, old row, new row) of canonical incidents
+        enrichers: (MITREMapper, SeverityScorer, SubsectorTagger, KeywordIndex)
+
+    Returns:
+        Number of hand-set severities and subsectors kept
+    """
+    mapper, scorer, tagger, keyword_index = enrichers
+
+    def processed(stage):
+        watermark = get_watermark(conn, stage)
+        return [(old, new) for rowid, old, new in changes if rowid <= watermark]
+
+    mapped = [new for _, new in processed(mapper.STAGE)]
+    conn.executemany("DELETE FROM mitre_mappings WHERE incident_id = ? AND mapping_source = 'automated_keyword'",
+                     [(incident['incident_id'],) for incident in mapped])
+    conn.executemany(mapper.WRITE_SQL, mapper.rows_for_incidents(mapped))
+
+    # Their WRITE_SQL only fills NULLs, so derived values are cleared first
+    kept = 0
+    for enricher, column in ((scorer, 'severity'), (tagger, 'subsector')):
+        scored = processed(enricher.STAGE)
+        derived = {rowid: value for value, rowid in enricher.rows_for_incidents([old for old, _ in scored])}
+        stale = [old['id'] for old, _ in scored
+                 if old[column] is not None and old[column] == derived.get(old['id'])]
+        kept += sum(1 for old, _ in scored if old[column] is not None) - len(stale)
+        conn.executemany(f'UPDATE incidents SET {column} = NULL WHERE id = ?', [(rowid,) for rowid in stale])
+        conn.executemany(enricher.WRITE_SQL, enricher.rows_for_incidents([new for _, new in scored]))
+
+    keyword_index.reindex(conn, changes)
+    return kept
+
+
+def backfill(db_path='data/threats.db', keep_raw=False, vacuum=False, chunk_size=1000):
+    """
+    Clean the HTML out of news titles and descriptions stored before ingest did
+
+    Everything derived from the old text is refreshed with it: MITRE
+    mappings, severity, subsector and keyword postings in the same
+    transaction as each chunk, then the classifications. Severities and
+    subsectors set by hand are kept.
+
+    Args:
+        keep_raw: Keep each changed description's original in RAW_BODY_TABLE
+        vacuum: VACUUM afterwards to return the freed pages to the file system
+
+    Returns:
+        (incidents scanned, incidents cleaned, hand-set severities and subsectors kept)
+    """
+    scanned = cleaned = kept = 0
+    last_id = 0
+
+    with write_connection(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        ensure_schema_upgrades(conn)
+        enrichers = (MITREMapper(db_path), SeverityScorer(db_path), SubsectorTagger(db_path),
+                     KeywordIndex(db_path))
+
+        while True:
+            incidents = conn.execute('''
+                SELECT id, incident_id, title, description, cvss_score, severity, subsector,
+                       canonical_incident_id
+                FROM incidents
+                WHERE id > ? AND source_type = 'news' AND (instr(title, '<') OR instr(title, '&')
+                                  OR instr(description, '<') OR instr(description, '&'))
+                ORDER BY id LIMIT ?
+            ''', (last_id, chunk_size)).fetchall()
+            if not incidents:
+                break
+
+            updates, bodies, changes = [], [], []
+            for incident in incidents:
+                title, description = incident['title'], incident['description'] or ''
+                clean_title = html_to_text(title)
+                clean_description = html_to_text(description)
+                if (clean_title, clean_description) == (title, description):
+                    continue
+                updates.append((clean_title, clean_description, incident['id']))
+                if keep_raw and clean_description != description:
+                    bodies.append((incident['incident_id'], compress_body(description)))
+                # Linked copies are never enriched
+                if incident['canonical_incident_id'] is None:
+                    changes.append((incident['id'], incident,
+                                    dict(incident, title=clean_title, description=clean_description)))
+
+            conn.executemany('UPDATE incidents SET title = ?, description = ? WHERE id = ?', updates)
+            conn.executemany(f'INSERT OR IGNORE INTO {RAW_BODY_TABLE} (incident_id, body) VALUES (?, ?)',
+                             bodies)
+            kept += _refresh_enrichment(conn, changes, enrichers)
+            conn.commit()
+
+            last_id = incidents[-1]['id']
+            scanned += len(incidents)
+            cleaned += len(updates)
+
+    if cleaned:
+        ThreatClassifier(db_path).reclassify_changed()
+
+    if vacuum:
+        with write_connection(db_path) as conn:
+            conn.execute('VACUUM')
+
+    return scanned, cleaned, kept
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest normalization")
+    parser.add_argument('--db', default='data/threats.db')
+    parser.add_argument('--backfill', action='store_true',
+                        help="Strip HTML from titles and descriptions stored before ingest did")
+    parser.add_argument('--keep-raw', action='store_true',
+                        help="Keep the original descriptions, compressed")
+    parser.add_argument('--vacuum', action='store_true',
+                        help="VACUUM the database afterwards")
+    args = parser.parse_args()
+
+    if args.backfill:
+        started = time.perf_counter()
+        scanned, cleaned, kept = backfill(args.db, args.keep_raw, args.vacuum)
+        print(f"🧹 Scanned {scanned} incidents with markup, cleaned {cleaned} "
+              f"in {time.perf_counter() - started:.2f}s")
+        if kept:
+            print(f"⚠️  Kept {kept} hand-set severities/subsectors of cleaned incidents")
@@ -5,6 +5,12 @@ from rss_collector import RSSCollector
 from cve_collector import CVECollector
 from otx_collector import OTXCollector
 from datetime import datetime
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.classifiers.keyword_index import KeywordIndex
+from src.classifiers.enrichment_pipeline import EnrichmentPipeline
 
 def run_all_collectors(otx_api_key=None):
     """Run all data collectors"""
@@ -41,13 +47,23 @@ def run_all_collectors(otx_api_key=None):
     else:
         print("\n⏭️  STEP 3: Skipping OTX (no API key)")
     
+    # 4. Taxonomy, MITRE, severity and subsector in one pass over new incidents
+    print("\n🧪 STEP 4: Enriching new incidents...")
+    print("-" * 60)
+    EnrichmentPipeline().run()
+    
+    # 5. Keyword index (targeted reclassification after taxonomy edits)
+    print("\n🗂️  STEP 5: Indexing new incidents...")
+    print("-" * 60)
+    KeywordIndex().update()
+    
     # Summary
     print("\n" + "=" * 60)
     print(f"✅ COLLECTION COMPLETE")
     print("=" * 60)
     print(f"Total new incidents collected: {total_collected}")
     print(f"Run time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("\n💡 Next: Run classification engine to categorize threats")
+    print("\n💡 Next: Generate reports with src/reports/report_generator.py")
     print("=" * 60 + "\n")
 
 if __name__ == "__main__":
@@ -1,7 +1,14 @@
 import requests
-import sqlite3
 from datetime import datetime, timedelta
 import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.classifiers.mitre_mapper import MITREMapper, INSERT_MAPPING_SQL
+from src.collectors.ingest import known_incident_ids
+from src.database.connection import write_connection
+from src.database.schema import ensure_schema_upgrades
 
 class OTXCollector:
     """
@@ -135,42 +142,43 @@ class OTXCollector:
     
     def save_to_database(self, pulses):
         """Save OTX pulses to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        saved_count = 0
-        duplicate_count = 0
+        candidates = {f"otx_{pulse['id']}": pulse for pulse in pulses}
         
-        for pulse in pulses:
-            incident_id = f"otx_{pulse['id']}"
-            
-            # Parse date
-            try:
-                date_discovered = datetime.fromisoformat(
-                    pulse['created'].replace('Z', '+00:00')
-                )
-            except:
-                date_discovered = datetime.now()
+        with write_connection(self.db_path) as conn:
+            ensure_schema_upgrades(conn)
+            cursor = conn.cursor()
             
-            # Determine severity based on TLP and indicators
-            severity = 'medium'
-            if pulse['tlp'] == 'red':
-                severity = 'critical'
-            elif pulse['tlp'] == 'amber':
-                severity = 'high'
-            elif pulse['indicators'] > 50:
-                severity = 'high'
+            known = known_incident_ids(conn, candidates)
             
-            # Build source URL
-            source_url = f"https://otx.alienvault.com/pulse/{pulse['id']}"
+            incident_rows = []
+            mapping_rows = []
+            catalog = MITREMapper(self.db_path).catalog
             
-            try:
-                cursor.execute('''
-                INSERT INTO incidents (
-                    incident_id, title, description, date_discovered,
-                    source_url, source_type, severity, status, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
+            for incident_id, pulse in candidates.items():
+                if incident_id in known:
+                    continue
+                
+                # Parse date
+                try:
+                    date_discovered = datetime.fromisoformat(
+                        pulse['created'].replace('Z', '+00:00')
+                    )
+                except:
+                    date_discovered = datetime.now()
+                
+                # Determine severity based on TLP and indicators
+                severity = 'medium'
+                if pulse['tlp'] == 'red':
+                    severity = 'critical'
+                elif pulse['tlp'] == 'amber':
+                    severity = 'high'
+                elif pulse['indicators'] > 50:
+                    severity = 'high'
+                
+                # Build source URL
+                source_url = f"https://otx.alienvault.com/pulse/{pulse['id']}"
+                
+                incident_rows.append((
                     incident_id,
                     pulse['name'],
                     pulse['description'][:500],
@@ -185,45 +193,53 @@ class OTXCollector:
                 # If pulse has MITRE ATT&CK IDs, save them
                 if pulse['attack_ids']:
                     for attack_id in pulse['attack_ids']:
-                        self._save_mitre_mapping(cursor, incident_id, attack_id)
-                
-                saved_count += 1
-                
-            except sqlite3.IntegrityError:
-                duplicate_count += 1
-                continue
-        
-        conn.commit()
-        conn.close()
+                        mapping_rows.append(self._mitre_mapping_row(catalog, incident_id, attack_id))
+            
+            # Only new pulses reach SQLite, in one statement
+            cursor.executemany('''
+            INSERT OR IGNORE INTO incidents (
+                incident_id, title, description, date_discovered,
+                source_url, source_type, severity, status, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', incident_rows)
+            saved_count = max(cursor.rowcount, 0)
+            
+            # One bulk upsert; overlapping techniques merge into a single row
+            cursor.executemany(INSERT_MAPPING_SQL, mapping_rows)
+            
+            conn.commit()
         
         print(f"\n💾 Saved {saved_count} new threat intel pulses")
-        print(f"⏭️  Skipped {duplicate_count} duplicates")
+        print(f"⏭️  Skipped {len(pulses) - saved_count} duplicates")
         
         return saved_count
     
-    def _save_mitre_mapping(self, cursor, incident_id, attack_id):
-        """Save MITRE ATT&CK mapping"""
-        try:
-            # Parse technique ID (format: T1078 or T1078.001)
-            parts = attack_id['id'].split('.')
-            technique_id = parts[0]
-            sub_technique_id = attack_id['id'] if len(parts) > 1 else None
-            
-            cursor.execute('''
-            INSERT INTO mitre_mappings (
-                incident_id, technique_id, technique_name,
-                sub_technique_id, confidence, mapping_source
-            ) VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                incident_id,
-                technique_id,
-                attack_id.get('name', ''),
-                sub_technique_id,
-                0.8,  # High confidence from OTX
-                'otx_api'
-            ))
-        except:
-            pass  # Skip if mapping already exists
+    def _mitre_mapping_row(self, catalog, incident_id, attack_id):
+        """Build the INSERT_MAPPING_SQL row for an OTX ATT&CK id"""
+        # Technique ID format: T1078 or T1078.001; names and tactic
+        # come from the ATT&CK catalog, falling back to OTX's name
+        technique = catalog.describe(attack_id['id'])
+        otx_name = attack_id.get('name', '')
+        
+        if technique['sub_technique_id']:
+            sub_technique_name = technique['sub_technique_name'] or otx_name
+            technique_name = technique['technique_name'] or ''
+        else:
+            sub_technique_name = None
+            technique_name = technique['technique_name'] or otx_name
+        
+        return (
+            incident_id,
+            technique['tactic_id'],
+            technique['tactic_name'] if technique['tactic_id'] else None,
+            technique['technique_id'],
+            technique_name,
+            technique['sub_technique_id'],
+            sub_technique_name,
+            0.8,  # High confidence from OTX
+            'otx_api',
+            datetime.now()
+        )
 
 # Test the collector
 if __name__ == "__main__":
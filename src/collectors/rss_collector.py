@@ -1,10 +1,18 @@
 import feedparser
 import requests
 from datetime import datetime, timedelta
-import sqlite3
 import hashlib
+import argparse
 import re
-from bs4 import BeautifulSoup
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.collectors.ingest import (canonical_url, compress_body, html_to_text, known_incident_ids,
+                                   RAW_BODY_TABLE)
+from src.database.connection import write_connection
+from src.database.near_duplicates import NearDuplicateIndex
+from src.database.schema import ensure_schema_upgrades
 
 class RSSCollector:
     """Collects cyber threat news from RSS feeds"""
@@ -28,8 +36,15 @@ class RSSCollector:
         'transaction', 'financial institution', 'credit union', 'brokerage'
     ]
     
-    def __init__(self, db_path='data/threats.db'):
+    def __init__(self, db_path='data/threats.db', keep_raw=False):
+        """
+        Args:
+            db_path: SQLite database path
+            keep_raw: Also keep each article's original HTML summary,
+                      compressed, in the raw bodies table
+        """
         self.db_path = db_path
+        self.keep_raw = keep_raw
     
     def collect_from_feed(self, feed_name, feed_url, days_back=30):
         """
@@ -58,15 +73,18 @@ class RSSCollector:
                 if pub_date and pub_date < cutoff_date:
                     continue
                 
-                # Check if article is FinTech-related
-                title = entry.get('title', '')
-                description = entry.get('summary', '')
+                # Check if article is FinTech-related; summaries are HTML,
+                # stored and classified as plain text
+                title = html_to_text(entry.get('title', ''))
+                body = entry.get('summary', '')
+                description = html_to_text(body)
                 content = f"{title} {description}".lower()
                 
                 if self._is_fintech_related(content):
                     article = {
                         'title': title,
                         'description': description,
+                        'body': body,
                         'url': entry.get('link', ''),
                         'published': pub_date,
                         'source': feed_name
@@ -93,44 +111,77 @@ class RSSCollector:
     
     def save_to_database(self, articles):
         """Save collected articles to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        saved_count = 0
-        duplicate_count = 0
-        
+        # incident_id -> (article, canonical URL, id hashed from the raw URL
+        # before URLs were canonicalized); feeds repeat articles
+        candidates = {}
         for article in articles:
-            # Generate unique incident ID from URL
-            incident_id = self._generate_incident_id(article['url'])
+            url = canonical_url(article['url'])
+            candidates.setdefault(self._generate_incident_id(url),
+                                  (article, url, self._generate_incident_id(article['url'])))
+        
+        with write_connection(self.db_path) as conn:
+            ensure_schema_upgrades(conn)
+            cursor = conn.cursor()
+            near_duplicates = NearDuplicateIndex(conn)
+            
+            # Hold the write lock from the lookup to the insert, so no other
+            # collector stores one of these articles in between: every row
+            # is inserted, and flush() only indexes incidents of this batch
+            if not conn.in_transaction:
+                conn.execute('BEGIN IMMEDIATE')
+            known = known_incident_ids(conn, list(candidates) + [legacy_id for _, _, legacy_id in candidates.values()])
             
-            try:
-                cursor.execute('''
-                INSERT INTO incidents (
-                    incident_id, title, description, date_discovered,
-                    source_url, source_type, status, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
+            rows = []
+            bodies = []
+            linked_count = 0
+            known_count = 0
+            
+            for incident_id, (article, url, legacy_id) in candidates.items():
+                if incident_id in known or legacy_id in known:
+                    known_count += 1
+                    continue
+                
+                # Same story from another feed: stored, linked, not enriched
+                canonical_id, buckets = near_duplicates.match(article['title'], article['description'])
+                if canonical_id:
+                    linked_count += 1
+                else:
+                    near_duplicates.stage(incident_id, article['title'], article['description'], buckets)
+                
+                rows.append((
                     incident_id,
                     article['title'],
                     article['description'],
                     article['published'],
-                    article['url'],
+                    url,
                     'news',
                     'active',
-                    datetime.now()
+                    datetime.now(),
+                    canonical_id
                 ))
-                saved_count += 1
                 
-            except sqlite3.IntegrityError:
-                # Duplicate incident_id
-                duplicate_count += 1
-                continue
-        
-        conn.commit()
-        conn.close()
+                body = article.get('body')
+                if self.keep_raw and body and body != article['description']:
+                    bodies.append((incident_id, compress_body(body)))
+            
+            # Only new articles reach SQLite, in one statement
+            cursor.executemany('''
+            INSERT INTO incidents (
+                incident_id, title, description, date_discovered,
+                source_url, source_type, status, created_at,
+                canonical_incident_id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            saved_count = len(rows)
+            cursor.executemany(f'INSERT OR IGNORE INTO {RAW_BODY_TABLE} (incident_id, body) VALUES (?, ?)',
+                               bodies)
+            near_duplicates.flush()
+            
+            conn.commit()
         
-        print(f"\n💾 Saved {saved_count} new incidents")
-        print(f" Skipped {duplicate_count} duplicates")
+        print(f"\n💾 Saved {saved_count} new incidents ({linked_count} linked as near-duplicates)")
+        print(f" Skipped {known_count} already stored and "
+              f"{len(articles) - len(candidates)} repeated across feeds")
         
         return saved_count
     
@@ -160,7 +211,13 @@ class RSSCollector:
 
 # Test the collector
 if __name__ == "__main__":
-    collector = RSSCollector()
+    parser = argparse.ArgumentParser(description="Collect FinTech threat news from RSS feeds")
+    parser.add_argument('--db', default='data/threats.db')
+    parser.add_argument('--keep-raw', action='store_true',
+                        help="Keep the original HTML summaries, compressed")
+    args = parser.parse_args()
+    
+    collector = RSSCollector(args.db, keep_raw=args.keep_raw)
     
     print("🚀 Starting RSS collection...")
     articles = collector.collect_all_feeds(days_back=7)
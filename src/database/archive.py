@@ -0,0 +1,246 @@
+"""
+Per-year archive databases
+Moves incidents discovered before a cutoff, together with their
+classifications, MITRE mappings, impact rows and kept raw bodies, out of
+the hot database into one SQLite file per year
+(data/archive/threats_<year>.db). The hot database the dashboard and the
+enrichment stages read stays small; the trigger-maintained aggregates and
+the search index shrink with it.
+
+Historical analysis attaches the archives and reads TEMP union views
+(all_incidents, all_mitre_mappings, ...) spanning the hot database and
+every archive:
+
+    conn = historical_connection()
+    conn.execute("SELECT COUNT(*) FROM all_incidents WHERE severity = 'critical'")
+"""
+from datetime import datetime, timedelta
+import argparse
+import re
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.database.connection import connect, write_connection
+from src.database.schema import ensure_schema_upgrades
+
+DEFAULT_ARCHIVE_DIR = 'data/archive'
+
+# Archived tables; every one but incidents references incidents.incident_id
+ARCHIVED_TABLES = ('incidents', 'threat_classifications', 'mitre_mappings',
+                   'regulatory_impact', 'financial_impact', 'incident_raw_bodies')
+
+_ARCHIVE_FILE = re.compile(r'^threats_(\d{4})\.db$')
+
+
+def archive_path(year, archive_dir=DEFAULT_ARCHIVE_DIR):
+    """Archive file holding the incidents discovered in a year"""
+    return os.path.join(archive_dir, f'threats_{year}.db')
+
+
+def archive_files(archive_dir=DEFAULT_ARCHIVE_DIR):
+    """(year, path) of every archive file, oldest first"""
+    if not os.path.isdir(archive_dir):
+        return []
+    return sorted((match.group(1), os.path.join(archive_dir, name))
+                  for name in os.listdir(archive_dir)
+                  for match in [_ARCHIVE_FILE.match(name)] if match)
+
+
+def _columns(conn, schema, table):
+    """Column names of schema.table in declaration order"""
+    return [row[1] for row in conn.execute(f'PRAGMA {schema}.table_info({table})')]
+
+
+def _ensure_archive_tables(conn, schema):
+    """
+    Create the archived tables in an attached archive, like the hot ones
+
+    Columns the hot tables gained since the archive was created are
+    added, so rows can always be copied column for column.
+    """
+    for table in ARCHIVED_TABLES:
+        create_sql = conn.execute(
+            "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()[0]
+        conn.execute(re.sub(r'^CREATE TABLE (IF NOT EXISTS )?"?\w+"?',
+                            f'CREATE TABLE IF NOT EXISTS {schema}.{table}', create_sql))
+
+        archived = set(_columns(conn, schema, table))
+        declared = {row[1]: row[2] for row in conn.execute(f'PRAGMA main.table_info({table})')}
+        for column, column_type in declared.items():
+            if column not in archived:
+                conn.execute(f'ALTER TABLE {schema}.{table} ADD COLUMN {column} {column_type}')
+
+        key = 'date_discovered' if table == 'incidents' else 'incident_id'
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_{key} ON {table}({key})')
+
+
+def _move_year(conn, year, cutoff, path):
+    """
+    Move one year's incidents before the cutoff into its archive file
+
+    The copy commits before the hot rows are deleted, so an interrupted
+    run leaves rows in both files at worst; re-running finishes the move
+    (copies replace by primary key).
+
+    Returns:
+        Number of incidents moved
+    """
+    conn.execute('ATTACH DATABASE ? AS archive', (path,))
+    try:
+        conn.execute('PRAGMA archive.journal_mode = WAL')
+        _ensure_archive_tables(conn, 'archive')
+
+        conn.execute('''
+            CREATE TEMP TABLE archive_batch AS
+            SELECT id, incident_id FROM main.incidents
+            WHERE date_discovered < ? AND strftime('%Y', date_discovered) = ?
+        ''', (cutoff, year))
+
+        for table in ARCHIVED_TABLES:
+            column_list = ', '.join(_columns(conn, 'main', table))
+            key = 'id' if table == 'incidents' else 'incident_id'
+            conn.execute(f'''
+                INSERT OR REPLACE INTO archive.{table} ({column_list})
+                SELECT {column_list} FROM main.{table}
+                WHERE {key} IN (SELECT {key} FROM temp.archive_batch)
+            ''')
+        conn.commit()
+
+        # Children first, then the incidents (their delete triggers keep
+        # the search index and change counters current)
+        for table in reversed(ARCHIVED_TABLES):
+            key = 'id' if table == 'incidents' else 'incident_id'
+            conn.execute(f'DELETE FROM main.{table} WHERE {key} IN (SELECT {key} FROM temp.archive_batch)')
+        conn.execute('DELETE FROM main.term_postings WHERE incident_rowid IN (SELECT id FROM temp.archive_batch)')
+        conn.execute('DELETE FROM main.incident_lsh_buckets WHERE incident_rowid IN (SELECT id FROM temp.archive_batch)')
+
+        moved = conn.execute('SELECT COUNT(*) FROM temp.archive_batch').fetchone()[0]
+        conn.commit()
+        return moved
+    finally:
+        conn.rollback()
+        conn.execute('DROP TABLE IF EXISTS temp.archive_batch')
+        conn.execute('DETACH DATABASE archive')
+
+
+def archive_incidents(db_path='data/threats.db', before=None, archive_dir=DEFAULT_ARCHIVE_DIR,
+                      vacuum=False):
+    """
+    Move incidents discovered before a date into per-year archive files
+
+    Args:
+        before: Cutoff date (YYYY-MM-DD); incidents discovered earlier move
+        vacuum: VACUUM the hot database afterwards to return the freed
+                pages to the file system (otherwise they are reused)
+
+    Returns:
+        dict of year -> incidents moved
+    """
+    started = time.perf_counter()
+    os.makedirs(archive_dir, exist_ok=True)
+    moved = {}
+
+    with write_connection(db_path) as conn:
+        ensure_schema_upgrades(conn)
+        years = [row[0] for row in conn.execute('''
+            SELECT DISTINCT strftime('%Y', date_discovered) FROM incidents
+            WHERE date_discovered < ? ORDER BY 1
+        ''', (before,))]
+
+        for year in years:
+            moved[year] = _move_year(conn, year, before, archive_path(year, archive_dir))
+            print(f"  📦 {year}: {moved[year]} incidents -> {archive_path(year, archive_dir)}")
+
+        if vacuum:
+            conn.execute('VACUUM')
+        conn.execute('PRAGMA optimize')
+
+    print(f"✅ Archived {sum(moved.values())} incidents discovered before {before} "
+          f"in {time.perf_counter() - started:.2f}s")
+    return moved
+
+
+def attach_archives(conn, archive_dir=DEFAULT_ARCHIVE_DIR):
+    """
+    Attach every archive file and (re)create the TEMP union views
+
+    all_<table> returns the hot rows followed by each archive's rows;
+    columns an older archive lacks read as NULL. Views are TEMP because
+    SQLite only lets TEMP views reference attached databases.
+
+    Returns:
+        Years attached
+    """
+    attached = {row[1] for row in conn.execute('PRAGMA database_list')}
+    files = archive_files(archive_dir)
+
+    # SQLite caps attached databases (10 by default, main and temp excluded)
+    if len(files) > 10:
+        raise RuntimeError(f"{len(files)} archive files in {archive_dir}; SQLite can attach "
+                           f"at most 10 at once - merge old years into fewer files")
+
+    for year, path in files:
+        if f'archive_{year}' not in attached:
+            conn.execute(f'ATTACH DATABASE ? AS archive_{year}', (path,))
+
+    for table in ARCHIVED_TABLES:
+        columns = _columns(conn, 'main', table)
+        if not columns:  # hot database not migrated yet
+            continue
+        selects = [f"SELECT {', '.join(columns)} FROM main.{table}"]
+        for year, _ in files:
+            present = set(_columns(conn, f'archive_{year}', table))
+            if not present:
+                continue
+            values = ', '.join(column if column in present else f'NULL AS {column}'
+                               for column in columns)
+            selects.append(f'SELECT {values} FROM archive_{year}.{table}')
+
+        conn.execute(f'DROP VIEW IF EXISTS temp.all_{table}')
+        conn.execute(f'CREATE TEMP VIEW all_{table} AS ' + '\nUNION ALL\n'.join(selects))
+
+    return [year for year, _ in files]
+
+
+def historical_connection(db_path='data/threats.db', archive_dir=DEFAULT_ARCHIVE_DIR):
+    """
+    New connection to the hot database with the archives attached
+
+    Query the all_* views for history; close the connection when done.
+    """
+    conn = connect(db_path)
+    attach_archives(conn, archive_dir)
+    return conn
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old incidents into per-year archive databases")
+    parser.add_argument('--db', default='data/threats.db')
+    parser.add_argument('--archive-dir', default=DEFAULT_ARCHIVE_DIR)
+    cutoff = parser.add_mutually_exclusive_group()
+    cutoff.add_argument('--before', help="Archive incidents discovered before this date (YYYY-MM-DD)")
+    cutoff.add_argument('--older-than-days', type=int, default=365,
+                        help="Archive incidents discovered more than this many days ago (default: 365)")
+    parser.add_argument('--vacuum', action='store_true',
+                        help="Shrink the hot database file afterwards")
+    args = parser.parse_args()
+
+    before = args.before or (datetime.now() - timedelta(days=args.older_than_days)).strftime('%Y-%m-%d')
+
+    print("=" * 60)
+    print("📦 INCIDENT ARCHIVE")
+    print("=" * 60 + "\n")
+
+    archive_incidents(args.db, before, args.archive_dir, args.vacuum)
+
+    conn = historical_connection(args.db, args.archive_dir)
+    print(f"\n{'DATABASE':<12} {'INCIDENTS':>10}")
+    print(f"{'hot':<12} {conn.execute('SELECT COUNT(*) FROM main.incidents').fetchone()[0]:>10}")
+    for year, _ in archive_files(args.archive_dir):
+        count = conn.execute(f'SELECT COUNT(*) FROM archive_{year}.incidents').fetchone()[0]
+        print(f"{year:<12} {count:>10}")
+    print(f"{'all':<12} {conn.execute('SELECT COUNT(*) FROM all_incidents').fetchone()[0]:>10}")
+    conn.close()
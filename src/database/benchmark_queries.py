@@ -0,0 +1,78 @@
+"""
+Benchmark the dashboard queries before and after the schema migrations
+Copies a database and takes the copy back to the version 1 schema, then
+times the base-table query each page ran before the migrations
+(dashboard_queries.ORIGINAL_QUERIES). It then migrates the copy and
+times the queries the pages run now, printing both timings and the
+final query plan.
+"""
+import argparse
+import shutil
+import tempfile
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.database.connection import connect
+from src.database.daily_rollups import drop_daily_rollups
+from src.database.dashboard_queries import DASHBOARD_QUERIES, ORIGINAL_QUERIES
+from src.database.schema import ACCESS_PATH_INDEXES, ensure_schema_upgrades
+
+
+def time_queries(conn, queries, repeat):
+    """Best-of-repeat wall time (ms) and query plan of each query"""
+    results = []
+    for sql in queries:
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(sql).fetchall()
+            best = min(best, time.perf_counter() - started)
+        plan = '; '.join(row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql))
+        results.append((best * 1000, plan))
+    return results
+
+
+def benchmark(db_path, repeat):
+    """Time the dashboard queries on a copy of db_path before and after migrating it"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        copy_path = os.path.join(tmp_dir, 'threats.db')
+        shutil.copyfile(db_path, copy_path)
+
+        conn = connect(copy_path)
+        ensure_schema_upgrades(conn)
+
+        # Back to the version 1 schema
+        for name in ACCESS_PATH_INDEXES:
+            conn.execute(f'DROP INDEX IF EXISTS {name}')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_mitre_mappings_incident_id ON mitre_mappings(incident_id)')
+        drop_daily_rollups(conn)
+        conn.execute('PRAGMA user_version = 1')
+        conn.commit()
+        before = time_queries(conn, [ORIGINAL_QUERIES[sql] for _, sql in DASHBOARD_QUERIES], repeat)
+
+        ensure_schema_upgrades(conn)
+        after = time_queries(conn, [sql for _, sql in DASHBOARD_QUERIES], repeat)
+        conn.close()
+
+    print(f"\n{'PAGE':<10} {'BEFORE (ms)':>12} {'AFTER (ms)':>11} {'SPEEDUP':>8}  QUERY / PLAN AFTER")
+    print("-" * 100)
+    for (page, sql), (before_ms, _), (after_ms, plan) in zip(DASHBOARD_QUERIES, before, after):
+        speedup = before_ms / after_ms if after_ms > 0 else 0.0
+        print(f"{page:<10} {before_ms:>12.2f} {after_ms:>11.2f} {speedup:>7.1f}x  {' '.join(sql.split())[:70]}")
+        print(f"{'':<45}↳ {plan}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time dashboard queries before/after the schema migrations")
+    parser.add_argument('--db', default='data/threats.db')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="Runs per query; the best is reported (default: 5)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("⏱️  DASHBOARD QUERY BENCHMARK")
+    print("=" * 60)
+
+    benchmark(args.db, args.repeat)
@@ -0,0 +1,37 @@
+"""
+Per-table change counters
+A trigger-maintained counter bumped on every insert, update and delete of
+a table, so caches derived from the table can be keyed by its value and
+recomputed only after the table actually changed.
+"""
+import sqlite3
+
+
+def ensure_change_counter(conn, table):
+    """Create the counter row and triggers for a table if missing"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS change_counters (
+        table_name TEXT PRIMARY KEY,
+        changes INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO change_counters (table_name) VALUES (?)', (table,))
+
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_count_{event.lower()} AFTER {event} ON {table}
+        BEGIN
+            UPDATE change_counters SET changes = changes + 1 WHERE table_name = '{table}';
+        END
+        ''')
+
+
+def change_count(conn, table):
+    """Current change counter of a table, or None if it has no counter"""
+    try:
+        row = conn.execute(
+            'SELECT changes FROM change_counters WHERE table_name = ?', (table,)
+        ).fetchone()
+    except sqlite3.OperationalError:  # schema upgrades not applied yet
+        return None
+    return row[0] if row else None
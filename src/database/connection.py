@@ -0,0 +1,112 @@
+"""
+Shared SQLite connections
+Every component gets its connections here, so they all share WAL mode,
+the same pragmas and the same busy timeout:
+
+    read_connection()   per-thread connection, reused across calls
+    write_connection()  the process' single writer, one thread at a time
+
+In WAL mode readers never block the writer and the writer never blocks
+readers, so a collector, the enrichment pipeline and the dashboard can
+run at the same time; concurrent writers from other processes wait for
+the busy timeout instead of failing with "database is locked".
+"""
+from contextlib import contextmanager
+from urllib.request import pathname2url
+import sqlite3
+import threading
+import os
+
+DEFAULT_DB_PATH = 'data/threats.db'
+
+# Seconds a connection waits for another process' write lock
+BUSY_TIMEOUT = 30
+
+# Applied to every connection (journal_mode is stored in the file and
+# only needs setting once, by a writer)
+PRAGMAS = {
+    'synchronous': 'NORMAL',  # durable at checkpoints; safe with WAL
+    'cache_size': -65536,  # 64 MiB page cache per connection
+    'mmap_size': 268435456,  # read through a 256 MiB memory map
+    'temp_store': 'MEMORY'  # sorts and temp b-trees in memory
+}
+
+_local = threading.local()
+
+# db_path -> (pid, lock, connection)
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def connect(db_path=DEFAULT_DB_PATH, read_only=False, check_same_thread=True):
+    """
+    Open a new connection with the shared pragmas
+
+    Prefer read_connection() and write_connection(); this is for
+    connections with their own lifetime (worker processes, copies).
+
+    Args:
+        read_only: Open with mode=ro, so it can never take a write lock
+    """
+    if read_only:
+        uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT,
+                               check_same_thread=check_same_thread)
+    else:
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT,
+                               check_same_thread=check_same_thread)
+        conn.execute('PRAGMA journal_mode = WAL')
+
+    for pragma, value in PRAGMAS.items():
+        conn.execute(f'PRAGMA {pragma} = {value}')
+    return conn
+
+
+def read_connection(db_path=DEFAULT_DB_PATH):
+    """
+    This thread's reusable connection to db_path
+
+    Do not close it. Statements run outside a transaction, so every
+    query sees the latest committed data.
+    """
+    readers = getattr(_local, 'readers', None)
+    if readers is None or _local.pid != os.getpid():
+        readers = _local.readers = {}
+        _local.pid = os.getpid()
+
+    conn = readers.get(db_path)
+    if conn is None:
+        conn = readers[db_path] = connect(db_path)
+    return conn
+
+
+@contextmanager
+def write_connection(db_path=DEFAULT_DB_PATH):
+    """
+    Hold the process' writer connection to db_path
+
+    Threads take turns; the block's changes are committed when it exits
+    and rolled back if it raises. Do not close the connection.
+
+    Usage:
+        with write_connection(db_path) as conn:
+            conn.execute(...)
+    """
+    with _writers_lock:
+        entry = _writers.get(db_path)
+        if entry is None or entry[0] != os.getpid():  # not inherited across fork
+            entry = _writers[db_path] = (
+                os.getpid(), threading.RLock(), connect(db_path, check_same_thread=False)
+            )
+    _, lock, conn = entry
+
+    with lock:
+        row_factory = conn.row_factory  # nested blocks restore the outer one's
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.row_factory = row_factory
@@ -0,0 +1,310 @@
+"""
+Trigger-maintained daily rollups
+Incident and classification counts per discovery day, kept current by
+triggers on incidents and threat_classifications, so the dashboard,
+reports and CLI views sum O(days x categories) rows instead of grouping
+every incident on each render.
+
+    daily_incident_rollup  (day, severity, source_type) -> incident_count
+    daily_category_rollup  (day, severity, source_type, dimension,
+                            category, subcategory) -> classification_count
+
+dimension is 'tech', 'human' or 'procedural'; every classification is
+counted once per dimension, with a NULL category where the dimension
+did not match. Classifications take the day, severity and source type
+of their incident, so incident updates (e.g. severity scoring) move
+them too. Near-duplicate copies (canonical_incident_id set, schema
+version 5) are not counted.
+"""
+
+INCIDENT_ROLLUP = 'daily_incident_rollup'
+CATEGORY_ROLLUP = 'daily_category_rollup'
+
+DIMENSIONS = ('tech', 'human', 'procedural')
+
+# Rollup column -> expression over an incidents row
+INCIDENT_KEY = {
+    'day': 'DATE({ref}.date_discovered)',
+    'severity': '{ref}.severity',
+    'source_type': '{ref}.source_type'
+}
+
+CATEGORY_KEY = ('dimension', 'category', 'subcategory')
+
+# Incident columns that move an incident (and its classifications)
+# between rollup rows, or in and out of the counts
+TRACKED_INCIDENT_COLUMNS = ('incident_id', 'date_discovered', 'severity', 'source_type',
+                            'canonical_incident_id')
+
+# Condition for an incidents row ref to be counted
+COUNTED = '{ref}.canonical_incident_id IS NULL'
+
+# Classification columns that move a classification between rollup rows
+TRACKED_CLASSIFICATION_COLUMNS = ('incident_id',) + tuple(
+    f'{dimension}_{column}' for dimension in DIMENSIONS
+    for column in ('category', 'subcategory')
+)
+
+
+def _key_expressions(columns):
+    """COALESCE(col, '') expressions matching the unique key indexes"""
+    return ', '.join(f"COALESCE({column}, '')" for column in columns)
+
+
+def _incident_values(ref):
+    """Incident key expressions for incidents row ref"""
+    return [expression.format(ref=ref) for expression in INCIDENT_KEY.values()]
+
+
+def _incident_match(table, ref):
+    """WHERE clause matching the incident key of a rollup row against ref"""
+    return ' AND '.join(f"COALESCE({table}.{column}, '') = COALESCE({value}, '')"
+                        for column, value in zip(INCIDENT_KEY, _incident_values(ref)))
+
+
+def _category_match(dimension, ref):
+    """WHERE clause matching the category of a rollup row against ref's dimension"""
+    return (f"COALESCE({CATEGORY_ROLLUP}.category, '') = COALESCE({ref}.{dimension}_category, '') "
+            f"AND COALESCE({CATEGORY_ROLLUP}.subcategory, '') = COALESCE({ref}.{dimension}_subcategory, '')")
+
+
+def _category_insert(values, source, group_by=''):
+    """Upsert of classification counts for one dimension"""
+    columns = ', '.join(list(INCIDENT_KEY) + list(CATEGORY_KEY))
+    key = _key_expressions(list(INCIDENT_KEY) + list(CATEGORY_KEY))
+
+    return f'''
+        INSERT INTO {CATEGORY_ROLLUP} ({columns}, classification_count)
+        SELECT {values}
+        {source}
+        {group_by}
+        ON CONFLICT ({key}) DO UPDATE SET
+            classification_count = classification_count + excluded.classification_count;
+    '''
+
+
+def _incident_add(ref):
+    """Trigger statements counting incidents row ref (and its classifications) in"""
+    incident_values = ', '.join(_incident_values(ref))
+    statements = [f'''
+        INSERT INTO {INCIDENT_ROLLUP} ({', '.join(INCIDENT_KEY)}, incident_count)
+        VALUES ({incident_values}, 1)
+        ON CONFLICT ({_key_expressions(INCIDENT_KEY)})
+        DO UPDATE SET incident_count = incident_count + 1;
+    ''']
+
+    for dimension in DIMENSIONS:
+        statements.append(_category_insert(
+            f"{incident_values}, '{dimension}', {dimension}_category, {dimension}_subcategory, COUNT(*)",
+            f"FROM threat_classifications WHERE incident_id = {ref}.incident_id",
+            f"GROUP BY {_key_expressions([f'{dimension}_category', f'{dimension}_subcategory'])}"
+        ))
+
+    return '\n'.join(statements)
+
+
+def _incident_remove(ref):
+    """Trigger statements removing incidents row ref (and its classifications)"""
+    statements = [f'''
+        UPDATE {INCIDENT_ROLLUP} SET incident_count = incident_count - 1
+        WHERE {_incident_match(INCIDENT_ROLLUP, ref)};
+
+        DELETE FROM {INCIDENT_ROLLUP}
+        WHERE {_incident_match(INCIDENT_ROLLUP, ref)} AND incident_count = 0;
+    ''']
+
+    for dimension in DIMENSIONS:
+        statements.append(f'''
+        UPDATE {CATEGORY_ROLLUP} SET classification_count = classification_count - (
+            SELECT COUNT(*) FROM threat_classifications tc
+            WHERE tc.incident_id = {ref}.incident_id AND {_category_match(dimension, 'tc')}
+        )
+        WHERE {_incident_match(CATEGORY_ROLLUP, ref)} AND dimension = '{dimension}';
+        ''')
+
+    statements.append(f'''
+        DELETE FROM {CATEGORY_ROLLUP}
+        WHERE {_incident_match(CATEGORY_ROLLUP, ref)} AND classification_count = 0;
+    ''')
+    return '\n'.join(statements)
+
+
+def _classification_add(ref, counted):
+    """Trigger statements counting threat_classifications row ref in"""
+    incident_values = ', '.join(_incident_values('i'))
+    return '\n'.join(_category_insert(
+        f"{incident_values}, '{dimension}', {ref}.{dimension}_category, {ref}.{dimension}_subcategory, 1",
+        f"FROM incidents i WHERE i.incident_id = {ref}.incident_id AND {counted.format(ref='i')}"
+    ) for dimension in DIMENSIONS)
+
+
+def _classification_remove(ref, counted):
+    """Trigger statements removing threat_classifications row ref"""
+    # Scalar lookups of the incident key, so the unique key index applies
+    incident_key = ' AND '.join(
+        f"COALESCE({column}, '') = COALESCE((SELECT {expression.format(ref='i')} "
+        f"FROM incidents i WHERE i.incident_id = {ref}.incident_id), '')"
+        for column, expression in INCIDENT_KEY.items()
+    ) + (f" AND EXISTS (SELECT 1 FROM incidents i WHERE i.incident_id = {ref}.incident_id "
+         f"AND {counted.format(ref='i')})")
+
+    statements = [f'''
+        UPDATE {CATEGORY_ROLLUP} SET classification_count = classification_count - 1
+        WHERE {incident_key} AND dimension = '{dimension}' AND {_category_match(dimension, ref)};
+    ''' for dimension in DIMENSIONS]
+
+    statements.append(f'''
+        DELETE FROM {CATEGORY_ROLLUP}
+        WHERE {incident_key} AND classification_count = 0;
+    ''')
+    return '\n'.join(statements)
+
+
+def drop_daily_rollups(conn):
+    """Drop the rollup tables and their triggers (ensure_daily_rollups rebuilds them)"""
+    triggers = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND (name LIKE ? OR name LIKE ?)",
+        (f'{INCIDENT_ROLLUP}_after_%', f'{CATEGORY_ROLLUP}_after_%')
+    )]
+    for trigger in triggers:
+        conn.execute(f'DROP TRIGGER {trigger}')
+    conn.execute(f'DROP TABLE IF EXISTS {INCIDENT_ROLLUP}')
+    conn.execute(f'DROP TABLE IF EXISTS {CATEGORY_ROLLUP}')
+
+
+def ensure_daily_rollups(conn):
+    """
+    Create the rollup tables and their triggers if missing
+
+    Tables created here are back-filled from the existing incidents and
+    classifications in the same call, after which the triggers keep
+    them current. Before schema version 5 added near-duplicate links,
+    every incident is counted; that version rebuilds them.
+    """
+    cursor = conn.cursor()
+
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (INCIDENT_ROLLUP,)
+    ).fetchone()
+    if exists:
+        return
+
+    columns = {row[1] for row in cursor.execute('PRAGMA table_info(incidents)')}
+    if 'canonical_incident_id' in columns:
+        counted, tracked = COUNTED, TRACKED_INCIDENT_COLUMNS
+    else:
+        counted = '1'
+        tracked = tuple(column for column in TRACKED_INCIDENT_COLUMNS if column in columns)
+
+    cursor.execute(f'''
+    CREATE TABLE {INCIDENT_ROLLUP} (
+        day TEXT,  -- DATE(date_discovered)
+        severity TEXT,
+        source_type TEXT,
+        incident_count INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute(f'''
+    CREATE UNIQUE INDEX idx_{INCIDENT_ROLLUP}_key
+    ON {INCIDENT_ROLLUP}({_key_expressions(INCIDENT_KEY)})
+    ''')
+
+    cursor.execute(f'''
+    CREATE TABLE {CATEGORY_ROLLUP} (
+        day TEXT,  -- DATE(date_discovered) of the incident
+        severity TEXT,
+        source_type TEXT,
+        dimension TEXT NOT NULL,  -- 'tech', 'human', 'procedural'
+        category TEXT,
+        subcategory TEXT,
+        classification_count INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    cursor.execute(f'''
+    CREATE UNIQUE INDEX idx_{CATEGORY_ROLLUP}_key
+    ON {CATEGORY_ROLLUP}({_key_expressions(list(INCIDENT_KEY) + list(CATEGORY_KEY))})
+    ''')
+    # Per-dimension category totals (taxonomy page, reports)
+    cursor.execute(f'''
+    CREATE INDEX idx_{CATEGORY_ROLLUP}_category
+    ON {CATEGORY_ROLLUP}(dimension, category, subcategory, classification_count)
+    ''')
+
+    # Back-fill from the rows written before the tables existed
+    incident_values = _incident_values('incidents')
+    cursor.execute(f'''
+    INSERT INTO {INCIDENT_ROLLUP} ({', '.join(INCIDENT_KEY)}, incident_count)
+    SELECT {', '.join(incident_values)}, COUNT(*)
+    FROM incidents
+    WHERE {counted.format(ref='incidents')}
+    GROUP BY {_key_expressions(incident_values)}
+    ''')
+
+    incident_values = _incident_values('i')
+    for dimension in DIMENSIONS:
+        category = [f'tc.{dimension}_category', f'tc.{dimension}_subcategory']
+        cursor.execute(f'''
+        INSERT INTO {CATEGORY_ROLLUP}
+            ({', '.join(list(INCIDENT_KEY) + list(CATEGORY_KEY))}, classification_count)
+        SELECT {', '.join(incident_values)}, '{dimension}', {', '.join(category)}, COUNT(*)
+        FROM threat_classifications tc
+        JOIN incidents i ON i.incident_id = tc.incident_id
+        WHERE {counted.format(ref='i')}
+        GROUP BY {_key_expressions(incident_values + category)}
+        ''')
+
+    cursor.execute(f'''
+    CREATE TRIGGER {INCIDENT_ROLLUP}_after_insert AFTER INSERT ON incidents
+    WHEN {counted.format(ref='NEW')}
+    BEGIN
+        {_incident_add('NEW')}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER {INCIDENT_ROLLUP}_after_delete AFTER DELETE ON incidents
+    WHEN {counted.format(ref='OLD')}
+    BEGIN
+        {_incident_remove('OLD')}
+    END
+    ''')
+    # Separate remove and add triggers, so linking an incident to a
+    # canonical one (or unlinking it) only runs one side
+    cursor.execute(f'''
+    CREATE TRIGGER {INCIDENT_ROLLUP}_after_update_remove
+    AFTER UPDATE OF {', '.join(tracked)} ON incidents
+    WHEN {counted.format(ref='OLD')}
+    BEGIN
+        {_incident_remove('OLD')}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER {INCIDENT_ROLLUP}_after_update_add
+    AFTER UPDATE OF {', '.join(tracked)} ON incidents
+    WHEN {counted.format(ref='NEW')}
+    BEGIN
+        {_incident_add('NEW')}
+    END
+    ''')
+
+    cursor.execute(f'''
+    CREATE TRIGGER {CATEGORY_ROLLUP}_after_insert AFTER INSERT ON threat_classifications
+    BEGIN
+        {_classification_add('NEW', counted)}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER {CATEGORY_ROLLUP}_after_delete AFTER DELETE ON threat_classifications
+    BEGIN
+        {_classification_remove('OLD', counted)}
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER {CATEGORY_ROLLUP}_after_update
+    AFTER UPDATE OF {', '.join(TRACKED_CLASSIFICATION_COLUMNS)} ON threat_classifications
+    BEGIN
+        {_classification_remove('OLD', counted)}
+        {_classification_add('NEW', counted)}
+    END
+    ''')
+
+    conn.commit()
@@ -0,0 +1,106 @@
+"""
+SQL behind the dashboard pages
+The pages/ modules and benchmark_queries.py both read these, so the
+benchmark always times the statements the dashboard actually runs.
+Every query reads the trigger-maintained rollups and aggregates.
+"""
+
+# Overview and analytics KPIs
+TOTAL_INCIDENTS = 'SELECT COALESCE(SUM(incident_count), 0) as c FROM daily_incident_rollup'
+CRITICAL_INCIDENTS = ("SELECT COALESCE(SUM(incident_count), 0) as c FROM daily_incident_rollup "
+                      "WHERE severity='critical'")
+CLASSIFIED_INCIDENTS = ("SELECT COALESCE(SUM(classification_count), 0) as c FROM daily_category_rollup "
+                        "WHERE dimension='tech'")
+MITRE_TECHNIQUES = 'SELECT COUNT(DISTINCT technique_id) as c FROM mitre_technique_totals'
+TOTAL_MAPPINGS = 'SELECT COALESCE(SUM(mapping_count), 0) as c FROM mitre_technique_totals'
+
+# Overview charts
+TIMELINE = '''
+    SELECT day as date, SUM(incident_count) as count
+    FROM daily_incident_rollup WHERE day IS NOT NULL
+    GROUP BY day ORDER BY date
+'''
+SEVERITY_DISTRIBUTION = '''
+    SELECT severity, SUM(incident_count) as count FROM daily_incident_rollup
+    WHERE severity IS NOT NULL GROUP BY severity
+'''
+TOP_TECH_CATEGORIES = '''
+    SELECT category as tech_category, SUM(classification_count) as count FROM daily_category_rollup
+    WHERE dimension='tech' AND category IS NOT NULL GROUP BY category ORDER BY count DESC LIMIT 5
+'''
+TOP_TECHNIQUES = '''
+    SELECT technique_id, technique_name, incident_count as count
+    FROM mitre_technique_totals
+    ORDER BY count DESC LIMIT 3
+'''
+
+# MITRE page
+TECHNIQUE_HEATMAP = '''
+    SELECT tactic_name, technique_id, technique_name, SUM(mapping_count) as count
+    FROM mitre_technique_stats GROUP BY tactic_name, technique_id, technique_name
+    ORDER BY count DESC LIMIT 20
+'''
+
+
+def category_counts(dimension):
+    """Taxonomy page: classifications per category of one dimension"""
+    return (f"SELECT category as {dimension}_category, SUM(classification_count) as c "
+            f"FROM daily_category_rollup WHERE dimension='{dimension}' AND category IS NOT NULL "
+            f"GROUP BY category")
+
+
+# (page, query) pairs, in the order the pages issue them
+DASHBOARD_QUERIES = [
+    ('overview', TOTAL_INCIDENTS),
+    ('overview', CRITICAL_INCIDENTS),
+    ('overview', CLASSIFIED_INCIDENTS),
+    ('overview', MITRE_TECHNIQUES),
+    ('overview', TIMELINE),
+    ('overview', SEVERITY_DISTRIBUTION),
+    ('overview', TOP_TECH_CATEGORIES),
+    ('overview', TOP_TECHNIQUES),
+    ('mitre', TECHNIQUE_HEATMAP),
+] + [
+    ('taxonomy', category_counts(dimension)) for dimension in ('tech', 'human', 'procedural')
+] + [
+    ('analytics', TOTAL_INCIDENTS),
+    ('analytics', TOTAL_MAPPINGS)
+]
+
+# What each query ran against the base tables before the version 2
+# indexes, the MITRE aggregates and the daily rollups; the benchmark
+# times these on an unmigrated copy as its baseline
+ORIGINAL_QUERIES = {
+    TOTAL_INCIDENTS: 'SELECT COUNT(*) as c FROM incidents',
+    CRITICAL_INCIDENTS: "SELECT COUNT(*) as c FROM incidents WHERE severity='critical'",
+    CLASSIFIED_INCIDENTS: 'SELECT COUNT(DISTINCT incident_id) as c FROM threat_classifications',
+    MITRE_TECHNIQUES: 'SELECT COUNT(DISTINCT technique_id) as c FROM mitre_mappings',
+    TOTAL_MAPPINGS: 'SELECT COUNT(*) as c FROM mitre_mappings',
+    TIMELINE: '''
+        SELECT DATE(date_discovered) as date, COUNT(*) as count
+        FROM incidents WHERE date_discovered IS NOT NULL
+        GROUP BY DATE(date_discovered) ORDER BY date
+    ''',
+    SEVERITY_DISTRIBUTION: '''
+        SELECT severity, COUNT(*) as count FROM incidents
+        WHERE severity IS NOT NULL GROUP BY severity
+    ''',
+    TOP_TECH_CATEGORIES: '''
+        SELECT tech_category, COUNT(*) as count FROM threat_classifications
+        WHERE tech_category IS NOT NULL GROUP BY tech_category ORDER BY count DESC LIMIT 5
+    ''',
+    TOP_TECHNIQUES: '''
+        SELECT technique_id, technique_name, COUNT(DISTINCT incident_id) as count
+        FROM mitre_mappings GROUP BY technique_id, technique_name
+        ORDER BY count DESC LIMIT 3
+    ''',
+    TECHNIQUE_HEATMAP: '''
+        SELECT tactic_name, technique_id, technique_name, COUNT(*) as count
+        FROM mitre_mappings GROUP BY tactic_name, technique_id, technique_name
+        ORDER BY count DESC LIMIT 20
+    ''',
+    **{category_counts(dimension): f'''
+        SELECT {dimension}_category, COUNT(*) as c FROM threat_classifications
+        WHERE {dimension}_category IS NOT NULL GROUP BY {dimension}_category
+    ''' for dimension in ('tech', 'human', 'procedural')}
+}
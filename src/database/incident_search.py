@@ -0,0 +1,225 @@
+"""
+Full-text search over incidents
+An FTS5 index on incidents.title and incidents.description, stored as an
+external-content table (the text lives only in incidents) and kept in
+sync by triggers. Searches are ranked with BM25, title matches weighing
+more than description matches, and return highlighted snippets a page
+at a time.
+
+    python src/database/incident_search.py "credential stuffing"
+"""
+import argparse
+import re
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.database.connection import read_connection, write_connection
+
+FTS_TABLE = 'incidents_fts'
+
+# BM25 column weights (title, description)
+RANK = 'bm25(10.0, 1.0)'
+
+# Snippet highlight markers; control characters never occur in feed text
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+# "quoted phrase", bare word or word* prefix
+_TERM = re.compile(r'"([^"]*)"|(\S+)')
+
+# Broad queries rank only this many of their most recently collected
+# matches; older matches follow newest first. Scoring every match of a
+# term found in most incidents would cost seconds on millions of rows.
+RANK_WINDOW = 10000
+
+
+def _search_sql(where, order):
+    """Result page query over the matches satisfying an extra rowid condition"""
+    return f'''
+        SELECT
+            i.incident_id,
+            i.title,
+            i.date_discovered,
+            i.severity,
+            i.source_type,
+            i.source_url,
+            highlight({FTS_TABLE}, 0, ?, ?) as title_highlight,
+            snippet({FTS_TABLE}, 1, ?, ?, '…', 24) as snippet
+        FROM {FTS_TABLE}
+        JOIN incidents i ON i.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH ? AND {FTS_TABLE}.rowid {where}
+        ORDER BY {order}
+        LIMIT ? OFFSET ?
+    '''
+
+
+RANKED_SQL = _search_sql('>= ?', f'{FTS_TABLE}.rank')
+RECENT_SQL = _search_sql('< ?', f'{FTS_TABLE}.rowid DESC')
+
+
+def ensure_incident_search(conn):
+    """
+    Create the FTS index and its triggers if missing
+
+    A new index is built from the existing incidents in the same call,
+    after which the triggers keep it current.
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+    ).fetchone()
+    if exists:
+        return
+
+    conn.execute(f'''
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, description,
+        content='incidents', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    ''')
+    conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', ?)", (RANK,))
+
+    # External content: deletes must pass the old text so its terms can
+    # be removed. Updates of other columns (severity, subsector, ...)
+    # leave the index alone.
+    conn.execute(f'''
+    CREATE TRIGGER {FTS_TABLE}_after_insert AFTER INSERT ON incidents
+    BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (NEW.id, NEW.title, NEW.description);
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER {FTS_TABLE}_after_delete AFTER DELETE ON incidents
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', OLD.id, OLD.title, OLD.description);
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER {FTS_TABLE}_after_update AFTER UPDATE OF title, description ON incidents
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', OLD.id, OLD.title, OLD.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (NEW.id, NEW.title, NEW.description);
+    END
+    ''')
+
+    # Back-fill from the incidents stored before the index existed
+    conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    conn.commit()
+
+
+def fts_query(text):
+    """
+    Turn search box input into an FTS5 query
+
+    Every word must match; "quoted text" matches as a phrase and a
+    trailing * matches a prefix (bank* -> banking, banks). Everything is
+    quoted, so FTS5 operators and punctuation in the input are plain text.
+
+    Returns:
+        FTS5 query string, '' if there is nothing to search for
+    """
+    terms = []
+    for phrase, word in _TERM.findall(text or ''):
+        term = phrase if phrase else word
+        prefix = not phrase and term.endswith('*')
+        term = term.rstrip('*').strip() if prefix else term.strip()
+        if not re.search(r'\w', term):
+            continue
+        terms.append('"' + term.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def search_incidents(query, page=1, page_size=20, db_path='data/threats.db',
+                     start=MATCH_START, end=MATCH_END):
+    """
+    Search incident titles and descriptions
+
+    Args:
+        query: Search box text (see fts_query)
+        page: 1-based page number
+        page_size: Results per page
+        start, end: Markers around matched terms in title_highlight and snippet
+
+    Returns:
+        dict with query, total (matching incidents), page, page_size and
+        results (dicts, best match first)
+    """
+    page = max(int(page), 1)
+    match = fts_query(query)
+    response = {'query': query, 'total': 0, 'page': page, 'page_size': page_size, 'results': []}
+    if not match:
+        return response
+
+    conn = read_connection(db_path)
+    response['total'] = conn.execute(
+        f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?', (match,)
+    ).fetchone()[0]
+    if response['total'] == 0:
+        return response
+
+    # Lowest rowid inside the ranked window (0: every match is ranked)
+    window_start = 0
+    if response['total'] > RANK_WINDOW:
+        window_start = conn.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ? '
+            f'ORDER BY rowid DESC LIMIT 1 OFFSET ?', (match, RANK_WINDOW - 1)
+        ).fetchone()[0]
+    ranked = min(response['total'], RANK_WINDOW)
+
+    offset = (page - 1) * page_size
+    markers = (start, end, start, end, match)
+    rows = []
+    if offset < ranked:
+        rows = conn.execute(RANKED_SQL, markers + (window_start, page_size, offset)).fetchall()
+    if len(rows) < page_size and response['total'] > ranked:
+        rows += conn.execute(RECENT_SQL, markers + (
+            window_start, page_size - len(rows), max(offset - ranked, 0)
+        )).fetchall()
+
+    columns = ('incident_id', 'title', 'date_discovered', 'severity', 'source_type',
+               'source_url', 'title_highlight', 'snippet')
+    response['results'] = [dict(zip(columns, row)) for row in rows]
+    return response
+
+
+def rebuild_index(db_path='data/threats.db'):
+    """Rebuild the index from incidents and merge its segments"""
+    with write_connection(db_path) as conn:
+        ensure_incident_search(conn)
+        conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Full-text search over incidents")
+    parser.add_argument('query', nargs='?', default='')
+    parser.add_argument('--db', default='data/threats.db')
+    parser.add_argument('--page', type=int, default=1)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Rebuild and optimize the index first")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        started = time.perf_counter()
+        rebuild_index(args.db)
+        print(f"🗂️  Search index rebuilt in {time.perf_counter() - started:.2f}s")
+
+    if args.query:
+        started = time.perf_counter()
+        response = search_incidents(args.query, args.page, args.page_size, args.db,
+                                    start='[', end=']')
+        elapsed = (time.perf_counter() - started) * 1000
+
+        print(f"\n🔎 {response['total']} incidents match {args.query!r} "
+              f"(page {response['page']}, {elapsed:.1f}ms)\n")
+        for result in response['results']:
+            print(f"  [{result['severity'] or '-':>8}] {result['date_discovered']}  "
+                  f"{result['title_highlight'][:90]}")
+            print(f"             {' '.join((result['snippet'] or '').split())[:110]}")
@@ -0,0 +1,167 @@
+"""
+Trigger-maintained MITRE ATT&CK aggregates
+Keeps per-technique and per-tactic mapping counts, distinct incident
+counts and confidence sums up to date on every insert, update and delete
+of mitre_mappings, so the Navigator layer, the MITRE page and the charts
+read O(techniques) rows instead of grouping every mapping.
+
+    mitre_technique_stats   (technique_id, technique_name, tactic_id, tactic_name)
+    mitre_technique_totals  (technique_id, technique_name)
+    mitre_tactic_stats      (tactic_id, tactic_name)
+
+Each has a <name>_incidents companion holding per-incident reference
+counts, which is what makes the distinct incident count exact.
+"""
+
+# Aggregate table -> mitre_mappings columns it groups by
+AGGREGATES = {
+    'mitre_technique_stats': ('technique_id', 'technique_name', 'tactic_id', 'tactic_name'),
+    'mitre_technique_totals': ('technique_id', 'technique_name'),
+    'mitre_tactic_stats': ('tactic_id', 'tactic_name')
+}
+
+# Mapping columns that move a row between groups or change its confidence
+TRACKED_COLUMNS = ('incident_id', 'technique_id', 'technique_name',
+                   'tactic_id', 'tactic_name', 'confidence')
+
+
+def _key_expressions(columns):
+    """COALESCE(col, '') expressions matching the unique key indexes"""
+    return ', '.join(f"COALESCE({column}, '')" for column in columns)
+
+
+def _key_match(columns, ref):
+    """WHERE clause matching a group key against the NEW or OLD row"""
+    return ' AND '.join(f"COALESCE({column}, '') = COALESCE({ref}.{column}, '')"
+                        for column in columns)
+
+
+def _add_statements(table, columns, ref):
+    """Trigger statements counting mapping row ref (NEW) into table"""
+    incidents = f'{table}_incidents'
+    column_list = ', '.join(columns)
+    values = ', '.join(f'{ref}.{column}' for column in columns)
+
+    return f'''
+        INSERT INTO {incidents} ({column_list}, incident_id, mapping_count)
+        VALUES ({values}, {ref}.incident_id, 1)
+        ON CONFLICT ({_key_expressions(columns)}, incident_id)
+        DO UPDATE SET mapping_count = mapping_count + 1;
+
+        INSERT INTO {table} ({column_list}, mapping_count, incident_count, confidence_sum)
+        VALUES ({values}, 1,
+                (SELECT mapping_count = 1 FROM {incidents}
+                 WHERE {_key_match(columns, ref)} AND incident_id = {ref}.incident_id),
+                COALESCE({ref}.confidence, 0))
+        ON CONFLICT ({_key_expressions(columns)}) DO UPDATE SET
+            mapping_count = mapping_count + 1,
+            incident_count = incident_count + excluded.incident_count,
+            confidence_sum = confidence_sum + excluded.confidence_sum;
+    '''
+
+
+def _remove_statements(table, columns, ref):
+    """Trigger statements removing mapping row ref (OLD) from table"""
+    incidents = f'{table}_incidents'
+
+    return f'''
+        UPDATE {incidents} SET mapping_count = mapping_count - 1
+        WHERE {_key_match(columns, ref)} AND incident_id = {ref}.incident_id;
+
+        UPDATE {table} SET
+            mapping_count = mapping_count - 1,
+            incident_count = incident_count - (
+                SELECT COUNT(*) FROM {incidents}
+                WHERE {_key_match(columns, ref)}
+                AND incident_id = {ref}.incident_id AND mapping_count = 0
+            ),
+            confidence_sum = confidence_sum - COALESCE({ref}.confidence, 0)
+        WHERE {_key_match(columns, ref)};
+
+        DELETE FROM {incidents}
+        WHERE {_key_match(columns, ref)} AND incident_id = {ref}.incident_id
+        AND mapping_count = 0;
+
+        DELETE FROM {table} WHERE {_key_match(columns, ref)} AND mapping_count = 0;
+    '''
+
+
+def ensure_mitre_aggregates(conn):
+    """
+    Create the aggregate tables and their triggers if missing
+
+    Tables created here are back-filled from the existing mappings in
+    the same call, after which the triggers keep them current.
+    """
+    cursor = conn.cursor()
+
+    for table, columns in AGGREGATES.items():
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        if exists:
+            continue
+
+        column_defs = ', '.join(f'{column} TEXT' for column in columns)
+        column_list = ', '.join(columns)
+
+        cursor.execute(f'''
+        CREATE TABLE {table} (
+            {column_defs},
+            mapping_count INTEGER NOT NULL DEFAULT 0,
+            incident_count INTEGER NOT NULL DEFAULT 0,  -- distinct incidents
+            confidence_sum REAL NOT NULL DEFAULT 0
+        )
+        ''')
+        cursor.execute(f'''
+        CREATE UNIQUE INDEX idx_{table}_key ON {table}({_key_expressions(columns)})
+        ''')
+
+        cursor.execute(f'''
+        CREATE TABLE {table}_incidents (
+            {column_defs},
+            incident_id TEXT NOT NULL,
+            mapping_count INTEGER NOT NULL DEFAULT 0
+        )
+        ''')
+        cursor.execute(f'''
+        CREATE UNIQUE INDEX idx_{table}_incidents_key
+        ON {table}_incidents({_key_expressions(columns)}, incident_id)
+        ''')
+
+        # Back-fill from the mappings written before the table existed
+        cursor.execute(f'''
+        INSERT INTO {table}_incidents ({column_list}, incident_id, mapping_count)
+        SELECT {column_list}, incident_id, COUNT(*)
+        FROM mitre_mappings
+        GROUP BY {_key_expressions(columns)}, incident_id
+        ''')
+        cursor.execute(f'''
+        INSERT INTO {table} ({column_list}, mapping_count, incident_count, confidence_sum)
+        SELECT {column_list}, COUNT(*), COUNT(DISTINCT incident_id), SUM(COALESCE(confidence, 0))
+        FROM mitre_mappings
+        GROUP BY {_key_expressions(columns)}
+        ''')
+
+        cursor.execute(f'''
+        CREATE TRIGGER {table}_after_insert AFTER INSERT ON mitre_mappings
+        BEGIN
+            {_add_statements(table, columns, 'NEW')}
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER {table}_after_delete AFTER DELETE ON mitre_mappings
+        BEGIN
+            {_remove_statements(table, columns, 'OLD')}
+        END
+        ''')
+        cursor.execute(f'''
+        CREATE TRIGGER {table}_after_update
+        AFTER UPDATE OF {', '.join(TRACKED_COLUMNS)} ON mitre_mappings
+        BEGIN
+            {_remove_statements(table, columns, 'OLD')}
+            {_add_statements(table, columns, 'NEW')}
+        END
+        ''')
+
+    conn.commit()
@@ -1,7 +1,216 @@
 import sqlite3
 from datetime import datetime
+import sys
 import os
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.database.change_counters import ensure_change_counter
+from src.database.connection import connect, write_connection
+from src.database.daily_rollups import drop_daily_rollups, ensure_daily_rollups
+from src.database.incident_search import ensure_incident_search
+from src.database.mitre_aggregates import ensure_mitre_aggregates
+from src.database.near_duplicates import ensure_near_duplicate_index
+from src.database.snapshot_changes import ensure_snapshot_change_log
+
+def add_column_if_missing(conn, table, column, declaration):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists"""
+    columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+    if column not in columns:
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {declaration}')
+
+def _migrate_baseline(conn):
+    """
+    Version 1: every addition made before schema versioning
+    
+    Databases from those releases may have any subset of these, so
+    each statement is idempotent.
+    """
+    cursor = conn.cursor()
+    
+    # Per-stage processing watermarks (last incidents.id each stage has seen)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS processing_watermarks (
+        stage TEXT PRIMARY KEY,  -- 'classification', 'mitre_mapping', ...
+        last_incident_rowid INTEGER NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    # CVSS base score used by severity scoring
+    add_column_if_missing(conn, 'incidents', 'cvss_score', 'REAL')
+    
+    # Classification cache keys (text hash + taxonomy fingerprints)
+    for column in ('text_hash', 'tech_taxonomy_hash',
+                   'human_taxonomy_hash', 'procedural_taxonomy_hash'):
+        add_column_if_missing(conn, 'threat_classifications', column, 'TEXT')
+    
+    # Inverted index: word token -> incidents containing it
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS index_terms (
+        term_id INTEGER PRIMARY KEY,
+        term TEXT UNIQUE NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS term_postings (
+        term_id INTEGER NOT NULL,
+        incident_rowid INTEGER NOT NULL,  -- incidents.id
+        PRIMARY KEY (term_id, incident_rowid)
+    ) WITHOUT ROWID
+    ''')
+    
+    # Taxonomy as last applied to the stored classifications
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS taxonomy_snapshots (
+        dimension TEXT PRIMARY KEY,  -- 'tech', 'human', 'procedural'
+        fingerprint TEXT NOT NULL,
+        taxonomy_json TEXT NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    # Per-subsector filters and group-bys
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_incidents_subsector
+    ON incidents(subsector)
+    ''')
+    
+    # Pending-work probes look up results by incident_id
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_threat_classifications_incident_id
+    ON threat_classifications(incident_id)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_mitre_mappings_incident_id
+    ON mitre_mappings(incident_id)
+    ''')
+    
+    # One mapping per (incident, technique, sub-technique). Duplicates
+    # written before the key existed collapse into the oldest row, which
+    # keeps the highest confidence of the group.
+    has_mapping_key = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_mitre_mappings_unique'"
+    ).fetchone()
+    if not has_mapping_key:
+        cursor.execute('''
+        UPDATE mitre_mappings SET confidence = (
+            SELECT MAX(dup.confidence) FROM mitre_mappings dup
+            WHERE dup.incident_id = mitre_mappings.incident_id
+            AND dup.technique_id IS mitre_mappings.technique_id
+            AND COALESCE(dup.sub_technique_id, '') = COALESCE(mitre_mappings.sub_technique_id, '')
+        )
+        ''')
+        cursor.execute('''
+        DELETE FROM mitre_mappings WHERE id NOT IN (
+            SELECT MIN(id) FROM mitre_mappings
+            GROUP BY incident_id, technique_id, COALESCE(sub_technique_id, '')
+        )
+        ''')
+        cursor.execute('''
+        CREATE UNIQUE INDEX idx_mitre_mappings_unique
+        ON mitre_mappings(incident_id, technique_id, COALESCE(sub_technique_id, ''))
+        ''')
+    
+    # Cache keys for analytics and reports derived from these tables
+    ensure_change_counter(conn, 'mitre_mappings')
+    ensure_change_counter(conn, 'incidents')
+    
+    conn.commit()
+    
+    # Technique/tactic aggregates behind the MITRE charts and Navigator
+    ensure_mitre_aggregates(conn)
+
+def _migrate_access_path_indexes(conn):
+    """Version 2: covering indexes for dashboard and stage access paths"""
+    for name, definition in ACCESS_PATH_INDEXES.items():
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {definition}')
+    
+    # Redundant with the unique (incident_id, technique_id, ...) key,
+    # which serves the same lookups; one less index to maintain per write
+    conn.execute('DROP INDEX IF EXISTS idx_mitre_mappings_incident_id')
+
+def _migrate_incident_search(conn):
+    """Version 3: FTS5 full-text index over incident titles and descriptions"""
+    ensure_incident_search(conn)
+
+def _migrate_daily_rollups(conn):
+    """Version 4: trigger-maintained daily incident and classification rollups"""
+    ensure_daily_rollups(conn)
+
+def _migrate_near_duplicates(conn):
+    """Version 5: near-duplicate links and LSH buckets; rollups skip linked copies"""
+    ensure_near_duplicate_index(conn)
+    
+    # Rollups built by version 4 count every incident; rebuild them
+    drop_daily_rollups(conn)
+    ensure_daily_rollups(conn)
+
+def _migrate_raw_bodies(conn):
+    """Version 6: compressed original bodies of incidents cleaned at ingest"""
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS incident_raw_bodies (
+        incident_id TEXT PRIMARY KEY,  -- incidents.incident_id
+        body BLOB NOT NULL  -- zlib-compressed original HTML
+    )
+    ''')
+
+def _migrate_snapshot_changes(conn):
+    """Version 7: partitions of the Parquet snapshot changed since it was written"""
+    ensure_snapshot_change_log(conn)
+
+# Secondary indexes added by version 2 (name -> table(columns))
+ACCESS_PATH_INDEXES = {
+    # Date-ordered exports and date range filters
+    'idx_incidents_date_discovered': 'incidents(date_discovered)',
+    # Per-source filters and counts, newest first
+    'idx_incidents_source_type': 'incidents(source_type, date_discovered)',
+    # Technique -> incidents, with confidence for per-technique averages
+    'idx_mitre_mappings_technique': 'mitre_mappings(technique_id, incident_id, confidence)'
+}
+
+# Schema migrations in order. PRAGMA user_version holds the last one
+# applied; append new ones with the next version number.
+MIGRATIONS = [
+    (1, "Watermarks, cache keys, keyword index, mapping key, MITRE aggregates", _migrate_baseline),
+    (2, "Covering indexes for dashboard and stage access paths", _migrate_access_path_indexes),
+    (3, "Full-text search index over incidents", _migrate_incident_search),
+    (4, "Daily incident and classification rollups", _migrate_daily_rollups),
+    (5, "Near-duplicate incident links", _migrate_near_duplicates),
+    (6, "Compressed raw incident bodies", _migrate_raw_bodies),
+    (7, "Changed partitions of the Parquet snapshot", _migrate_snapshot_changes)
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(conn):
+    """Schema version recorded in the database (0 if never migrated)"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def ensure_schema_upgrades(conn):
+    """
+    Apply the migrations a database has not seen yet
+    
+    Cheap on an up-to-date database (one PRAGMA read), so it is safe to
+    call on every run. A migration interrupted halfway is idempotent and
+    simply re-runs, because the version is only bumped once it commits.
+    """
+    version = schema_version(conn)
+    
+    for target, description, migrate in MIGRATIONS:
+        if target <= version:
+            continue
+        migrate(conn)
+        conn.execute(f'PRAGMA user_version = {target}')
+        conn.commit()
+        print(f"🛠️  Schema migrated to version {target}: {description}")
+
+def upgrade_database(db_path='data/threats.db'):
+    """Migrate an existing database file in place (no-op if missing)"""
+    if not os.path.exists(db_path):
+        return
+    with write_connection(db_path) as conn:
+        ensure_schema_upgrades(conn)
+
 class ThreatDatabase:
     """Database manager for FinTech threat taxonomy"""
     
@@ -16,7 +225,7 @@ class ThreatDatabase:
     
     def connect(self):
         """Connect to SQLite database"""
-        self.conn = sqlite3.connect(self.db_path)
+        self.conn = connect(self.db_path)
         self.conn.row_factory = sqlite3.Row  # Enable column access by name
         return self.conn
     
@@ -50,6 +259,7 @@ class ThreatDatabase:
             -- Status
             status TEXT DEFAULT 'active',  -- 'active', 'resolved', 'ongoing'
             severity TEXT,  -- 'critical', 'high', 'medium', 'low'
+            cvss_score REAL,  -- CVSS base score when the source provides one
             
             -- Metadata
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -83,6 +293,13 @@ class ThreatDatabase:
             classification_method TEXT,  -- 'automated', 'manual', 'hybrid'
             confidence_score REAL,
             
+            -- Cache keys: hash of the classified text and fingerprints of the
+            -- taxonomy sections that produced the labels
+            text_hash TEXT,
+            tech_taxonomy_hash TEXT,
+            human_taxonomy_hash TEXT,
+            procedural_taxonomy_hash TEXT,
+            
             FOREIGN KEY (incident_id) REFERENCES incidents(incident_id)
         )
         ''')
@@ -173,6 +390,8 @@ class ThreatDatabase:
         ''')
         
         self.conn.commit()
+        
+        ensure_schema_upgrades(self.conn)
         print("Database tables created successfully!")
         
     def close(self):
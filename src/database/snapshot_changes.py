@@ -0,0 +1,106 @@
+"""
+Changed partitions of the Parquet snapshot
+The snapshot appends incidents past its watermark; rows that change after
+they were written (re-classification, severity and subsector back-fills,
+mapping merges, near-duplicate links, archiving) are found here instead.
+Triggers on the snapshotted tables record the (month, source_type)
+partition of every changed incident with an increasing change number,
+and each snapshot rewrites the partitions changed since the number in
+its manifest.
+
+Only incidents every enrichment stage has processed are recorded: the
+snapshot has not written newer ones yet, and appends them once the last
+stage is done with them, so enriching new incidents marks nothing.
+"""
+
+CHANGE_TABLE = 'snapshot_changed_partitions'
+
+# Tables whose rows the Parquet snapshot writes, with the incident they belong to
+TRACKED_TABLES = ('threat_classifications', 'mitre_mappings',
+                  'regulatory_impact', 'financial_impact')
+
+# Watermark stages of the enrichers (ENRICHERS in enrichment_pipeline.py,
+# which imports from this package). A stage missing here only means more
+# partitions get rewritten than needed.
+ENRICHER_STAGES = ('classification', 'mitre_mapping', 'severity', 'subsector')
+
+# How far every enrichment stage has got; snapshots never go past it
+_PROCESSED = f'''
+    SELECT MIN(last_incident_rowid) FROM processing_watermarks
+    WHERE stage IN ({', '.join(f"'{stage}'" for stage in ENRICHER_STAGES)})
+'''
+
+# Partition keys are stored as '' for NULL (primary key columns)
+_PARTITION = "COALESCE(strftime('%Y-%m', {ref}.date_discovered), ''), COALESCE({ref}.source_type, '')"
+
+
+def _record(source, where):
+    """Statement recording the partitions of the incidents source/where select"""
+    return f'''
+        INSERT INTO {CHANGE_TABLE} (month, source_type, change)
+        SELECT {_PARTITION.format(ref='i')},
+               (SELECT COALESCE(MAX(change), 0) + 1 FROM {CHANGE_TABLE})
+        FROM {source} i
+        WHERE {where} AND i.id <= ({_PROCESSED})
+        ON CONFLICT(month, source_type) DO UPDATE SET change = excluded.change;
+    '''
+
+
+def ensure_snapshot_change_log(conn):
+    """Create the changed-partition table and its triggers if missing"""
+    conn.execute(f'''
+    CREATE TABLE IF NOT EXISTS {CHANGE_TABLE} (
+        month TEXT NOT NULL,  -- strftime('%Y-%m', date_discovered), '' if none
+        source_type TEXT NOT NULL,  -- '' if none
+        change INTEGER NOT NULL,  -- increases with every recorded change
+        PRIMARY KEY (month, source_type)
+    ) WITHOUT ROWID
+    ''')
+
+    # An update can move an incident between partitions: record both
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {CHANGE_TABLE}_incident_update AFTER UPDATE ON incidents
+    BEGIN
+        {_record('(SELECT OLD.id AS id, OLD.date_discovered AS date_discovered, '
+                 'OLD.source_type AS source_type)', '1')}
+        {_record('(SELECT NEW.id AS id, NEW.date_discovered AS date_discovered, '
+                 'NEW.source_type AS source_type)', '1')}
+    END
+    ''')
+    conn.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS {CHANGE_TABLE}_incident_delete AFTER DELETE ON incidents
+    BEGIN
+        {_record('(SELECT OLD.id AS id, OLD.date_discovered AS date_discovered, '
+                 'OLD.source_type AS source_type)', '1')}
+    END
+    ''')
+
+    for table in TRACKED_TABLES:
+        for event, ref in (('insert', 'NEW'), ('update', 'NEW'), ('delete', 'OLD')):
+            conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {CHANGE_TABLE}_{table}_{event}
+            AFTER {event.upper()} ON {table}
+            BEGIN
+                {_record('incidents', f'i.incident_id = {ref}.incident_id')}
+            END
+            ''')
+
+
+def changed_partitions(conn, after):
+    """
+    Partitions changed since change number after
+
+    Returns:
+        (last change number, [(month, source_type), ...]) with '' for
+        partition keys the incident did not have
+    """
+    partitions = conn.execute(
+        f'SELECT month, source_type FROM {CHANGE_TABLE} WHERE change > ?', (after,)
+    ).fetchall()
+    last = conn.execute(f'SELECT COALESCE(MAX(change), 0) FROM {CHANGE_TABLE}').fetchone()[0]
+    return last, partitions
+
+
+def processed_through(conn):
+    """Last incidents.id every enrichment stage has processed; later changes are recorded up to it"""
+    return conn.execute(_PROCESSED).fetchone()[0] or 0
@@ -1,9 +1,13 @@
-import sqlite3
 import pandas as pd
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.database.connection import read_connection
 
 def view_classifications():
     """Display classification results"""
-    conn = sqlite3.connect('data/threats.db')
+    conn = read_connection()
     
     print("\n" + "=" * 70)
     print("🧠 THREAT CLASSIFICATION ANALYSIS")
@@ -14,12 +18,12 @@ def view_classifications():
     print("-" * 70)
     df_tech = pd.read_sql_query('''
         SELECT 
-            tech_category,
-            tech_subcategory,
-            COUNT(*) as count
-        FROM threat_classifications
-        WHERE tech_category IS NOT NULL
-        GROUP BY tech_category, tech_subcategory
+            category as tech_category,
+            subcategory as tech_subcategory,
+            SUM(classification_count) as count
+        FROM daily_category_rollup
+        WHERE dimension = 'tech' AND category IS NOT NULL
+        GROUP BY category, subcategory
         ORDER BY count DESC
         LIMIT 10
     ''', conn)
@@ -30,12 +34,12 @@ def view_classifications():
     print("-" * 70)
     df_human = pd.read_sql_query('''
         SELECT 
-            human_category,
-            human_subcategory,
-            COUNT(*) as count
-        FROM threat_classifications
-        WHERE human_category IS NOT NULL
-        GROUP BY human_category, human_subcategory
+            category as human_category,
+            subcategory as human_subcategory,
+            SUM(classification_count) as count
+        FROM daily_category_rollup
+        WHERE dimension = 'human' AND category IS NOT NULL
+        GROUP BY category, subcategory
         ORDER BY count DESC
         LIMIT 10
     ''', conn)
@@ -46,12 +50,12 @@ def view_classifications():
     print("-" * 70)
     df_proc = pd.read_sql_query('''
         SELECT 
-            procedural_category,
-            procedural_subcategory,
-            COUNT(*) as count
-        FROM threat_classifications
-        WHERE procedural_category IS NOT NULL
-        GROUP BY procedural_category, procedural_subcategory
+            category as procedural_category,
+            subcategory as procedural_subcategory,
+            SUM(classification_count) as count
+        FROM daily_category_rollup
+        WHERE dimension = 'procedural' AND category IS NOT NULL
+        GROUP BY category, subcategory
         ORDER BY count DESC
         LIMIT 10
     ''', conn)
@@ -74,8 +78,6 @@ def view_classifications():
     ''', conn)
     print(df_sample.to_string(index=False))
     
-    conn.close()
-    
     print("\n" + "=" * 70)
 
 if __name__ == "__main__":
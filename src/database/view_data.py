@@ -1,10 +1,14 @@
-import sqlite3
 import pandas as pd
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.database.connection import read_connection
 
 def view_summary():
     """Display database summary statistics"""
     # FIX: Use relative path from project root
-    conn = sqlite3.connect('data/threats.db')  # Changed from ../../data/threats.db
+    conn = read_connection()
     
     # Total incidents by source
     print("\n📊 INCIDENTS BY SOURCE TYPE")
@@ -12,9 +16,10 @@ def view_summary():
     df_sources = pd.read_sql_query('''
         SELECT 
             source_type,
-            COUNT(*) as count,
-            AVG(CASE WHEN severity = 'critical' THEN 1 ELSE 0 END) * 100 as pct_critical
-        FROM incidents
+            SUM(incident_count) as count,
+            SUM(CASE WHEN severity = 'critical' THEN incident_count ELSE 0 END) * 100.0
+                / SUM(incident_count) as pct_critical
+        FROM daily_incident_rollup
         GROUP BY source_type
         ORDER BY count DESC
     ''', conn)
@@ -42,8 +47,8 @@ def view_summary():
     df_severity = pd.read_sql_query('''
         SELECT 
             severity,
-            COUNT(*) as count
-        FROM incidents
+            SUM(incident_count) as count
+        FROM daily_incident_rollup
         WHERE severity IS NOT NULL
         GROUP BY severity
         ORDER BY 
@@ -56,8 +61,6 @@ def view_summary():
     ''', conn)
     print(df_severity.to_string(index=False))
     
-    conn.close()
-    
     print("\n" + "=" * 60)
     print("💡 Database location: data/threats.db")
     print("=" * 60 + "\n")
@@ -1,9 +1,14 @@
-import sqlite3
 import pandas as pd
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.analytics.duckdb_engine import analytics_query
+from src.database.connection import read_connection
 
 def view_mitre_analysis():
     """Display MITRE ATT&CK mapping analysis"""
-    conn = sqlite3.connect('data/threats.db')
+    conn = read_connection()
     
     print("\n" + "=" * 80)
     print("🎯 MITRE ATT&CK MAPPING ANALYSIS - FINTECH THREATS")
@@ -16,10 +21,10 @@ def view_mitre_analysis():
         SELECT 
             tactic_id,
             tactic_name,
-            COUNT(DISTINCT incident_id) as incidents,
-            COUNT(*) as total_mappings,
-            ROUND(AVG(confidence), 2) as avg_confidence
-        FROM mitre_mappings
+            SUM(incident_count) as incidents,
+            SUM(mapping_count) as total_mappings,
+            ROUND(SUM(confidence_sum) / SUM(mapping_count), 2) as avg_confidence
+        FROM mitre_tactic_stats
         GROUP BY tactic_id, tactic_name
         ORDER BY incidents DESC
     ''', conn)
@@ -33,9 +38,9 @@ def view_mitre_analysis():
             technique_id,
             technique_name,
             tactic_name,
-            COUNT(DISTINCT incident_id) as incidents,
-            ROUND(AVG(confidence), 2) as confidence
-        FROM mitre_mappings
+            SUM(incident_count) as incidents,
+            ROUND(SUM(confidence_sum) / SUM(mapping_count), 2) as confidence
+        FROM mitre_technique_stats
         GROUP BY technique_id, technique_name, tactic_name
         ORDER BY incidents DESC, confidence DESC
         LIMIT 10
@@ -45,7 +50,7 @@ def view_mitre_analysis():
     # Sample incidents with MITRE mappings
     print("\n\n📋 SAMPLE INCIDENTS WITH MITRE ATT&CK MAPPINGS")
     print("-" * 80)
-    df_samples = pd.read_sql_query('''
+    df_samples = analytics_query('''
         SELECT 
             substr(i.title, 1, 45) as incident,
             GROUP_CONCAT(DISTINCT m.technique_id) as techniques,
@@ -55,7 +60,7 @@ def view_mitre_analysis():
         GROUP BY i.incident_id, i.title
         ORDER BY tech_count DESC
         LIMIT 10
-    ''', conn)
+    ''')
     print(df_samples.to_string(index=False))
     
     # Coverage statistics
@@ -65,7 +70,7 @@ def view_mitre_analysis():
     cursor = conn.cursor()
     
     # Total incidents
-    cursor.execute('SELECT COUNT(*) FROM incidents')
+    cursor.execute('SELECT COALESCE(SUM(incident_count), 0) FROM daily_incident_rollup')
     total_incidents = cursor.fetchone()[0]
     
     # Mapped incidents
@@ -73,11 +78,11 @@ def view_mitre_analysis():
     mapped_incidents = cursor.fetchone()[0]
     
     # Unique techniques
-    cursor.execute('SELECT COUNT(DISTINCT technique_id) FROM mitre_mappings')
+    cursor.execute('SELECT COUNT(DISTINCT technique_id) FROM mitre_technique_totals')
     unique_techniques = cursor.fetchone()[0]
     
     # Unique tactics
-    cursor.execute('SELECT COUNT(DISTINCT tactic_id) FROM mitre_mappings')
+    cursor.execute('SELECT COUNT(DISTINCT tactic_id) FROM mitre_tactic_stats')
     unique_tactics = cursor.fetchone()[0]
     
     coverage_pct = (mapped_incidents / total_incidents * 100) if total_incidents > 0 else 0
@@ -88,8 +93,6 @@ def view_mitre_analysis():
     print(f"Unique Techniques Used:    {unique_techniques} / 202 total")
     print(f"Unique Tactics Used:       {unique_tactics} / 12 total")
     
-    conn.close()
-    
     print("\n" + "=" * 80)
     print("💡 Import 'reports/attack_navigator.json' into MITRE ATT&CK Navigator")
     print("   URL: https://mitre-attack.github.io/attack-navigator/")
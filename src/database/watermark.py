@@ -0,0 +1,54 @@
+"""
+Per-stage processing watermarks
+Each enrichment stage remembers the last incidents.id it processed, so
+finding new work is a primary-key range scan over new rows only.
+"""
+
+# incident_ids bound per IN (...) list, below SQLITE_MAX_VARIABLE_NUMBER
+# (999 in SQLite builds before 3.32)
+MAX_SQL_VARIABLES = 900
+
+
+def get_watermark(conn, stage):
+    """Return the last incidents.id processed by a stage (0 if never run)"""
+    row = conn.execute(
+        'SELECT last_incident_rowid FROM processing_watermarks WHERE stage = ?',
+        (stage,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def set_watermark(conn, stage, last_incident_rowid):
+    """
+    Advance a stage's watermark (never moves it backwards)
+
+    Does not commit: callers commit it in the same transaction as the
+    stage's output so a crash can never skip unprocessed rows.
+    """
+    conn.execute('''
+        INSERT INTO processing_watermarks (stage, last_incident_rowid, updated_at)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(stage) DO UPDATE SET
+            last_incident_rowid = MAX(last_incident_rowid, excluded.last_incident_rowid),
+            updated_at = excluded.updated_at
+    ''', (stage, last_incident_rowid))
+
+
+def incident_ids_with_rows(conn, table, incident_ids):
+    """
+    Subset of incident_ids that already have a row in table
+
+    Batch equivalent of the NOT EXISTS guard in the stages' PENDING_SQL,
+    for incidents that were read once and are shared between stages.
+    """
+    incident_ids = list(incident_ids)
+    found = set()
+
+    for start in range(0, len(incident_ids), MAX_SQL_VARIABLES):
+        batch = incident_ids[start:start + MAX_SQL_VARIABLES]
+        placeholders = ','.join('?' * len(batch))
+        found.update(row[0] for row in conn.execute(
+            f'SELECT DISTINCT incident_id FROM {table} WHERE incident_id IN ({placeholders})',
+            batch
+        ))
+    return found
@@ -0,0 +1,350 @@
+"""
+ATT&CK Navigator layer generation
+Builds the all-time layer plus per-subsector, per-source-type and
+per-week layers and week-over-week diff layers from one grouped pass
+over the mappings. Layers are written in parallel, and a manifest of
+per-layer count fingerprints means later runs only rewrite the layers
+whose counts changed.
+
+Layers can be imported at https://mitre-attack.github.io/attack-navigator/
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+import argparse
+import hashlib
+import json
+import re
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.database.change_counters import change_count
+from src.database.connection import read_connection
+
+DEFAULT_OUTPUT_DIR = 'reports/navigator'
+MANIFEST_FILE = 'manifest.json'
+
+# Bumped whenever the manifest or layer layout changes
+MANIFEST_FORMAT = 1
+
+# Mapping counts and confidence per technique and slice cell; every
+# layer is a sum over some of these cells. Weeks start on Monday.
+CELLS_SQL = '''
+    SELECT
+        m.technique_id,
+        i.subsector,
+        i.source_type,
+        date(i.date_discovered, '-6 days', 'weekday 1') as week,
+        COUNT(*) as count,
+        SUM(COALESCE(m.confidence, 0)) as confidence_sum
+    FROM mitre_mappings m
+    JOIN incidents i ON m.incident_id = i.incident_id
+    WHERE m.technique_id IS NOT NULL
+    GROUP BY m.technique_id, i.subsector, i.source_type, week
+'''
+
+
+def score_color(score):
+    """Get color based on threat score"""
+    if score >= 75:
+        return "#ff0000"  # Red - Critical
+    elif score >= 50:
+        return "#ff6600"  # Orange - High
+    elif score >= 25:
+        return "#ffcc00"  # Yellow - Medium
+    else:
+        return "#00cc00"  # Green - Low
+
+
+def _layer(name, description, techniques, **extra):
+    """Navigator layer skeleton around technique entries"""
+    layer = {
+        "name": name,
+        "versions": {
+            "attack": "14",
+            "navigator": "4.9.1",
+            "layer": "4.5"
+        },
+        "domain": "enterprise-attack",
+        "description": description,
+        "filters": {
+            "platforms": ["Windows", "Linux", "macOS", "Network", "Cloud"]
+        },
+        "sorting": 0,
+        "layout": {
+            "layout": "side",
+            "aggregateFunction": "average",
+            "showID": True,
+            "showName": True
+        },
+        "hideDisabled": False,
+        "techniques": techniques
+    }
+    layer.update(extra)
+    return layer
+
+
+def build_layer(name, description, techniques):
+    """
+    Build a Navigator layer scored by frequency and confidence
+
+    Args:
+        techniques: (technique_id, mapping count, average confidence) rows
+    """
+    entries = []
+    for technique_id, count, confidence in techniques:
+        # Calculate score (0-100) based on frequency and confidence
+        score = min((count * 10) + (confidence * 50), 100)
+
+        entries.append({
+            "techniqueID": technique_id,
+            "score": score,
+            "color": score_color(score),
+            "comment": f"Incidents: {count}, Avg Confidence: {confidence:.2f}",
+            "enabled": True,
+            "metadata": []
+        })
+
+    return _layer(name, description, entries)
+
+
+def build_diff_layer(name, description, current, previous):
+    """
+    Build a layer scored by the change in mapping counts
+
+    Args:
+        current, previous: technique_id -> mapping count
+    """
+    entries = []
+    for technique_id in sorted(set(current) | set(previous)):
+        now, before = current.get(technique_id, 0), previous.get(technique_id, 0)
+        if now == before:
+            continue
+        entries.append({
+            "techniqueID": technique_id,
+            "score": now - before,
+            "comment": f"This week: {now}, previous week: {before}",
+            "enabled": True,
+            "metadata": []
+        })
+
+    # Diverging gradient: green for fewer mappings, red for more
+    largest = max((abs(entry['score']) for entry in entries), default=1)
+    return _layer(name, description, entries, gradient={
+        "colors": ["#00cc00", "#ffffff", "#ff0000"],
+        "minValue": -largest,
+        "maxValue": largest
+    })
+
+
+def _file_name(key):
+    """Layer key ('subsector/digital_banking') -> file name"""
+    return re.sub(r'[^a-z0-9]+', '_', key.lower()).strip('_') + '.json'
+
+
+def _fingerprint(*counts):
+    """Stable hash of one or more technique_id -> [count, confidence_sum] maps"""
+    payload = [sorted((technique_id, value[0], round(value[1], 6))
+                      for technique_id, value in slice_counts.items())
+               for slice_counts in counts]
+    return hashlib.sha256(json.dumps(payload).encode('utf-8')).hexdigest()
+
+
+def _write_layer(path, layer):
+    """Write a layer, via a temporary file so readers never see half of it"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(layer, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+class NavigatorLayers:
+    """Sliced and diffed ATT&CK Navigator layers"""
+
+    def __init__(self, db_path='data/threats.db', output_dir=DEFAULT_OUTPUT_DIR):
+        self.db_path = db_path
+        self.output_dir = output_dir
+
+    def _manifest_path(self):
+        return os.path.join(self.output_dir, MANIFEST_FILE)
+
+    def _load_manifest(self):
+        """Previous run's manifest, or an empty one"""
+        try:
+            with open(self._manifest_path()) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {'layers': {}}
+        if manifest.get('format') != MANIFEST_FORMAT:
+            return {'layers': {}}
+        return manifest
+
+    def slice_counts(self, conn, weeks):
+        """
+        Sum the grouped cells into every slice in one pass
+
+        Args:
+            weeks: Week start dates (YYYY-MM-DD) to build week slices for
+
+        Returns:
+            slice key -> technique_id -> [mapping count, confidence sum]
+        """
+        wanted_weeks = set(weeks)
+        slices = {}
+
+        def add(key, technique_id, count, confidence_sum):
+            value = slices.setdefault(key, {}).setdefault(technique_id, [0, 0.0])
+            value[0] += count
+            value[1] += confidence_sum
+
+        for technique_id, subsector, source_type, week, count, confidence_sum in conn.execute(CELLS_SQL):
+            add('all', technique_id, count, confidence_sum)
+            if subsector:
+                add(f'subsector/{subsector}', technique_id, count, confidence_sum)
+            if source_type:
+                add(f'source/{source_type}', technique_id, count, confidence_sum)
+            if week in wanted_weeks:
+                add(f'week/{week}', technique_id, count, confidence_sum)
+
+        return slices
+
+    def _layers(self, slices, weeks, generated):
+        """
+        Layer builders for every slice
+
+        Returns:
+            layer key -> (count fingerprint, zero-argument layer builder)
+        """
+        layers = {}
+        for key, counts in slices.items():
+            kind, _, value = key.partition('/')
+            if kind == 'week' and value == weeks[-1]:
+                continue  # only the baseline of the oldest diff
+            title = {
+                'all': "Real Incidents",
+                'subsector': f"Subsector {value}",
+                'source': f"Source {value}",
+                'week': f"Week of {value}"
+            }[kind]
+            rows = [(technique_id, count, confidence_sum / count)
+                    for technique_id, (count, confidence_sum) in sorted(counts.items())]
+            layers[key] = (_fingerprint(counts), partial(
+                build_layer,
+                f"FinTech Threat Taxonomy - {title}",
+                f"Real FinTech cyber threats mapped to MITRE ATT&CK (Generated: {generated})",
+                rows
+            ))
+
+        # weeks is newest first; each week is diffed against the one before
+        for week, previous_week in zip(weeks, weeks[1:]):
+            current = slices.get(f'week/{week}', {})
+            previous = slices.get(f'week/{previous_week}', {})
+            layers[f'diff/{week}'] = (_fingerprint(current, previous), partial(
+                build_diff_layer,
+                f"FinTech Threat Taxonomy - Changes in Week of {week}",
+                f"Change in technique mappings versus the week of {previous_week} (Generated: {generated})",
+                {technique_id: value[0] for technique_id, value in current.items()},
+                {technique_id: value[0] for technique_id, value in previous.items()}
+            ))
+
+        return layers
+
+    def generate(self, weeks=8, workers=4, force=False, today=None):
+        """
+        Regenerate the layers whose counts changed since the last run
+
+        Args:
+            weeks: Number of recent weeks (including the current one) to
+                   build week and diff layers for
+            workers: Threads writing layer files
+            force: Rewrite every layer
+            today: Reference date for the week window (default: now)
+
+        Returns:
+            dict with written, unchanged and removed layer keys
+        """
+        started = time.perf_counter()
+        today = today or datetime.now()
+        monday = (today - timedelta(days=today.weekday())).date()
+        # One extra week as the baseline of the oldest diff, newest first
+        week_starts = [(monday - timedelta(weeks=n)).isoformat() for n in range(weeks + 1)]
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = self._load_manifest()
+        previous = manifest['layers']
+
+        conn = read_connection(self.db_path)
+        counters = {table: change_count(conn, table) for table in ('mitre_mappings', 'incidents')}
+
+        up_to_date = (
+            not force
+            and None not in counters.values()
+            and manifest.get('counters') == counters
+            and manifest.get('weeks') == week_starts
+            and all(os.path.exists(os.path.join(self.output_dir, entry['file']))
+                    for entry in previous.values())
+        )
+        if up_to_date:
+            print(f"✅ Navigator layers up to date ({len(previous)} layers in {self.output_dir})")
+            return {'written': [], 'unchanged': sorted(previous), 'removed': []}
+
+        slices = self.slice_counts(conn, week_starts)
+
+        layers = self._layers(slices, week_starts, today.strftime('%Y-%m-%d'))
+
+        entries = {}
+        pending = []
+        for key, (fingerprint, build) in sorted(layers.items()):
+            entries[key] = {'file': _file_name(key), 'fingerprint': fingerprint}
+            path = os.path.join(self.output_dir, entries[key]['file'])
+            old = previous.get(key)
+            if force or not old or old['fingerprint'] != fingerprint or not os.path.exists(path):
+                pending.append((key, path, build))
+
+        # Build the layers here, write them from a thread pool
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            list(pool.map(lambda job: _write_layer(job[1], job[2]()), pending))
+
+        removed = sorted(set(previous) - set(entries))
+        for key in removed:
+            path = os.path.join(self.output_dir, previous[key]['file'])
+            if os.path.exists(path):
+                os.remove(path)
+
+        _write_layer(self._manifest_path(), {
+            'format': MANIFEST_FORMAT,
+            'counters': counters,
+            'weeks': week_starts,
+            'layers': entries
+        })
+
+        written = [key for key, _, _ in pending]
+        print(f"📊 Navigator layers: {len(written)} written, "
+              f"{len(entries) - len(written)} unchanged, {len(removed)} removed "
+              f"in {time.perf_counter() - started:.2f}s ({self.output_dir})")
+
+        return {'written': written,
+                'unchanged': sorted(set(entries) - set(written)),
+                'removed': removed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate sliced and diffed ATT&CK Navigator layers")
+    parser.add_argument('--db', default='data/threats.db')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--weeks', type=int, default=8,
+                        help="Recent weeks to build week and diff layers for (default: 8)")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="Threads writing layer files (default: 4)")
+    parser.add_argument('--force', action='store_true',
+                        help="Rewrite every layer, changed or not")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🗺️  ATT&CK NAVIGATOR LAYERS")
+    print("=" * 60 + "\n")
+
+    NavigatorLayers(args.db, args.output_dir).generate(args.weeks, args.workers, args.force)
@@ -0,0 +1,365 @@
+"""
+Columnar Parquet snapshot of the threat database
+Writes incidents, classifications, MITRE mappings and impact rows as
+zstd-compressed Parquet datasets, hive-partitioned by discovery month and
+source type (reports/parquet/<table>/month=2025-03/source_type=rss/...),
+for analytics that scan a few columns of many rows. Child rows take the
+month and source type of their incident, so every dataset prunes on the
+same partition filters.
+
+Runs are incremental: only incidents past the manifest's watermark, and
+their child rows, are appended as new files. Only incidents every
+enrichment stage has processed are taken, so their classifications,
+mappings and severity are complete when they are written. Partitions
+holding rows changed since the last run (re-classification, back-fills,
+mapping merges, near-duplicate links, archiving; see
+snapshot_changes.py) are rewritten whole.
+
+    python src/reports/parquet_snapshot.py
+    read_snapshot('incidents', columns=['severity'], filters=[('month', '>=', '2025-01')])
+"""
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional columnar export dependency
+    pa = None
+
+from datetime import datetime
+import pandas as pd
+import argparse
+import json
+import shutil
+import time
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.classifiers.enrichment_pipeline import ENRICHERS
+from src.database.archive import attach_archives
+from src.database.connection import connect
+from src.database.snapshot_changes import CHANGE_TABLE, changed_partitions
+from src.database.watermark import get_watermark
+
+DEFAULT_OUTPUT_DIR = 'reports/parquet'
+MANIFEST_FILE = 'manifest.json'
+
+# Bumped whenever the manifest or dataset layout changes; a snapshot in
+# another format is rewritten in full
+MANIFEST_FORMAT = 2
+
+# Snapshotted tables; every one but incidents references incidents.incident_id
+SNAPSHOT_TABLES = ('incidents', 'threat_classifications', 'mitre_mappings',
+                   'regulatory_impact', 'financial_impact')
+
+PARTITION_COLUMNS = ('month', 'source_type')
+
+# Rows fetched from SQLite per record batch
+BATCH_SIZE = 50000
+
+COMPRESSION = 'zstd'
+
+# Directory names the hive partitioning gives a NULL partition value
+_NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+
+def _arrow_type(declared):
+    """Arrow type for a SQLite declared column type"""
+    declared = (declared or '').upper()
+    if declared in ('DATE', 'TIMESTAMP'):
+        return pa.timestamp('us')
+    if declared == 'BOOLEAN':
+        return pa.bool_()
+    if 'INT' in declared:
+        return pa.int64()
+    if declared in ('REAL', 'FLOAT', 'DOUBLE'):
+        return pa.float64()
+    return pa.string()
+
+
+def _write_manifest(path, manifest):
+    """Write the manifest, via a temporary file so readers never see half of it"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class ParquetSnapshot:
+    """Partitioned Parquet datasets of the incident tables"""
+
+    def __init__(self, db_path='data/threats.db', output_dir=DEFAULT_OUTPUT_DIR):
+        if pa is None:
+            raise ImportError(
+                "Parquet snapshots need pyarrow "
+                "(pip install -r requirements.txt)"
+            )
+
+        self.db_path = db_path
+        self.output_dir = output_dir
+
+    def _manifest_path(self):
+        return os.path.join(self.output_dir, MANIFEST_FILE)
+
+    def _load_manifest(self):
+        """Previous run's manifest, or None if missing or in another format"""
+        try:
+            with open(self._manifest_path()) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('format') != MANIFEST_FORMAT:
+            return None
+        return manifest
+
+    def last_snapshot(self):
+        """(last snapshotted incidents.id, last change number, time of the run) from the manifest"""
+        manifest = self._load_manifest() or {}
+        return (manifest.get('last_incident_rowid', 0), manifest.get('last_change', 0),
+                manifest.get('updated'))
+
+    def _schema(self, conn, table):
+        """Arrow schema of a table's dataset, partition columns last"""
+        fields = [pa.field(row[1], _arrow_type(row[2]))
+                  for row in conn.execute(f'PRAGMA main.table_info({table})')
+                  if row[1] not in PARTITION_COLUMNS]
+        return pa.schema(fields + [pa.field(column, pa.string()) for column in PARTITION_COLUMNS])
+
+    def _batches(self, conn, table, schema, prefix, after, through, changes=None):
+        """
+        Record batches of a table's rows for incidents in (after, through]
+
+        With changes=(first, last), the rows of incidents up to through in
+        the partitions changed in (first, last] instead.
+        """
+        columns = [name for name in schema.names if name not in PARTITION_COLUMNS]
+        partition = "strftime('%Y-%m', i.date_discovered) as month, i.source_type as source_type"
+        dates = [field.name for field in schema if pa.types.is_timestamp(field.type)]
+
+        changed = ''
+        params = (after, through)
+        if changes:
+            changed = f'''
+                JOIN {CHANGE_TABLE} c
+                  ON c.month = COALESCE(strftime('%Y-%m', i.date_discovered), '')
+                 AND c.source_type = COALESCE(i.source_type, '')
+                 AND c.change > ? AND c.change <= ?
+            '''
+            params = tuple(changes) + params
+
+        if table == 'incidents':
+            sql = f'''
+                SELECT {', '.join('i.' + column for column in columns)}, {partition}
+                FROM {prefix}incidents i {changed}
+                WHERE i.id > ? AND i.id <= ?
+            '''
+        else:
+            sql = f'''
+                SELECT {', '.join('t.' + column for column in columns)}, {partition}
+                FROM {prefix}{table} t
+                JOIN {prefix}incidents i ON i.incident_id = t.incident_id {changed}
+                WHERE i.id > ? AND i.id <= ?
+            '''
+
+        for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=BATCH_SIZE):
+            for column in dates:
+                chunk[column] = pd.to_datetime(chunk[column], errors='coerce', format='mixed')
+            yield pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+
+    def pending_rows(self, conn, table, after, changes=None):
+        """
+        A table's rows for the incidents past id after, as one Arrow table
+
+        The rows a later snapshot would append, in the snapshot's schema;
+        with changes=(first, last), also the current rows up to id after
+        in the partitions changed in (first, last], which it would rewrite.
+        """
+        schema = self._schema(conn, table)
+        batches = list(self._batches(conn, table, schema, '', after, sys.maxsize))
+        if changes:
+            batches += self._batches(conn, table, schema, '', 0, after, changes)
+        return pa.Table.from_batches(batches, schema=schema)
+
+    def _write_table(self, conn, table, base_dir, prefix, after, through, changes=None):
+        """
+        Append one table's rows for incidents in (after, through] as new files
+
+        File names carry the starting watermark, so re-running after an
+        interrupted snapshot overwrites its files instead of duplicating
+        their rows. With changes=(first, last), writes the partitions
+        changed in (first, last] instead, whose old files the caller
+        removed.
+
+        Returns:
+            Number of rows written
+        """
+        schema = self._schema(conn, table)
+        written = [0]
+
+        def counted():
+            for batch in self._batches(conn, table, schema, prefix, after, through, changes):
+                written[0] += batch.num_rows
+                yield batch
+
+        ds.write_dataset(
+            counted(),
+            os.path.join(base_dir, table),
+            schema=schema,
+            format='parquet',
+            partitioning=ds.partitioning(
+                pa.schema([schema.field(column) for column in PARTITION_COLUMNS]), flavor='hive'
+            ),
+            basename_template=(f'part-c{changes[1]}-{{i}}.parquet' if changes
+                               else f'part-{after}-{{i}}.parquet'),
+            existing_data_behavior='overwrite_or_ignore',
+            file_options=ds.ParquetFileFormat().make_write_options(compression=COMPRESSION)
+        )
+        return written[0]
+
+    def _remove_partitions(self, table, partitions):
+        """Delete a table's files in the given (month, source_type) partitions"""
+        for month, source_type in partitions:
+            # '' stands for both an empty and a NULL partition value
+            for month_dir in ([month] if month else ['', _NULL_PARTITION]):
+                for source_dir in ([source_type] if source_type else ['', _NULL_PARTITION]):
+                    shutil.rmtree(os.path.join(self.output_dir, table, f'month={month_dir}',
+                                               f'source_type={source_dir}'), ignore_errors=True)
+
+    def _count_rows(self, table_dir):
+        """Rows in a dataset directory, from the Parquet footers"""
+        if not os.path.isdir(table_dir):
+            return 0
+        return ds.dataset(table_dir, format='parquet').count_rows()
+
+    def _snapshot_bound(self, conn):
+        """
+        Last incidents.id every enrichment stage has processed
+
+        Names the stages holding it behind the others, since incidents
+        past it wait for them however far the rest have got.
+        """
+        watermarks = {name: get_watermark(conn, enricher.STAGE) for name, enricher in ENRICHERS.items()}
+        through = min(watermarks.values())
+        if through < max(watermarks.values()):
+            behind = [name for name, watermark in watermarks.items() if watermark == through]
+            print(f"⏳ Incidents past id {through} wait for the {', '.join(behind)} enricher "
+                  f"(others at up to {max(watermarks.values())}); run "
+                  f"python src/classifiers/enrichment_pipeline.py --only {' '.join(behind)}")
+        return through
+
+    def snapshot(self, full=False, archive_dir=None):
+        """
+        Write the incidents past the last snapshot and the changed partitions, or everything
+
+        Args:
+            full: Rewrite every dataset from scratch (replaced once complete);
+                  implied when there is no snapshot in the current format
+            archive_dir: With full, also include the incidents moved to
+                         these per-year archives (kept by later runs)
+
+        Returns:
+            dict of table -> rows written this run
+        """
+        started = time.perf_counter()
+        manifest = None if full else self._load_manifest()
+        if manifest is None:
+            full = True
+            manifest = {'last_incident_rowid': 0, 'last_change': 0, 'archive_dir': archive_dir}
+        after = manifest['last_incident_rowid']
+
+        # Arrow pulls the record batches from its own writer threads
+        conn = connect(self.db_path, read_only=True, check_same_thread=False)
+        try:
+            prefix = ''
+            if manifest['archive_dir']:
+                attach_archives(conn, manifest['archive_dir'])
+                prefix = 'all_'
+
+            # One read transaction, so every table shows the same moment
+            conn.execute('BEGIN')
+
+            # Never retract incidents already written, even if an enricher
+            # added since has not caught up with them
+            through = max(self._snapshot_bound(conn), after)
+            last_change, partitions = changed_partitions(conn, manifest['last_change'])
+            if not full and through == after and not partitions:
+                print(f"✅ Parquet snapshot up to date (incident id {after})")
+                return {table: 0 for table in SNAPSHOT_TABLES}
+
+            base_dir = self.output_dir + '.partial' if full else self.output_dir
+            if full:
+                shutil.rmtree(base_dir, ignore_errors=True)
+            os.makedirs(base_dir, exist_ok=True)
+
+            written = {}
+            for table in SNAPSHOT_TABLES:
+                written[table] = self._write_table(conn, table, base_dir, prefix, after, through)
+                if partitions and not full:
+                    # After the append, so rows just appended there are not written twice
+                    self._remove_partitions(table, partitions)
+                    written[table] += self._write_table(conn, table, base_dir, prefix, 0, through,
+                                                        (manifest['last_change'], last_change))
+                print(f"  🧱 {table}: {written[table]} rows")
+        finally:
+            conn.close()
+
+        if partitions and not full:
+            print(f"  ♻️  Rewrote {len(partitions)} changed partitions")
+
+        manifest.update({
+            'format': MANIFEST_FORMAT,
+            'last_incident_rowid': through,
+            'last_change': last_change,
+            'rows': {table: self._count_rows(os.path.join(base_dir, table)) for table in SNAPSHOT_TABLES},
+            'updated': datetime.now().isoformat(timespec='seconds')
+        })
+        _write_manifest(os.path.join(base_dir, MANIFEST_FILE), manifest)
+
+        if full:
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+            os.replace(base_dir, self.output_dir)
+
+        print(f"✅ Parquet snapshot through incident id {through} "
+              f"in {time.perf_counter() - started:.2f}s -> {self.output_dir}")
+        return written
+
+
+def read_snapshot(table, output_dir=DEFAULT_OUTPUT_DIR, columns=None, filters=None):
+    """
+    Read a snapshot dataset into a DataFrame
+
+    Only the requested columns are decoded; filters on month and
+    source_type skip whole partitions and other filters skip row groups
+    by their statistics.
+
+    Args:
+        table: One of SNAPSHOT_TABLES
+        columns: Column names to read (default: all)
+        filters: pyarrow filters, e.g. [('month', '>=', '2025-01'), ('severity', '=', 'critical')]
+    """
+    if pa is None:
+        raise ImportError("Parquet snapshots need pyarrow (pip install -r requirements.txt)")
+
+    return pq.read_table(
+        os.path.join(output_dir, table), columns=columns, filters=filters,
+        partitioning=ds.partitioning(
+            pa.schema([pa.field(column, pa.string()) for column in PARTITION_COLUMNS]), flavor='hive'
+        )
+    ).to_pandas()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a partitioned Parquet snapshot of the threat database")
+    parser.add_argument('--db', default='data/threats.db')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--full', action='store_true',
+                        help="Rewrite the snapshot instead of updating it")
+    parser.add_argument('--archive-dir',
+                        help="With --full, include incidents moved to these per-year archives")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🧱 PARQUET SNAPSHOT")
+    print("=" * 60 + "\n")
+
+    ParquetSnapshot(args.db, args.output_dir).snapshot(args.full, args.archive_dir)
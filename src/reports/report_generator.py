@@ -3,22 +3,42 @@ Report generation module
 Exports data as CSV, PDF reports
 """
 import pandas as pd
-import sqlite3
 from datetime import datetime
 import json
+import sys
 import os
 
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.analytics.technique_cooccurrence import TechniqueCooccurrence
+from src.database.connection import read_connection
+from src.reports.navigator_layers import NavigatorLayers
+from src.reports.parquet_snapshot import ParquetSnapshot
+
 class ReportGenerator:
     """Generate reports from threat data"""
     
     def __init__(self, db_path='data/threats.db'):
         self.db_path = db_path
     
+    def _export_csv(self, sql, output_file):
+        """
+        Write a query's result to CSV
+        
+        Read from SQLite, the system of record: the Parquet snapshot
+        holds archived incidents and formats dates differently.
+        
+        Returns:
+            Number of rows written
+        """
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        
+        df = pd.read_sql_query(sql, read_connection(self.db_path))
+        df.to_csv(output_file, index=False)
+        return len(df)
+    
     def export_incidents_csv(self, output_file='reports/incidents_export.csv'):
         """Export all incidents to CSV"""
-        conn = sqlite3.connect(self.db_path)
-        
-        df = pd.read_sql_query('''
+        count = self._export_csv('''
             SELECT 
                 i.incident_id,
                 i.title,
@@ -33,21 +53,14 @@ class ReportGenerator:
             FROM incidents i
             LEFT JOIN threat_classifications tc ON i.incident_id = tc.incident_id
             ORDER BY i.date_discovered DESC
-        ''', conn)
+        ''', output_file)
         
-        conn.close()
-        
-        os.makedirs('reports', exist_ok=True)
-        df.to_csv(output_file, index=False)
-        
-        print(f"✅ Exported {len(df)} incidents to {output_file}")
+        print(f"✅ Exported {count} incidents to {output_file}")
         return output_file
     
     def export_mitre_mappings_csv(self, output_file='reports/mitre_mappings.csv'):
         """Export MITRE ATT&CK mappings to CSV"""
-        conn = sqlite3.connect(self.db_path)
-        
-        df = pd.read_sql_query('''
+        count = self._export_csv('''
             SELECT 
                 m.incident_id,
                 i.title,
@@ -60,38 +73,36 @@ class ReportGenerator:
             FROM mitre_mappings m
             JOIN incidents i ON m.incident_id = i.incident_id
             ORDER BY m.technique_id
-        ''', conn)
+        ''', output_file)
         
-        conn.close()
-        
-        df.to_csv(output_file, index=False)
-        
-        print(f"✅ Exported {len(df)} MITRE mappings to {output_file}")
+        print(f"✅ Exported {count} MITRE mappings to {output_file}")
         return output_file
     
+    def export_technique_cooccurrence_csv(self, output_file='reports/technique_cooccurrence.csv'):
+        """Export technique pairs seen in the same incidents, with lift"""
+        return TechniqueCooccurrence(self.db_path).export_csv(output_file)
+    
     def generate_executive_summary(self, output_file='reports/executive_summary.txt'):
         """Generate text-based executive summary"""
-        conn = sqlite3.connect(self.db_path)
+        conn = read_connection(self.db_path)
         
         # Get statistics
-        total_incidents = pd.read_sql_query('SELECT COUNT(*) as c FROM incidents', conn).iloc[0]['c']
-        critical = pd.read_sql_query("SELECT COUNT(*) as c FROM incidents WHERE severity='critical'", conn).iloc[0]['c']
+        total_incidents = pd.read_sql_query('SELECT COALESCE(SUM(incident_count), 0) as c FROM daily_incident_rollup', conn).iloc[0]['c']
+        critical = pd.read_sql_query("SELECT COALESCE(SUM(incident_count), 0) as c FROM daily_incident_rollup WHERE severity='critical'", conn).iloc[0]['c']
         
         # Top threats
         top_tech = pd.read_sql_query('''
-            SELECT tech_category, COUNT(*) as c FROM threat_classifications 
-            WHERE tech_category IS NOT NULL GROUP BY tech_category 
+            SELECT category as tech_category, SUM(classification_count) as c FROM daily_category_rollup
+            WHERE dimension='tech' AND category IS NOT NULL GROUP BY category
             ORDER BY c DESC LIMIT 3
         ''', conn)
         
         # Top MITRE
         top_mitre = pd.read_sql_query('''
-            SELECT technique_id, technique_name, COUNT(*) as c FROM mitre_mappings
-            GROUP BY technique_id, technique_name ORDER BY c DESC LIMIT 5
+            SELECT technique_id, technique_name, mapping_count as c FROM mitre_technique_totals
+            ORDER BY c DESC LIMIT 5
         ''', conn)
         
-        conn.close()
-        
         # Build report
         report = f"""
 ╔══════════════════════════════════════════════════════════════════╗
@@ -163,9 +174,19 @@ Built by Phiwokuhle Sdingo Kunene: FinTech + Cybersecurity
         print("📊 GENERATING ALL REPORTS")
         print("=" * 70 + "\n")
         
+        try:
+            ParquetSnapshot(self.db_path).snapshot()
+        except ImportError as e:
+            print(f"⚠️  Skipping Parquet snapshot: {e}")
+        
         self.export_incidents_csv()
         self.export_mitre_mappings_csv()
+        try:
+            self.export_technique_cooccurrence_csv()
+        except ImportError as e:
+            print(f"⚠️  Skipping technique co-occurrence: {e}")
         self.generate_executive_summary()
+        NavigatorLayers(self.db_path).generate()
         
         print("\n✅ All reports generated in reports/ folder")
         print("=" * 70 + "\n")
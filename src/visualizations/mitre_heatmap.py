@@ -2,13 +2,17 @@
 MITRE ATT&CK Heatmap Visualization
 Shows which techniques are most common in FinTech threats
 """
-import sqlite3
 import plotly.graph_objects as go
 import pandas as pd
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.database.connection import read_connection
 
 def create_mitre_heatmap():
     """Create interactive MITRE ATT&CK heatmap"""
-    conn = sqlite3.connect('data/threats.db')
+    conn = read_connection()
     
     # Get technique mappings with tactics
     df = pd.read_sql_query('''
@@ -16,15 +20,13 @@ def create_mitre_heatmap():
             tactic_name,
             technique_id,
             technique_name,
-            COUNT(*) as count,
-            AVG(confidence) as avg_confidence
-        FROM mitre_mappings
+            SUM(mapping_count) as count,
+            SUM(confidence_sum) / SUM(mapping_count) as avg_confidence
+        FROM mitre_technique_stats
         GROUP BY tactic_name, technique_id, technique_name
         ORDER BY count DESC
     ''', conn)
     
-    conn.close()
-    
     if len(df) == 0:
         print("⚠️  No MITRE mappings found. Run mitre_mapper.py first!")
         return
@@ -2,29 +2,31 @@
 MITRE ATT&CK Technique Frequency Chart
 Shows the most common attack techniques in FinTech
 """
-import sqlite3
 import plotly.graph_objects as go
 import pandas as pd
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.database.connection import read_connection
 
 def create_technique_chart():
     """Create bar chart of top MITRE techniques"""
-    conn = sqlite3.connect('data/threats.db')
+    conn = read_connection()
     
     df = pd.read_sql_query('''
         SELECT 
             technique_id,
             technique_name,
             tactic_name,
-            COUNT(DISTINCT incident_id) as incidents,
-            AVG(confidence) as avg_confidence
-        FROM mitre_mappings
+            SUM(incident_count) as incidents,
+            SUM(confidence_sum) / SUM(mapping_count) as avg_confidence
+        FROM mitre_technique_stats
         GROUP BY technique_id, technique_name, tactic_name
         ORDER BY incidents DESC
         LIMIT 15
     ''', conn)
     
-    conn.close()
-    
     if len(df) == 0:
         print("⚠️  No MITRE mappings found!")
         return
@@ -0,0 +1,74 @@
+"""
+Shared fixtures: a fresh, fully migrated threat database per test and a
+seeded generator of incident texts built from the taxonomy keywords, so
+the classifiers and enrichers have something to match.
+"""
+import random
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from config.taxonomy import (
+    TECH_TAXONOMY, HUMAN_TAXONOMY, PROCEDURAL_TAXONOMY, FINTECH_SUBSECTORS, SEVERITY_RULES
+)
+from src.database.connection import write_connection
+from src.database.schema import ThreatDatabase
+
+FILLER = ['the', 'bank', 'said', 'customers', 'on', 'monday', 'attackers', 'report', 'of',
+          'systems', 'after', 'a', 'several', 'data', 'users', 'firm', 'payment']
+
+
+def _keywords():
+    keywords = set(FILLER)
+    for taxonomy in (TECH_TAXONOMY, HUMAN_TAXONOMY, PROCEDURAL_TAXONOMY):
+        for data in taxonomy.values():
+            keywords.update(data['keywords'])
+            for subcategory_keywords in data['subcategories'].values():
+                keywords.update(subcategory_keywords)
+    for subsector_keywords in FINTECH_SUBSECTORS.values():
+        keywords.update(subsector_keywords)
+    for rule in SEVERITY_RULES.values():
+        keywords.update(rule['keywords'])
+    return sorted(keywords)
+
+
+KEYWORDS = _keywords()
+
+
+def make_texts(count, seed=0, words=12):
+    """count (title, description) pairs of taxonomy keywords and filler"""
+    rng = random.Random(seed)
+    return [(' '.join(rng.choices(KEYWORDS, k=4)).capitalize(),
+             ' '.join(rng.choices(KEYWORDS + FILLER * 4, k=words)))
+            for _ in range(count)]
+
+
+def add_incidents(db_path, texts, source_type='news', start=0, **columns):
+    """
+    Insert one incident per (title, description), discovered one day apart
+
+    Returns:
+        The inserted incident_ids
+    """
+    incident_ids = [f'inc-{start + i}' for i in range(len(texts))]
+    names = ['incident_id', 'title', 'description', 'date_discovered', 'source_type'] + list(columns)
+    rows = [(incident_id, title, description,
+             f'2025-{(start + i) // 28 % 12 + 1:02d}-{(start + i) % 28 + 1:02d} 09:30:00',
+             source_type, *columns.values())
+            for i, (incident_id, (title, description)) in enumerate(zip(incident_ids, texts))]
+    with write_connection(db_path) as conn:
+        conn.executemany(f"INSERT INTO incidents ({', '.join(names)}) "
+                         f"VALUES ({', '.join('?' * len(names))})", rows)
+    return incident_ids
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Path of a new threat database with every migration applied"""
+    path = str(tmp_path / 'threats.db')
+    database = ThreatDatabase(path)
+    database.create_tables()
+    database.close()
+    return path
@@ -0,0 +1,88 @@
+"""
+Archiving round-trips: the union views return exactly the rows archived
+"""
+import zlib
+
+from src.classifiers.mitre_mapper import MITREMapper
+from src.classifiers.threat_classifier import ThreatClassifier
+from src.database.archive import (
+    ARCHIVED_TABLES, archive_files, archive_incidents, historical_connection
+)
+from src.database.connection import connect, write_connection
+from src.database.incident_search import FTS_TABLE
+from tests.conftest import add_incidents, make_texts
+from tests.test_mitre_aggregates import assert_aggregates_match
+
+
+def rows(conn, table):
+    return sorted(conn.execute(f'SELECT * FROM {table}').fetchall(), key=repr)
+
+
+def populate(db_path):
+    """90 classified and mapped incidents spread over 2023-2025"""
+    incident_ids = add_incidents(db_path, make_texts(90, seed=19))
+    with write_connection(db_path) as conn:
+        conn.execute("UPDATE incidents SET date_discovered = "
+                     "(2023 + id % 3) || substr(date_discovered, 5)")
+        conn.executemany('INSERT INTO incident_raw_bodies (incident_id, body) VALUES (?, ?)',
+                         [(incident_id, zlib.compress(b'<p>body</p>')) for incident_id in incident_ids[::5]])
+        conn.executemany("INSERT INTO regulatory_impact (incident_id, regulation_name) VALUES (?, 'GDPR')",
+                         [(incident_id,) for incident_id in incident_ids[::7]])
+    ThreatClassifier(db_path).classify_batch()
+    MITREMapper(db_path).map_all_unmapped()
+
+
+def test_union_views_return_the_archived_rows(tmp_path, db_path):
+    populate(db_path)
+    conn = connect(db_path)
+    before = {table: rows(conn, table) for table in ARCHIVED_TABLES}
+    conn.close()
+
+    archive_dir = str(tmp_path / 'archive')
+    moved = archive_incidents(db_path, before='2025-01-01', archive_dir=archive_dir)
+    assert moved == {'2023': 30, '2024': 30}
+    assert [year for year, _ in archive_files(archive_dir)] == ['2023', '2024']
+
+    conn = historical_connection(db_path, archive_dir)
+    for table in ARCHIVED_TABLES:
+        assert rows(conn, f'all_{table}') == before[table], table
+    assert conn.execute("SELECT COUNT(*) FROM main.incidents "
+                        "WHERE date_discovered < '2025-01-01'").fetchone()[0] == 0
+    for year in ('2023', '2024'):
+        assert {row[0] for row in conn.execute(
+            f"SELECT strftime('%Y', date_discovered) FROM archive_{year}.incidents")} == {year}
+    # Hot children belong to hot incidents only
+    for table in ARCHIVED_TABLES[1:]:
+        assert conn.execute(f'''
+            SELECT COUNT(*) FROM main.{table}
+            WHERE incident_id NOT IN (SELECT incident_id FROM main.incidents)
+        ''').fetchone()[0] == 0, table
+    conn.close()
+
+    # The hot database's aggregates and search index shrank with it
+    assert_aggregates_match(db_path)
+    conn = connect(db_path)
+    conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('integrity-check', 1)")
+    assert conn.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}").fetchone()[0] == 30
+    conn.close()
+
+    # Nothing left to move
+    assert archive_incidents(db_path, before='2025-01-01', archive_dir=archive_dir) == {}
+
+
+def test_columns_added_later_read_as_null(tmp_path, db_path):
+    populate(db_path)
+    archive_dir = str(tmp_path / 'archive')
+    archive_incidents(db_path, before='2024-01-01', archive_dir=archive_dir)
+
+    with write_connection(db_path) as conn:
+        conn.execute('ALTER TABLE incidents ADD COLUMN analyst_note TEXT')
+        conn.execute("UPDATE incidents SET analyst_note = 'hot'")
+
+    conn = historical_connection(db_path, archive_dir)
+    notes = dict(conn.execute('''
+        SELECT strftime('%Y', date_discovered) = '2023', COUNT(analyst_note)
+        FROM all_incidents GROUP BY 1
+    ''').fetchall())
+    assert notes == {0: 60, 1: 0}
+    conn.close()
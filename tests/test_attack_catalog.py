@@ -0,0 +1,91 @@
+"""
+The ATT&CK catalog against the curated per-technique keyword loop
+"""
+import json
+import os
+
+from config.taxonomy import MITRE_MAPPING
+from src.classifiers.attack_catalog import (
+    AttackCatalog, build_index, fallback_index, load_index
+)
+from src.classifiers.keyword_matcher import incident_text
+from src.classifiers.mitre_mapper import MITREMapper
+from tests.conftest import make_texts
+
+
+def baseline_match(text):
+    """The mapper's original loop over MITRE_MAPPING"""
+    matched = {}
+    for technique_id, data in MITRE_MAPPING.items():
+        matches = sum(1 for keyword in data['keywords'] if keyword in text)
+        if matches > 0:
+            confidence = min(matches * 0.3, 1.0)
+            confidence = max(confidence, data['confidence'] * 0.5)
+            matched[technique_id] = (data['tactic'], MITREMapper.TACTICS.get(data['tactic'], 'Unknown'),
+                                     confidence, matches)
+    return matched
+
+
+def test_fallback_catalog_matches_curated_loop():
+    catalog = AttackCatalog(fallback_index(MITREMapper.TACTICS))
+    texts = make_texts(300, seed=49) + [
+        (' '.join(keyword for data in MITRE_MAPPING.values() for keyword in data['keywords']), '')
+    ]
+    for title, description in texts:
+        text = incident_text({'title': title, 'description': description})
+        assert {technique['technique_id']: (technique['tactic_id'], technique['tactic_name'],
+                                            technique['confidence'], technique['matches'])
+                for technique in catalog.match(text)} == baseline_match(text)
+
+
+def stix(type_, attack_id, name, **fields):
+    return dict(type=type_, name=name, external_references=[
+        {'source_name': 'mitre-attack', 'external_id': attack_id}], **fields)
+
+
+BUNDLE = {'objects': [
+    stix('x-mitre-tactic', 'TA0001', 'Initial Access', x_mitre_shortname='initial-access'),
+    stix('x-mitre-tactic', 'TA0006', 'Credential Access', x_mitre_shortname='credential-access'),
+    stix('attack-pattern', 'T1566', 'Phishing',
+         kill_chain_phases=[{'kill_chain_name': 'mitre-attack', 'phase_name': 'initial-access'}]),
+    stix('attack-pattern', 'T1566.002', 'Spearphishing Link',
+         kill_chain_phases=[{'kill_chain_name': 'mitre-attack', 'phase_name': 'initial-access'}]),
+    stix('attack-pattern', 'T1110', 'Brute Force',
+         kill_chain_phases=[{'kill_chain_name': 'mitre-attack', 'phase_name': 'credential-access'}]),
+    stix('attack-pattern', 'T1999', 'Retired Technique', revoked=True),
+]}
+
+
+def test_bundle_index_and_sub_techniques(tmp_path):
+    index = build_index(BUNDLE)
+    assert index['tactics'] == {'TA0001': 'Initial Access', 'TA0006': 'Credential Access'}
+    assert set(index['techniques']) == {'T1566', 'T1566.002', 'T1110'}
+    # Short single-word names are too generic to match on
+    assert index['techniques']['T1566']['keywords'] == []
+    assert index['techniques']['T1566.002'] == {'name': 'Spearphishing Link', 'tactics': ['TA0001'],
+                                                'parent': 'T1566', 'keywords': ['spearphishing link']}
+
+    catalog = AttackCatalog(index)
+    matched = {(technique['technique_id'], technique['sub_technique_id']): technique
+               for technique in catalog.match('a spearphishing link and a brute force attack')}
+    assert matched[('T1566', 'T1566.002')]['technique_name'] == 'Phishing'
+    assert matched[('T1566', 'T1566.002')]['tactic_id'] == 'TA0001'
+    assert matched[('T1110', None)]['tactic_name'] == 'Credential Access'
+
+
+def test_index_cache_follows_the_bundle(tmp_path):
+    bundle_path, cache_path = str(tmp_path / 'bundle.json'), str(tmp_path / 'index.json')
+    assert load_index(bundle_path, cache_path) is None
+
+    with open(bundle_path, 'w') as f:
+        json.dump(BUNDLE, f)
+    first = load_index(bundle_path, cache_path)
+    cached_at = os.stat(cache_path).st_mtime_ns
+    assert load_index(bundle_path, cache_path) == first
+    assert os.stat(cache_path).st_mtime_ns == cached_at
+
+    bundle = dict(BUNDLE, objects=BUNDLE['objects'][:2])
+    with open(bundle_path, 'w') as f:
+        json.dump(bundle, f)
+    os.utime(bundle_path, ns=(cached_at + 10 ** 9, cached_at + 10 ** 9))
+    assert load_index(bundle_path, cache_path)['techniques'] == {}
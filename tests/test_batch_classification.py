@@ -0,0 +1,92 @@
+"""
+Chunked classification against classifying incidents one at a time
+"""
+import sqlite3
+
+import pytest
+
+from config.taxonomy import TECH_TAXONOMY, HUMAN_TAXONOMY, PROCEDURAL_TAXONOMY
+from src.classifiers.keyword_matcher import incident_text
+from src.classifiers.threat_classifier import ThreatClassifier
+from src.database.connection import connect
+from src.database.schema import ThreatDatabase
+from src.database.watermark import get_watermark
+from tests.conftest import add_incidents, make_texts
+from tests.test_keyword_matcher import baseline_classify
+
+COLUMNS = '''
+    incident_id, tech_category, tech_subcategory, human_category, human_subcategory,
+    procedural_category, procedural_subcategory, classification_method, confidence_score,
+    text_hash, tech_taxonomy_hash, human_taxonomy_hash, procedural_taxonomy_hash
+'''
+
+
+def classifications(db_path):
+    conn = connect(db_path)
+    rows = conn.execute(f'SELECT {COLUMNS} FROM threat_classifications ORDER BY incident_id').fetchall()
+    conn.close()
+    return rows
+
+
+def expected_labels(db_path):
+    """incident_id -> labels and confidence from the original scoring loop"""
+    conn = connect(db_path)
+    conn.row_factory = sqlite3.Row
+    expected = {}
+    for incident in conn.execute('SELECT incident_id, title, description FROM incidents'):
+        text = incident_text(incident)
+        scores = [baseline_classify(text, taxonomy) for taxonomy in
+                  (TECH_TAXONOMY, HUMAN_TAXONOMY, PROCEDURAL_TAXONOMY)]
+        labels = tuple(value for category, subcategory, _ in scores for value in (category, subcategory))
+        expected[incident['incident_id']] = labels + (sum(score[2] for score in scores) / 3,)
+    conn.close()
+    return expected
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 500])
+def test_batch_matches_one_at_a_time(tmp_path, chunk_size):
+    paths = []
+    for name in ('single', 'batch'):
+        path = str(tmp_path / f'{name}.db')
+        ThreatDatabase(path).create_tables()
+        add_incidents(path, make_texts(60, seed=4))
+        paths.append(path)
+
+    assert ThreatClassifier(paths[0]).classify_all_unclassified() == 60
+    assert ThreatClassifier(paths[1]).classify_batch(chunk_size=chunk_size) == 60
+    assert classifications(paths[0]) == classifications(paths[1])
+
+    expected = expected_labels(paths[1])
+    for row in classifications(paths[1]):
+        assert row[1:7] == expected[row[0]][:6]
+        assert row[8] == pytest.approx(expected[row[0]][6])
+
+
+def test_vectorized_engine_matches_keyword_engine(tmp_path):
+    pytest.importorskip('scipy')
+    paths = []
+    for engine in ThreatClassifier.ENGINES:
+        path = str(tmp_path / f'{engine}.db')
+        ThreatDatabase(path).create_tables()
+        add_incidents(path, make_texts(80, seed=5))
+        ThreatClassifier(path, engine=engine).classify_batch(chunk_size=25)
+        paths.append(path)
+
+    keyword, vectorized = (classifications(path) for path in paths)
+    assert [row[:8] + row[9:] for row in keyword] == [row[:8] + row[9:] for row in vectorized]
+    assert [row[8] for row in keyword] == pytest.approx([row[8] for row in vectorized])
+
+
+def test_batch_resumes_past_watermark(db_path):
+    add_incidents(db_path, make_texts(10, seed=6))
+    classifier = ThreatClassifier(db_path)
+    assert classifier.classify_batch(chunk_size=4) == 10
+
+    add_incidents(db_path, make_texts(5, seed=7), start=10)
+    assert classifier.classify_batch(chunk_size=4) == 5
+    assert classifier.classify_batch() == 0
+
+    conn = connect(db_path)
+    assert get_watermark(conn, ThreatClassifier.STAGE) == 15
+    assert conn.execute('SELECT COUNT(DISTINCT incident_id) FROM threat_classifications').fetchone()[0] == 15
+    conn.close()
@@ -0,0 +1,59 @@
+"""
+Shared connections: one serialized writer, per-thread readers
+"""
+from concurrent.futures import ThreadPoolExecutor
+import sqlite3
+
+import pytest
+
+from src.database.connection import connect, read_connection, write_connection
+
+
+def test_threads_take_turns_writing(db_path):
+    def write(worker):
+        for n in range(50):
+            with write_connection(db_path) as conn:
+                count = conn.execute('SELECT COUNT(*) FROM incidents').fetchone()[0]
+                conn.execute("INSERT INTO incidents (incident_id, title, date_discovered) "
+                             "VALUES (?, ?, '2025-01-01')", (f'w{worker}-{n}', str(count)))
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(write, range(4)))
+
+    conn = connect(db_path)
+    # Serialized: every writer saw all earlier inserts
+    assert sorted(int(row[0]) for row in conn.execute('SELECT title FROM incidents')) == list(range(200))
+    conn.close()
+
+
+def test_block_commits_or_rolls_back(db_path):
+    with write_connection(db_path) as conn:
+        conn.execute("INSERT INTO incidents (incident_id, title, date_discovered) VALUES ('a', 'a', '2025-01-01')")
+    with pytest.raises(RuntimeError):
+        with write_connection(db_path) as conn:
+            conn.execute("INSERT INTO incidents (incident_id, title, date_discovered) "
+                         "VALUES ('b', 'b', '2025-01-01')")
+            raise RuntimeError
+
+    reader = read_connection(db_path)
+    assert reader is read_connection(db_path)
+    assert [row[0] for row in reader.execute('SELECT incident_id FROM incidents')] == ['a']
+
+
+def test_nested_blocks_restore_row_factory(db_path):
+    with write_connection(db_path) as outer:
+        outer.row_factory = sqlite3.Row
+        with write_connection(db_path) as inner:
+            assert inner is outer
+            inner.row_factory = None
+        assert outer.row_factory is sqlite3.Row
+    with write_connection(db_path) as conn:
+        assert conn.row_factory is None
+
+
+def test_read_only_connections_cannot_write(db_path):
+    conn = connect(db_path, read_only=True)
+    assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    with pytest.raises(sqlite3.OperationalError):
+        conn.execute("INSERT INTO incidents (incident_id, title, date_discovered) VALUES ('x', 'x', '2025-01-01')")
+    conn.close()
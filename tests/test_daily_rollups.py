@@ -0,0 +1,114 @@
+"""
+Trigger-maintained daily rollups against grouping the base tables
+"""
+import random
+
+from src.classifiers.threat_classifier import ThreatClassifier
+from src.database import dashboard_queries
+from src.database.connection import connect, write_connection
+from src.database.daily_rollups import (
+    CATEGORY_ROLLUP, DIMENSIONS, INCIDENT_ROLLUP, drop_daily_rollups, ensure_daily_rollups
+)
+from tests.conftest import add_incidents, make_texts
+
+SEVERITIES = ['critical', 'high', 'medium', 'low', None]
+
+
+def rollups(conn):
+    incident_rows = conn.execute(f'''
+        SELECT day, severity, source_type, incident_count FROM {INCIDENT_ROLLUP}
+    ''').fetchall()
+    category_rows = conn.execute(f'''
+        SELECT day, severity, source_type, dimension, category, subcategory, classification_count
+        FROM {CATEGORY_ROLLUP}
+    ''').fetchall()
+    return sorted(incident_rows, key=repr), sorted(category_rows, key=repr)
+
+
+def grouped(conn):
+    """The rollups computed from incidents and threat_classifications"""
+    incident_rows = conn.execute('''
+        SELECT DATE(date_discovered), severity, source_type, COUNT(*) FROM incidents
+        WHERE canonical_incident_id IS NULL
+        GROUP BY 1, 2, 3
+    ''').fetchall()
+    category_rows = []
+    for dimension in DIMENSIONS:
+        category_rows += conn.execute(f'''
+            SELECT DATE(i.date_discovered), i.severity, i.source_type, '{dimension}',
+                   tc.{dimension}_category, tc.{dimension}_subcategory, COUNT(*)
+            FROM threat_classifications tc JOIN incidents i ON i.incident_id = tc.incident_id
+            WHERE i.canonical_incident_id IS NULL
+            GROUP BY 1, 2, 3, 5, 6
+        ''').fetchall()
+    return sorted(incident_rows, key=repr), sorted(category_rows, key=repr)
+
+
+def assert_rollups_match(db_path):
+    conn = connect(db_path)
+    assert rollups(conn) == grouped(conn)
+    assert conn.execute(dashboard_queries.TOTAL_INCIDENTS).fetchone()[0] == conn.execute(
+        'SELECT COUNT(*) FROM incidents WHERE canonical_incident_id IS NULL').fetchone()[0]
+    conn.close()
+
+
+def test_rollups_follow_every_change(db_path):
+    incident_ids = add_incidents(db_path, make_texts(60, seed=20))
+    ThreatClassifier(db_path).classify_batch()
+    assert_rollups_match(db_path)
+
+    rng = random.Random(21)
+    for step in range(40):
+        incident_id = rng.choice(incident_ids)
+        with write_connection(db_path) as conn:
+            action = rng.choice(['severity', 'date', 'source', 'link', 'unlink',
+                                 'reclassify', 'unclassify', 'delete', 'insert'])
+            if action == 'severity':
+                conn.execute('UPDATE incidents SET severity = ? WHERE incident_id = ?',
+                             (rng.choice(SEVERITIES), incident_id))
+            elif action == 'date':
+                conn.execute('UPDATE incidents SET date_discovered = ? WHERE incident_id = ?',
+                             (rng.choice(['2025-03-01 10:00:00', '2025-03-02', '2024-12-31 23:59:59']), incident_id))
+            elif action == 'source':
+                conn.execute('UPDATE incidents SET source_type = ? WHERE incident_id = ?',
+                             (rng.choice(['news', 'cve', 'otx']), incident_id))
+            elif action == 'link':
+                conn.execute('UPDATE incidents SET canonical_incident_id = ? WHERE incident_id = ?',
+                             (rng.choice(incident_ids), incident_id))
+            elif action == 'unlink':
+                conn.execute('UPDATE incidents SET canonical_incident_id = NULL WHERE incident_id = ?',
+                             (incident_id,))
+            elif action == 'reclassify':
+                conn.execute('''
+                    UPDATE threat_classifications SET tech_category = ?, human_subcategory = NULL
+                    WHERE incident_id = ?
+                ''', (rng.choice(['malware', 'fraud', None]), incident_id))
+            elif action == 'unclassify':
+                conn.execute('DELETE FROM threat_classifications WHERE incident_id = ?', (incident_id,))
+            elif action == 'delete':
+                conn.execute('DELETE FROM threat_classifications WHERE incident_id = ?', (incident_id,))
+                conn.execute('DELETE FROM incidents WHERE incident_id = ?', (incident_id,))
+                incident_ids.remove(incident_id)
+            else:
+                incident_ids += add_incidents(db_path, make_texts(3, seed=step), start=100 + 3 * step)
+        if action in ('insert', 'unclassify'):
+            with write_connection(db_path) as conn:
+                conn.execute('DELETE FROM processing_watermarks WHERE stage = ?', (ThreatClassifier.STAGE,))
+            ThreatClassifier(db_path).classify_batch()
+        assert_rollups_match(db_path)
+
+
+def test_rebuild_matches_triggers(db_path):
+    add_incidents(db_path, make_texts(40, seed=22))
+    ThreatClassifier(db_path).classify_batch()
+    with write_connection(db_path) as conn:
+        conn.execute("UPDATE incidents SET severity = 'high' WHERE id % 3 = 0")
+        conn.execute("UPDATE incidents SET canonical_incident_id = 'inc-0' WHERE id % 5 = 0 AND id > 1")
+
+    conn = connect(db_path)
+    maintained = rollups(conn)
+    conn.close()
+    with write_connection(db_path) as conn:
+        drop_daily_rollups(conn)
+        ensure_daily_rollups(conn)
+        assert rollups(conn) == maintained
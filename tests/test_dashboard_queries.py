@@ -0,0 +1,108 @@
+"""
+Dashboard queries over the rollups against the base-table queries they replaced,
+and on the indexed schema against the same queries without the indexes
+"""
+import pytest
+
+from src.classifiers.mitre_mapper import MITREMapper
+from src.classifiers.severity_scorer import SeverityScorer
+from src.classifiers.threat_classifier import ThreatClassifier
+from src.database import dashboard_queries as queries
+from src.database.connection import connect, write_connection
+from src.database.schema import (
+    ACCESS_PATH_INDEXES, MIGRATIONS, SCHEMA_VERSION, ensure_schema_upgrades, schema_version
+)
+from tests.conftest import add_incidents, make_texts
+
+# (rollup query, original query, compare only the count column)
+EQUIVALENT = [
+    (queries.TOTAL_INCIDENTS, 'SELECT COUNT(*) as c FROM incidents', False),
+    (queries.CRITICAL_INCIDENTS, "SELECT COUNT(*) as c FROM incidents WHERE severity='critical'", False),
+    (queries.CLASSIFIED_INCIDENTS, 'SELECT COUNT(DISTINCT incident_id) as c FROM threat_classifications', False),
+    (queries.MITRE_TECHNIQUES, 'SELECT COUNT(DISTINCT technique_id) as c FROM mitre_mappings', False),
+    (queries.TOTAL_MAPPINGS, 'SELECT COUNT(*) as c FROM mitre_mappings', False),
+    (queries.TIMELINE, '''
+        SELECT DATE(date_discovered) as date, COUNT(*) as count
+        FROM incidents WHERE date_discovered IS NOT NULL
+        GROUP BY DATE(date_discovered) ORDER BY date
+    ''', False),
+    (queries.SEVERITY_DISTRIBUTION + ' ORDER BY severity', '''
+        SELECT severity, COUNT(*) as count FROM incidents
+        WHERE severity IS NOT NULL GROUP BY severity ORDER BY severity
+    ''', False),
+    (queries.TOP_TECH_CATEGORIES, '''
+        SELECT tech_category, COUNT(*) as count FROM threat_classifications
+        WHERE tech_category IS NOT NULL GROUP BY tech_category ORDER BY count DESC LIMIT 5
+    ''', True),
+    (queries.TOP_TECHNIQUES, '''
+        SELECT technique_id, technique_name, COUNT(DISTINCT incident_id) as count
+        FROM mitre_mappings GROUP BY technique_id, technique_name
+        ORDER BY count DESC LIMIT 3
+    ''', True),
+] + [
+    (queries.category_counts(dimension) + ' ORDER BY 1', f'''
+        SELECT {dimension}_category, COUNT(*) as c FROM threat_classifications
+        WHERE {dimension}_category IS NOT NULL GROUP BY {dimension}_category ORDER BY 1
+    ''', False) for dimension in ('tech', 'human', 'procedural')
+]
+
+
+@pytest.fixture
+def enriched_db(db_path):
+    add_incidents(db_path, make_texts(120, seed=54))
+    with write_connection(db_path) as conn:
+        conn.execute("UPDATE incidents SET date_discovered = '2025-02-0' || (id % 9 + 1) || ' 08:00:00'")
+    ThreatClassifier(db_path).classify_batch()
+    MITREMapper(db_path).map_all_unmapped()
+    SeverityScorer(db_path).backfill()
+    return db_path
+
+
+@pytest.mark.parametrize('rollup_sql, original_sql, counts_only', EQUIVALENT)
+def test_rollup_query_matches_original(enriched_db, rollup_sql, original_sql, counts_only):
+    conn = connect(enriched_db)
+    rollup, original = conn.execute(rollup_sql).fetchall(), conn.execute(original_sql).fetchall()
+    conn.close()
+    if counts_only:  # ties may order differently
+        rollup, original = [row[-1] for row in rollup], [row[-1] for row in original]
+    assert rollup == original
+
+
+def results(conn):
+    """Rows of every dashboard query; only the counts of top-N queries, whose ties may order differently"""
+    return [[row[-1] for row in conn.execute(sql)] if 'LIMIT' in sql else
+            sorted(conn.execute(sql).fetchall(), key=repr)
+            for _, sql in queries.DASHBOARD_QUERIES]
+
+
+def test_indexes_do_not_change_results(enriched_db):
+    conn = connect(enriched_db)
+    indexed = results(conn)
+    for name in ACCESS_PATH_INDEXES:
+        conn.execute(f'DROP INDEX {name}')
+    conn.execute('PRAGMA user_version = 1')
+    conn.commit()
+    assert results(conn) == indexed
+
+    ensure_schema_upgrades(conn)
+    assert {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")} >= \
+        set(ACCESS_PATH_INDEXES)
+    assert results(conn) == indexed
+    conn.close()
+
+
+def test_migrations_are_idempotent(enriched_db):
+    def schema(conn):
+        return sorted(conn.execute("SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'"))
+
+    with write_connection(enriched_db) as conn:
+        assert schema_version(conn) == SCHEMA_VERSION
+        before = schema(conn)
+        ensure_schema_upgrades(conn)
+        # Re-running a migration after a crash must not change anything
+        for _, _, migrate in MIGRATIONS:
+            migrate(conn)
+        assert schema(conn) == before
+        for rollup_sql, original_sql, counts_only in EQUIVALENT:
+            if not counts_only:
+                assert conn.execute(rollup_sql).fetchall() == conn.execute(original_sql).fetchall()
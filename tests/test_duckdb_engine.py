@@ -0,0 +1,96 @@
+"""
+The DuckDB engine against running the same query on SQLite
+"""
+import pandas as pd
+import pytest
+
+pytest.importorskip('duckdb')
+pytest.importorskip('pyarrow')
+
+from src.analytics.duckdb_engine import AnalyticsEngine
+from src.classifiers.enrichment_pipeline import EnrichmentPipeline
+from src.database.connection import connect, write_connection
+from src.reports.parquet_snapshot import ParquetSnapshot
+from tests.conftest import add_incidents, make_texts
+from tests.test_parquet_snapshot import add_spread
+
+QUERIES = [
+    '''SELECT i.incident_id, i.severity, i.source_type, tc.tech_category, tc.human_subcategory
+       FROM incidents i LEFT JOIN threat_classifications tc ON tc.incident_id = i.incident_id
+       ORDER BY i.incident_id''',
+    '''SELECT technique_id, COUNT(*) AS mappings, COUNT(DISTINCT incident_id) AS incidents
+       FROM mitre_mappings GROUP BY technique_id ORDER BY technique_id''',
+]
+
+
+def assert_engine_matches_sqlite(engine, db_path):
+    conn = connect(db_path)
+    for sql in QUERIES:
+        expected = pd.read_sql_query(sql, conn).astype(str)
+        assert engine.query(sql).astype(str).equals(expected), sql
+    conn.close()
+
+
+def test_engine_follows_the_database(tmp_path, db_path):
+    add_spread(db_path, 150, 0, seed=26)
+    EnrichmentPipeline(db_path).run()
+    parquet_dir = str(tmp_path / 'parquet')
+    ParquetSnapshot(db_path, parquet_dir).snapshot()
+
+    engine = AnalyticsEngine(db_path, parquet_dir)
+    assert_engine_matches_sqlite(engine, db_path)
+
+    # Changes to snapshotted rows, and new rows not enriched yet
+    with write_connection(db_path) as conn:
+        conn.execute("UPDATE incidents SET severity = 'low' WHERE id IN (1, 2, 100)")
+        conn.execute("UPDATE threat_classifications SET tech_category = 'changed' WHERE incident_id = 'inc-50'")
+        for table in ('threat_classifications', 'mitre_mappings', 'incidents'):
+            conn.execute(f"DELETE FROM {table} WHERE incident_id = 'inc-60'")
+    add_incidents(db_path, make_texts(20, seed=27), start=150)
+    assert_engine_matches_sqlite(engine, db_path)
+
+    EnrichmentPipeline(db_path).run()
+    assert_engine_matches_sqlite(engine, db_path)
+
+    ParquetSnapshot(db_path, parquet_dir).snapshot()
+    assert_engine_matches_sqlite(engine, db_path)
+
+
+def test_refresh_rereads_only_what_may_have_changed(tmp_path, db_path, monkeypatch):
+    add_spread(db_path, 150, 0, seed=28)
+    EnrichmentPipeline(db_path).run()
+    parquet_dir = str(tmp_path / 'parquet')
+    ParquetSnapshot(db_path, parquet_dir).snapshot()
+    add_incidents(db_path, make_texts(40, seed=29), start=150)
+    EnrichmentPipeline(db_path).run()
+
+    engine = AnalyticsEngine(db_path, parquet_dir)
+    assert_engine_matches_sqlite(engine, db_path)
+
+    incidents_read = []
+    pending_rows = engine.snapshot.pending_rows
+
+    def counted(conn, table, *args):
+        rows = pending_rows(conn, table, *args)
+        if table == 'incidents':
+            incidents_read.append(rows.num_rows)
+        return rows
+
+    monkeypatch.setattr(engine.snapshot, 'pending_rows', counted)
+
+    # Only the new incident, not the 40 enriched since the snapshot
+    add_incidents(db_path, make_texts(1, seed=30), start=190)
+    assert_engine_matches_sqlite(engine, db_path)
+    assert incidents_read == [1]
+
+    # The new incident again (not enriched when read) and the changed partition
+    EnrichmentPipeline(db_path).run()
+    with write_connection(db_path) as conn:
+        conn.execute("UPDATE incidents SET severity = 'low' WHERE id = 5")
+        month, source_type = conn.execute(
+            "SELECT strftime('%Y-%m', date_discovered), source_type FROM incidents WHERE id = 5").fetchone()
+        partition_size = conn.execute(
+            "SELECT COUNT(*) FROM incidents WHERE strftime('%Y-%m', date_discovered) IS ? AND source_type IS ?",
+            (month, source_type)).fetchone()[0]
+    assert_engine_matches_sqlite(engine, db_path)
+    assert incidents_read == [1, 1 + partition_size]
@@ -0,0 +1,52 @@
+"""
+The one-pass enrichment pipeline against running each stage on its own
+"""
+from src.classifiers.enrichment_pipeline import EnrichmentPipeline
+from src.classifiers.mitre_mapper import MITREMapper
+from src.classifiers.severity_scorer import SeverityScorer
+from src.classifiers.subsector_tagger import SubsectorTagger
+from src.classifiers.threat_classifier import ThreatClassifier
+from src.database.connection import connect, write_connection
+from src.database.schema import ThreatDatabase
+from tests.conftest import add_incidents, make_texts
+from tests.test_batch_classification import classifications
+from tests.test_mitre_upsert import stored
+
+
+def enriched(db_path):
+    conn = connect(db_path)
+    incidents = conn.execute('SELECT incident_id, severity, subsector FROM incidents ORDER BY id').fetchall()
+    watermarks = dict(conn.execute('SELECT stage, last_incident_rowid FROM processing_watermarks'))
+    conn.close()
+    return incidents, classifications(db_path), sorted(stored(db_path)), watermarks
+
+
+def run_stages(db_path):
+    ThreatClassifier(db_path).classify_batch()
+    MITREMapper(db_path).map_all_unmapped()
+    SeverityScorer(db_path).backfill()
+    SubsectorTagger(db_path).backfill()
+
+
+def test_pipeline_matches_separate_stages(tmp_path):
+    paths = [str(tmp_path / f'{name}.db') for name in ('pipeline', 'stages')]
+    texts = make_texts(70, seed=46)
+    for path in paths:
+        ThreatDatabase(path).create_tables()
+        add_incidents(path, texts[:40])
+        with write_connection(path) as conn:
+            # Set by a collector; near-duplicate copies are never enriched
+            conn.execute("UPDATE incidents SET severity = 'high', cvss_score = 7.5 WHERE id % 6 = 0")
+            conn.execute("UPDATE incidents SET canonical_incident_id = 'inc-0' WHERE id % 9 = 0")
+
+    # One stage already ran on its own: the pipeline must not repeat it
+    ThreatClassifier(paths[0]).classify_batch(chunk_size=8)
+    EnrichmentPipeline(paths[0]).run(chunk_size=7)
+    run_stages(paths[1])
+    assert enriched(paths[0]) == enriched(paths[1])
+
+    for path in paths:
+        add_incidents(path, texts[40:], start=40)
+    EnrichmentPipeline(paths[0]).run(chunk_size=7)
+    run_stages(paths[1])
+    assert enriched(paths[0]) == enriched(paths[1])
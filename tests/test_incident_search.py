@@ -0,0 +1,124 @@
+"""
+FTS5 incident search against scanning the incident texts
+"""
+import random
+import re
+
+import pytest
+
+from src.database import incident_search
+from src.database.connection import connect, write_connection
+from src.database.incident_search import FTS_TABLE, fts_query, search_incidents
+from tests.conftest import add_incidents
+
+# Words the porter stemmer leaves distinct from each other
+VOCABULARY = ['zebra', 'quokka', 'wallet', 'ledger', 'token', 'vault', 'valve',
+              'cobalt', 'falcon', 'orbit', 'river', 'meadow']
+
+
+def corpus(count, seed):
+    rng = random.Random(seed)
+    return [(' '.join(rng.choices(VOCABULARY, k=3)), ' '.join(rng.choices(VOCABULARY, k=8)))
+            for _ in range(count)]
+
+
+def baseline(db_path, words=(), prefixes=(), phrases=()):
+    """incident_ids whose title or description holds every word, prefix and phrase"""
+    conn = connect(db_path)
+    matched = set()
+    for incident_id, title, description in conn.execute(
+            'SELECT incident_id, title, description FROM incidents'):
+        columns = [re.findall(r'\w+', (text or '').lower()) for text in (title, description)]
+        tokens = set(columns[0]) | set(columns[1])
+        if not all(word in tokens for word in words):
+            continue
+        if not all(any(token.startswith(prefix) for token in tokens) for prefix in prefixes):
+            continue
+        if not all(any(' '.join(phrase) in ' '.join(column) for column in columns)
+                   for phrase in phrases):
+            continue
+        matched.add(incident_id)
+    conn.close()
+    return matched
+
+
+def all_results(db_path, query, page_size):
+    """Every result of a query, page by page"""
+    results = []
+    page = 1
+    while True:
+        response = search_incidents(query, page=page, page_size=page_size, db_path=db_path)
+        if not response['results']:
+            return response['total'], results
+        results += [result['incident_id'] for result in response['results']]
+        page += 1
+
+
+@pytest.mark.parametrize('query, words, prefixes, phrases', [
+    ('zebra', ['zebra'], [], []),
+    ('zebra wallet', ['zebra', 'wallet'], [], []),
+    ('va*', [], ['va'], []),
+    ('"ledger token" orbit', ['orbit'], [], [('ledger', 'token')]),
+])
+def test_results_match_text_scan(db_path, query, words, prefixes, phrases):
+    add_incidents(db_path, corpus(150, seed=15))
+    expected = baseline(db_path, words, prefixes, phrases)
+    assert expected
+
+    total, results = all_results(db_path, query, page_size=7)
+    assert total == len(expected)
+    assert len(results) == len(set(results))
+    assert set(results) == expected
+
+
+def test_pages_past_the_rank_window(db_path, monkeypatch):
+    monkeypatch.setattr(incident_search, 'RANK_WINDOW', 10)
+    add_incidents(db_path, corpus(150, seed=16))
+    expected = baseline(db_path, ['falcon'])
+    assert len(expected) > 10
+
+    total, results = all_results(db_path, 'falcon', page_size=4)
+    assert total == len(expected)
+    assert len(results) == len(set(results))
+    assert set(results) == expected
+
+
+@pytest.mark.parametrize('text', [
+    'zebra AND', 'OR', 'NOT wallet', 'NEAR(zebra wallet)', 'zebra -wallet', '^zebra',
+    'title:zebra', 'zebra"', '"unbalanced', '"a ""b"" c"', '***', '(', 'zebra) OR (wallet',
+    "o'brien", 'c++ & c#', '—', '',
+])
+def test_operators_and_punctuation_are_plain_text(db_path, text):
+    add_incidents(db_path, corpus(30, seed=17))
+    # Every term is a quoted string: FTS5 accepts the query
+    match = fts_query(text)
+    if match:
+        conn = connect(db_path)
+        conn.execute(f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?', (match,))
+        conn.close()
+    search_incidents(text, db_path=db_path)
+
+
+def test_operator_words_are_searched_literally(db_path):
+    add_incidents(db_path, [('Not a wallet', 'near the river'), ('wallet', 'zebra')])
+    assert search_incidents('NOT wallet', db_path=db_path)['total'] == 1
+    assert search_incidents('NEAR river', db_path=db_path)['total'] == 1
+    assert fts_query('bank* "card fraud" x') == '"bank"* "card fraud" "x"'
+
+
+def test_index_follows_updates_and_deletes(db_path):
+    add_incidents(db_path, corpus(60, seed=18))
+    with write_connection(db_path) as conn:
+        conn.execute("UPDATE incidents SET title = 'meadow meadow', description = NULL "
+                     "WHERE id % 4 = 0")
+        conn.execute("UPDATE incidents SET severity = 'high' WHERE id % 5 = 0")
+        conn.execute('DELETE FROM incidents WHERE id % 7 = 0')
+
+    for word in ('meadow', 'cobalt', 'river'):
+        total, results = all_results(db_path, word, page_size=50)
+        assert set(results) == baseline(db_path, [word])
+        assert total == len(results)
+
+    conn = connect(db_path)
+    conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('integrity-check', 1)")
+    conn.close()
@@ -0,0 +1,154 @@
+"""
+Ingest normalization: HTML cleaning and the back-fill of stored news items
+"""
+import random
+
+import pytest
+
+from src.classifiers.enrichment_pipeline import EnrichmentPipeline
+from src.classifiers.keyword_index import KeywordIndex
+from src.collectors.ingest import backfill, html_to_text, raw_body
+from src.database.connection import connect, write_connection
+from src.database.schema import ThreatDatabase
+from tests.conftest import KEYWORDS
+
+
+@pytest.mark.parametrize('markup, expected', [
+    ('', ''),
+    (None, ''),
+    ('plain  text\n here', 'plain text here'),
+    ('AT&amp;T &lt;b&gt;', 'AT&T <b>'),
+    ('<p>One</p><p>Two</p>', 'One Two'),
+    ('<p>ba<i>nk</i> run</p>', 'bank run'),
+    ('line<br>break<br/>again', 'line break again'),
+    ('<p>text<script>var x = 1;</script><style>p {}</style><!-- note --> end</p>', 'text end'),
+    ('<p>It&amp;#8217;s here</p>', 'It’s here'),
+    ('<p>Fish &amp;amp; chips</p>', 'Fish & chips'),
+    ('<p>1 &lt; 2 &amp;&amp; 3 &gt; 2</p>', '1 < 2 && 3 > 2'),
+    ('<p>&#60;tag&#62; stays text</p>', '<tag> stays text'),
+    ('<ul><li>a</li><li>b</li></ul>c', 'a b c'),
+    ('caf&eacute; <b>ol&eacute;</b>', 'café olé'),
+])
+def test_html_to_text(markup, expected):
+    assert html_to_text(markup) == expected
+
+
+def news_items(seed, count=150):
+    """(incident_id, raw title, raw description) of news items, some with markup"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(count):
+        title = ' '.join(rng.choices(KEYWORDS, k=5))
+        description = ' '.join(rng.choices(KEYWORDS, k=25))
+        if i % 3 == 0:
+            title = f'<b>{title}</b>'
+        if i % 2:
+            description = f'<p>{description.replace(" ", "</p><p>", 2)}&amp;nbsp;</p>'
+        if i % 5 == 0:
+            # Tags inside a word: cleaning changes the words matched
+            description = description.replace('bank', 'ba<i>nk</i>')
+        items.append((f'n-{i}', title, description))
+    return items
+
+
+def build(db_path, items):
+    ThreatDatabase(db_path).create_tables()
+    with write_connection(db_path) as conn:
+        conn.executemany("INSERT INTO incidents (incident_id, title, description, date_discovered, source_type) "
+                         "VALUES (?, ?, ?, '2025-01-01', 'news')", items)
+    EnrichmentPipeline(db_path).run()
+    KeywordIndex(db_path).update()
+
+
+DERIVED = [
+    'SELECT incident_id, title, description, severity, subsector FROM incidents ORDER BY 1',
+    '''SELECT incident_id, tech_category, tech_subcategory, human_category, human_subcategory,
+              procedural_category, procedural_subcategory, confidence_score, text_hash
+       FROM threat_classifications ORDER BY 1''',
+    '''SELECT incident_id, technique_id, sub_technique_id, confidence, mapping_source
+       FROM mitre_mappings ORDER BY 1, 2, 3''',
+    '''SELECT t.term, p.incident_rowid FROM term_postings p JOIN index_terms t USING (term_id)
+       ORDER BY 1, 2''',
+]
+
+
+def test_backfill_matches_ingesting_clean_text(tmp_path):
+    items = news_items(seed=34)
+    clean = [(incident_id, html_to_text(title), html_to_text(description))
+             for incident_id, title, description in items]
+
+    backfilled, baseline = str(tmp_path / 'backfilled.db'), str(tmp_path / 'clean.db')
+    build(backfilled, items)
+    build(baseline, clean)
+
+    changed = sum(1 for item, clean_item in zip(items, clean) if item != clean_item)
+    assert backfill(backfilled, keep_raw=True, chunk_size=40)[1] == changed
+
+    backfilled_conn, baseline_conn = connect(backfilled), connect(baseline)
+    for sql in DERIVED:
+        assert backfilled_conn.execute(sql).fetchall() == baseline_conn.execute(sql).fetchall(), sql
+
+    # Originals of changed descriptions are kept
+    for (incident_id, _, description), (_, _, clean_description) in zip(items, clean):
+        expected = description if clean_description != description else None
+        assert raw_body(backfilled_conn, incident_id) == expected
+    backfilled_conn.close()
+    baseline_conn.close()
+
+    assert backfill(backfilled)[1] == 0
+
+
+def test_backfill_leaves_later_incidents_to_the_enrichers(tmp_path):
+    items = news_items(seed=35, count=60)
+    clean = [(incident_id, html_to_text(title), html_to_text(description))
+             for incident_id, title, description in items]
+
+    backfilled, baseline = str(tmp_path / 'backfilled.db'), str(tmp_path / 'clean.db')
+    build(backfilled, items[:30])
+    build(baseline, clean[:30])
+    # Stored but not enriched yet
+    for path, rows in ((backfilled, items[30:]), (baseline, clean[30:])):
+        with write_connection(path) as conn:
+            conn.executemany("INSERT INTO incidents (incident_id, title, description, date_discovered, "
+                             "source_type) VALUES (?, ?, ?, '2025-01-01', 'news')", rows)
+
+    backfill(backfilled)
+    for path in (backfilled, baseline):
+        EnrichmentPipeline(path).run()
+        KeywordIndex(path).update()
+
+    backfilled_conn, baseline_conn = connect(backfilled), connect(baseline)
+    for sql in DERIVED:
+        assert backfilled_conn.execute(sql).fetchall() == baseline_conn.execute(sql).fetchall(), sql
+    backfilled_conn.close()
+    baseline_conn.close()
+
+
+def test_backfill_keeps_hand_set_severity_and_subsector(tmp_path):
+    items = news_items(seed=36, count=60)
+    clean = [(incident_id, html_to_text(title), html_to_text(description))
+             for incident_id, title, description in items]
+
+    backfilled, baseline = str(tmp_path / 'backfilled.db'), str(tmp_path / 'clean.db')
+    build(backfilled, items)
+    build(baseline, clean)
+    for path in (backfilled, baseline):
+        with write_connection(path) as conn:
+            conn.execute("UPDATE incidents SET severity = 'analyst' WHERE id % 4 = 0")
+            conn.execute("UPDATE incidents SET subsector = 'analyst' WHERE id % 6 = 0")
+
+    changed = {item[0] for item, clean_item in zip(items, clean) if item != clean_item}
+    conn = connect(backfilled)
+    expected_kept = sum((severity == 'analyst') + (subsector == 'analyst') for incident_id, severity, subsector
+                        in conn.execute('SELECT incident_id, severity, subsector FROM incidents')
+                        if incident_id in changed)
+    conn.close()
+    assert expected_kept > 0
+
+    assert backfill(backfilled, chunk_size=25)[2] == expected_kept
+
+    sql = DERIVED[0]
+    backfilled_conn, baseline_conn = connect(backfilled), connect(baseline)
+    assert backfilled_conn.execute(sql).fetchall() == baseline_conn.execute(sql).fetchall()
+    backfilled_conn.close()
+    baseline_conn.close()
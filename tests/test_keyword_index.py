@@ -0,0 +1,68 @@
+"""
+Targeted reclassification after taxonomy edits against reclassifying everything
+"""
+import copy
+
+import pytest
+
+from src.classifiers import threat_classifier
+from src.classifiers.keyword_index import KeywordIndex, changed_keywords
+from src.classifiers.keyword_matcher import TaxonomyMatcher, incident_text, taxonomy_fingerprint
+from src.classifiers.threat_classifier import TAXONOMIES, TAXONOMY_FINGERPRINTS, ThreatClassifier
+from src.database.connection import connect
+from src.database.schema import ThreatDatabase
+from tests.conftest import KEYWORDS, add_incidents, make_texts
+from tests.test_batch_classification import classifications
+
+
+@pytest.fixture
+def edited_taxonomy(monkeypatch):
+    """Switch the classifier to a tech taxonomy with keywords added and removed"""
+    def edit():
+        tech = copy.deepcopy(TAXONOMIES['tech'])
+        tech['malware']['keywords'].remove('ransomware')
+        tech['network']['subcategories']['ddos'].append('bank')
+        tech['application']['keywords'].append('payment')
+        monkeypatch.setitem(TAXONOMIES, 'tech', tech)
+        monkeypatch.setitem(TAXONOMY_FINGERPRINTS, 'tech', taxonomy_fingerprint(tech))
+        monkeypatch.setattr(threat_classifier, 'TAXONOMY_MATCHER', TaxonomyMatcher(TAXONOMIES))
+    return edit
+
+
+def test_changed_keywords():
+    tech = copy.deepcopy(TAXONOMIES['tech'])
+    tech['malware']['keywords'].remove('ransomware')
+    tech['network']['subcategories']['ddos'].append('bank')
+    assert changed_keywords(TAXONOMIES['tech'], tech) == {'ransomware', 'bank'}
+    assert changed_keywords(tech, tech) == set()
+
+
+def test_candidates_cover_substring_matches(db_path):
+    add_incidents(db_path, make_texts(80, seed=39))
+    KeywordIndex(db_path).update()
+    conn = connect(db_path)
+    texts = {rowid: incident_text({'title': title, 'description': description})
+             for rowid, title, description in conn.execute('SELECT id, title, description FROM incidents')}
+    index = KeywordIndex(db_path)
+    for keyword in KEYWORDS[::7] + ['denial of service', 'man-in-the-middle', 'ank']:
+        assert {rowid for rowid, text in texts.items() if keyword in text} <= index.candidates(conn, keyword)
+    conn.close()
+
+
+def test_taxonomy_edit_matches_full_reclassification(tmp_path, db_path, edited_taxonomy):
+    texts = make_texts(120, seed=40)
+    add_incidents(db_path, texts)
+    ThreatClassifier(db_path).classify_batch()
+    KeywordIndex(db_path).update()
+
+    edited_taxonomy()
+    assert KeywordIndex(db_path).apply_taxonomy_changes(chunk_size=9) > 0
+
+    fresh_path = str(tmp_path / 'fresh.db')
+    ThreatDatabase(fresh_path).create_tables()
+    add_incidents(fresh_path, texts)
+    ThreatClassifier(fresh_path).classify_batch()
+    assert classifications(db_path) == classifications(fresh_path)
+
+    assert ThreatClassifier(db_path).reclassify_changed() == 0
+    assert KeywordIndex(db_path).apply_taxonomy_changes() == 0
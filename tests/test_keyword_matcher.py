@@ -0,0 +1,78 @@
+"""
+The compiled keyword automaton against plain substring checks
+"""
+import random
+
+from config.taxonomy import TECH_TAXONOMY, HUMAN_TAXONOMY, PROCEDURAL_TAXONOMY
+from src.classifiers.keyword_matcher import KeywordMatcher, TaxonomyMatcher
+from src.classifiers.threat_classifier import ThreatClassifier
+from tests.conftest import KEYWORDS, make_texts
+
+
+def baseline_classify(text, taxonomy):
+    """The per-dimension loop the classifier used before the automaton"""
+    best_category = None
+    best_subcategory = None
+    best_score = 0
+
+    for category, data in taxonomy.items():
+        category_score = sum(1 for kw in data['keywords'] if kw in text)
+        for subcat, subcat_keywords in data['subcategories'].items():
+            subcat_score = sum(1 for kw in subcat_keywords if kw in text)
+            total_score = category_score + subcat_score * 2
+            if total_score > best_score:
+                best_score = total_score
+                best_category = category
+                best_subcategory = subcat
+
+    confidence = min(best_score / 5.0, 1.0) if best_score > 0 else 0.0
+    return best_category, best_subcategory, confidence
+
+
+def test_find_matches_substring_checks():
+    matcher = KeywordMatcher(KEYWORDS)
+    for title, description in make_texts(300, seed=1):
+        text = f'{title} {description}'.lower()
+        assert matcher.find_keywords(text) == {kw for kw in KEYWORDS if kw in text}
+
+
+def test_overlapping_keywords():
+    matcher = KeywordMatcher(['he', 'she', 'his', 'hers', 'she'])
+    assert matcher.keywords == ['he', 'she', 'his', 'hers']
+    assert matcher.find_keywords('ushers') == {'he', 'she', 'hers'}
+    assert matcher.find_keywords('ahishe') == {'his', 'she', 'he'}
+    assert matcher.find_keywords('') == set()
+
+
+def test_random_alphabet_matches_substring_checks():
+    rng = random.Random(2)
+    keywords = [''.join(rng.choices('abc', k=rng.randint(1, 4))) for _ in range(40)]
+    matcher = KeywordMatcher(keywords)
+    for _ in range(200):
+        text = ''.join(rng.choices('abcd', k=rng.randint(0, 30)))
+        assert matcher.find_keywords(text) == {kw for kw in keywords if kw in text}
+
+
+def test_taxonomy_scores_match_baseline():
+    classifier = ThreatClassifier()
+    for title, description in make_texts(500, seed=3):
+        text = f'{title} {description}'.lower()
+        expected = tuple(baseline_classify(text, taxonomy) for taxonomy in
+                         (TECH_TAXONOMY, HUMAN_TAXONOMY, PROCEDURAL_TAXONOMY))
+        assert classifier.classify_text(text) == expected
+
+
+def test_duplicate_keywords_count_per_occurrence():
+    taxonomy = {
+        'a': {'keywords': ['x', 'x'], 'subcategories': {'a1': ['y']}},
+        'b': {'keywords': ['z'], 'subcategories': {'b1': ['y', 'y']}},
+    }
+    matcher = TaxonomyMatcher({'tech': taxonomy})
+    for text in ('x y', 'z y', 'x z y', 'y', 'nothing'):
+        assert matcher.score(text)['tech'] == baseline_classify(text, taxonomy)
+
+
+def test_ties_keep_first_slot():
+    text = ' '.join(data['keywords'][0] for data in TECH_TAXONOMY.values())
+    assert TaxonomyMatcher({'tech': TECH_TAXONOMY}).score(text)['tech'] == \
+        baseline_classify(text, TECH_TAXONOMY)
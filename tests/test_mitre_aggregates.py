@@ -0,0 +1,74 @@
+"""
+Trigger-maintained MITRE aggregates against grouping mitre_mappings
+"""
+import random
+
+import pytest
+
+from src.classifiers.mitre_mapper import INSERT_MAPPING_SQL
+from src.database.connection import connect, write_connection
+from src.database.mitre_aggregates import AGGREGATES
+from tests.conftest import add_incidents, make_texts
+
+TECHNIQUES = [('T1566', 'Phishing', 'TA0001', 'Initial Access'),
+              ('T1078', 'Valid Accounts', 'TA0001', 'Initial Access'),
+              ('T1078', 'Valid Accounts', 'TA0003', 'Persistence'),
+              ('T1486', 'Data Encrypted for Impact', 'TA0040', 'Impact'),
+              ('T1110', '', None, None)]
+
+
+def assert_aggregates_match(db_path):
+    conn = connect(db_path)
+    for table, columns in AGGREGATES.items():
+        column_list = ', '.join(columns)
+        aggregate = conn.execute(f'''
+            SELECT {column_list}, mapping_count, incident_count, confidence_sum
+            FROM {table} ORDER BY {column_list}
+        ''').fetchall()
+        grouped = conn.execute(f'''
+            SELECT {column_list}, COUNT(*), COUNT(DISTINCT incident_id), SUM(COALESCE(confidence, 0))
+            FROM mitre_mappings GROUP BY {column_list} ORDER BY {column_list}
+        ''').fetchall()
+        assert [row[:-1] for row in aggregate] == [row[:-1] for row in grouped], table
+        assert [row[-1] for row in aggregate] == pytest.approx([row[-1] for row in grouped]), table
+    conn.close()
+
+
+def test_aggregates_follow_inserts_updates_and_deletes(db_path):
+    incident_ids = add_incidents(db_path, make_texts(8, seed=13))
+    rng = random.Random(14)
+
+    for _ in range(30):
+        with write_connection(db_path) as conn:
+            action = rng.choice(['insert', 'insert', 'update', 'move', 'delete'])
+            if action == 'insert':
+                technique_id, technique_name, tactic_id, tactic_name = rng.choice(TECHNIQUES)
+                conn.executemany(INSERT_MAPPING_SQL, [
+                    (rng.choice(incident_ids), tactic_id, tactic_name, technique_id, technique_name,
+                     rng.choice([None, '001']), None, rng.choice([0.2, 0.5, None]),
+                     rng.choice(['automated_keyword', 'otx']), '2025-01-01')
+                    for _ in range(rng.randint(1, 6))
+                ])
+            elif action == 'update':
+                conn.execute('UPDATE mitre_mappings SET confidence = ? WHERE id % 3 = ?',
+                             (rng.random(), rng.randint(0, 2)))
+            elif action == 'move':
+                technique_id, technique_name, tactic_id, tactic_name = rng.choice(TECHNIQUES)
+                conn.execute('''
+                    UPDATE OR IGNORE mitre_mappings
+                    SET technique_id = ?, technique_name = ?, tactic_id = ?, tactic_name = ?,
+                        incident_id = ?
+                    WHERE id = (SELECT id FROM mitre_mappings ORDER BY random() LIMIT 1)
+                ''', (technique_id, technique_name, tactic_id, tactic_name, rng.choice(incident_ids)))
+            else:
+                conn.execute('DELETE FROM mitre_mappings WHERE incident_id = ?',
+                             (rng.choice(incident_ids),))
+        assert_aggregates_match(db_path)
+
+    with write_connection(db_path) as conn:
+        conn.execute('DELETE FROM mitre_mappings')
+    assert_aggregates_match(db_path)
+    conn = connect(db_path)
+    for table in AGGREGATES:
+        assert conn.execute(f'SELECT COUNT(*) FROM {table}_incidents').fetchone()[0] == 0
+    conn.close()
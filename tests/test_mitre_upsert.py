@@ -0,0 +1,77 @@
+"""
+The mitre_mappings upsert against merging the same rows in Python
+"""
+import random
+
+import pytest
+
+from src.classifiers.mitre_mapper import INSERT_MAPPING_SQL, MITREMapper
+from src.database.connection import connect, write_connection
+from tests.conftest import add_incidents, make_texts
+
+SOURCES = ('automated_keyword', 'otx', 'manual')
+
+
+def merge(rows):
+    """(incident_id, technique_id, sub_technique_id) -> (confidence, mapping_source)"""
+    merged = {}
+    for incident_id, technique_id, sub_technique_id, confidence, source in rows:
+        key = (incident_id, technique_id, sub_technique_id)
+        if key not in merged:
+            merged[key] = (confidence, source)
+            continue
+        old_confidence, old_source = merged[key]
+        if source in old_source.split('+'):
+            merged[key] = (max(old_confidence, confidence), old_source)
+        else:
+            merged[key] = (1 - (1 - old_confidence) * (1 - confidence), f'{old_source}+{source}')
+    return merged
+
+
+def stored(db_path):
+    conn = connect(db_path)
+    rows = conn.execute('''
+        SELECT incident_id, technique_id, sub_technique_id, confidence, mapping_source
+        FROM mitre_mappings
+    ''').fetchall()
+    conn.close()
+    return rows
+
+
+def test_upsert_matches_python_merge(db_path):
+    incident_ids = add_incidents(db_path, make_texts(5, seed=10))
+    rng = random.Random(11)
+    rows = [(rng.choice(incident_ids), rng.choice(['T1566', 'T1078', 'T1486']),
+             rng.choice([None, None, '001', '002']), round(rng.uniform(0.1, 0.9), 2),
+             rng.choice(SOURCES))
+            for _ in range(300)]
+
+    with write_connection(db_path) as conn:
+        conn.executemany(INSERT_MAPPING_SQL, [
+            (incident_id, 'TA0001', 'Initial Access', technique_id, technique_id,
+             sub_technique_id, None, confidence, source, '2025-01-01')
+            for incident_id, technique_id, sub_technique_id, confidence, source in rows
+        ])
+
+    result = stored(db_path)
+    assert len(result) == len({row[:3] for row in result})
+
+    expected = merge(rows)
+    assert {row[:3] for row in result} == set(expected)
+    for incident_id, technique_id, sub_technique_id, confidence, source in result:
+        expected_confidence, expected_source = expected[(incident_id, technique_id, sub_technique_id)]
+        assert confidence == pytest.approx(expected_confidence)
+        assert source == expected_source
+
+
+def test_remapping_is_idempotent(db_path):
+    add_incidents(db_path, make_texts(40, seed=12))
+    mapper = MITREMapper(db_path)
+    mapper.map_all_unmapped()
+    first = sorted(stored(db_path))
+    assert first
+
+    with write_connection(db_path) as conn:
+        conn.execute('DELETE FROM processing_watermarks WHERE stage = ?', (MITREMapper.STAGE,))
+    mapper.map_all_unmapped()
+    assert sorted(stored(db_path)) == first
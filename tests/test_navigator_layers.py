@@ -0,0 +1,104 @@
+"""
+Sliced Navigator layers against filtering the mappings per slice
+"""
+from datetime import date, datetime, timedelta
+import json
+import os
+import random
+
+import pytest
+
+from src.classifiers.mitre_mapper import INSERT_MAPPING_SQL
+from src.database.connection import connect, read_connection, write_connection
+from src.reports.navigator_layers import NavigatorLayers, _file_name
+from tests.conftest import add_incidents, make_texts
+
+TODAY = datetime(2025, 3, 19)
+
+
+def populate(db_path, seed):
+    incident_ids = add_incidents(db_path, make_texts(60, seed=seed))
+    rng = random.Random(seed)
+    with write_connection(db_path) as conn:
+        for incident_id in incident_ids:
+            conn.execute('''
+                UPDATE incidents SET subsector = ?, source_type = ?, date_discovered = ?
+                WHERE incident_id = ?
+            ''', (rng.choice(['digital_banking', 'payments', None]), rng.choice(['news', 'cve', None]),
+                  (TODAY - timedelta(days=rng.randint(0, 40))).strftime('%Y-%m-%d %H:%M:%S'), incident_id))
+        conn.executemany(INSERT_MAPPING_SQL, [
+            (rng.choice(incident_ids), 'TA0001', 'Initial Access', rng.choice(['T1566', 'T1078', 'T1486']),
+             'name', rng.choice([None, '001']), None, rng.choice([0.3, 0.6, 0.9]), 'automated_keyword',
+             '2025-01-01')
+            for _ in range(150)
+        ])
+
+
+def baseline_slice(db_path, where='1', params=()):
+    """technique_id -> [mapping count, confidence sum] of the mappings of matching incidents"""
+    conn = connect(db_path)
+    counts = {}
+    for technique_id, confidence in conn.execute(f'''
+        SELECT m.technique_id, m.confidence FROM mitre_mappings m
+        JOIN incidents i ON i.incident_id = m.incident_id WHERE {where}
+    ''', params):
+        value = counts.setdefault(technique_id, [0, 0.0])
+        value[0] += 1
+        value[1] += confidence or 0
+    conn.close()
+    return counts
+
+
+def test_slices_match_filtered_mappings(db_path):
+    populate(db_path, seed=52)
+    weeks = [(date(2025, 3, 17) - timedelta(weeks=n)).isoformat() for n in range(5)]
+    slices = NavigatorLayers(db_path).slice_counts(read_connection(db_path), weeks)
+
+    expected = {'all': baseline_slice(db_path)}
+    for subsector in ('digital_banking', 'payments'):
+        expected[f'subsector/{subsector}'] = baseline_slice(db_path, 'i.subsector = ?', (subsector,))
+    for source_type in ('news', 'cve'):
+        expected[f'source/{source_type}'] = baseline_slice(db_path, 'i.source_type = ?', (source_type,))
+    for week in weeks:
+        end = (date.fromisoformat(week) + timedelta(days=7)).isoformat()
+        expected[f'week/{week}'] = baseline_slice(db_path, 'i.date_discovered >= ? AND i.date_discovered < ?',
+                                                  (week, end))
+    expected = {key: counts for key, counts in expected.items() if counts}
+
+    assert set(slices) == set(expected)
+    for key, counts in expected.items():
+        assert {technique_id: value[0] for technique_id, value in slices[key].items()} == \
+            {technique_id: value[0] for technique_id, value in counts.items()}, key
+        for technique_id, value in counts.items():
+            assert slices[key][technique_id][1] == pytest.approx(value[1])
+
+
+def test_only_changed_layers_are_rewritten(tmp_path, db_path):
+    populate(db_path, seed=53)
+    layers = NavigatorLayers(db_path, str(tmp_path / 'layers'))
+    first = layers.generate(weeks=4, today=TODAY)
+    assert 'all' in first['written'] and not first['unchanged']
+    assert layers.generate(weeks=4, today=TODAY)['written'] == []
+
+    with open(tmp_path / 'layers' / 'all.json') as f:
+        scores = {entry['techniqueID']: entry['comment'] for entry in json.load(f)['techniques']}
+    assert scores == {technique_id: f"Incidents: {count}, Avg Confidence: {confidence / count:.2f}"
+                      for technique_id, (count, confidence) in baseline_slice(db_path).items()}
+
+    # A mapping of a 'cve' incident in an old week: those slices change, others do not
+    conn = connect(db_path)
+    old_source, old_subsector = conn.execute(
+        "SELECT source_type, subsector FROM incidents WHERE incident_id = 'inc-0'").fetchone()
+    conn.close()
+    with write_connection(db_path) as conn:
+        conn.execute("UPDATE incidents SET source_type = 'cve', subsector = NULL, "
+                     "date_discovered = '2024-06-01 10:00:00' WHERE incident_id = 'inc-0'")
+        conn.execute(INSERT_MAPPING_SQL, ('inc-0', 'TA0001', 'Initial Access', 'T1110', 'Brute Force',
+                                          None, None, 0.5, 'otx', '2025-01-01'))
+    second = layers.generate(weeks=4, today=TODAY)
+    assert {'all', 'source/cve'} <= set(second['written'])
+    untouched = {'source/news', 'subsector/digital_banking', 'subsector/payments'} - {
+        f'source/{old_source}', f'subsector/{old_subsector}'}
+    assert untouched and untouched <= set(second['unchanged'])
+    assert all(os.path.exists(tmp_path / 'layers' / _file_name(key))
+               for key in second['written'] + second['unchanged'])
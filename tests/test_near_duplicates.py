@@ -0,0 +1,116 @@
+"""
+Near-duplicate back-fill against pairwise Jaccard similarity
+"""
+import random
+
+from src.classifiers.threat_classifier import ThreatClassifier
+from src.database import schema
+from src.database.connection import connect, write_connection
+from src.database.near_duplicates import (
+    BUCKET_TABLE, THRESHOLD, NearDuplicateIndex, backfill, jaccard, shingles
+)
+from src.database.schema import ThreatDatabase
+from tests.conftest import add_incidents
+from tests.test_daily_rollups import assert_rollups_match
+
+
+def stories(seed, groups=12, copies=3, singles=20):
+    """(title, description) of groups of reworded copies plus unrelated stories"""
+    rng = random.Random(seed)
+    vocabulary = [f'word{n}' for n in range(5000)]
+    texts = []
+    for _ in range(groups):
+        story = rng.sample(vocabulary, 30)
+        texts += [(' '.join(story[:6]), ' '.join(story[6:] + [f'reported{copy}']))
+                  for copy in range(copies)]
+    texts += [(' '.join(words[:6]), ' '.join(words[6:]))
+              for words in (rng.sample(vocabulary, 30) for _ in range(singles))]
+    rng.shuffle(texts)
+    return texts
+
+
+def expected_canonical(db_path):
+    """incident_id -> earliest discovered incident of its similarity cluster"""
+    conn = connect(db_path)
+    incidents = conn.execute('''
+        SELECT incident_id, title, description FROM incidents ORDER BY date_discovered, id
+    ''').fetchall()
+    conn.close()
+
+    canonical = {}
+    kept = []  # (incident_id, shingles) of canonical incidents, earliest first
+    for incident_id, title, description in incidents:
+        shingle_set = shingles(title, description)
+        match = next((kept_id for kept_id, kept_shingles in kept
+                      if jaccard(shingle_set, kept_shingles) >= THRESHOLD), None)
+        canonical[incident_id] = match
+        if match is None:
+            kept.append((incident_id, shingle_set))
+    return canonical
+
+
+def test_backfill_links_copies_to_the_earliest(db_path):
+    incident_ids = add_incidents(db_path, stories(seed=28))
+    # Discovery order differs from insertion order
+    rng = random.Random(29)
+    with write_connection(db_path) as conn:
+        conn.executemany('UPDATE incidents SET date_discovered = ? WHERE incident_id = ?', [
+            (f'2025-05-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00', incident_id)
+            for incident_id in incident_ids
+        ])
+        # The latest incident was indexed at ingest, before the back-fill
+        latest_rowid, title, description = conn.execute(
+            'SELECT id, title, description FROM incidents ORDER BY date_discovered DESC, id DESC'
+        ).fetchone()
+        index = NearDuplicateIndex(conn)
+        index.add(latest_rowid, index.match(title, description)[1])
+    ThreatClassifier(db_path).classify_batch()
+
+    expected = expected_canonical(db_path)
+    assert sum(1 for match in expected.values() if match) == 24
+
+    # Copies linked when their earlier copy took over are not scanned again
+    scanned, linked = backfill(db_path, chunk_size=7)
+    assert linked == 24
+    assert scanned <= len(incident_ids)
+
+    conn = connect(db_path)
+    assert dict(conn.execute('SELECT incident_id, canonical_incident_id FROM incidents')) == expected
+    # Only canonical incidents stay indexed and classified
+    canonical_rowids = {row[0] for row in conn.execute(
+        'SELECT id FROM incidents WHERE canonical_incident_id IS NULL')}
+    assert {row[0] for row in conn.execute(f'SELECT incident_rowid FROM {BUCKET_TABLE}')} == canonical_rowids
+    assert conn.execute('''
+        SELECT COUNT(*) FROM threat_classifications tc JOIN incidents i ON i.incident_id = tc.incident_id
+        WHERE i.canonical_incident_id IS NOT NULL
+    ''').fetchone()[0] == 0
+    conn.close()
+    assert_rollups_match(db_path)
+
+    # Resumes after the last incident checked
+    assert backfill(db_path) == (0, 0)
+
+
+def test_version_4_databases_upgrade(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'v4.db')
+    monkeypatch.setattr(schema, 'MIGRATIONS', schema.MIGRATIONS[:4])
+    ThreatDatabase(db_path).create_tables()
+    conn = connect(db_path)
+    assert schema.schema_version(conn) == 4
+    assert 'canonical_incident_id' not in {row[1] for row in conn.execute('PRAGMA table_info(incidents)')}
+    conn.close()
+    # Counted by the version 4 triggers
+    add_incidents(db_path, stories(seed=30, groups=4, singles=5))
+
+    monkeypatch.undo()
+    with write_connection(db_path) as conn:
+        schema.ensure_schema_upgrades(conn)
+        assert schema.schema_version(conn) == schema.SCHEMA_VERSION
+    assert_rollups_match(db_path)
+
+    backfill(db_path)
+    conn = connect(db_path)
+    assert dict(conn.execute('SELECT incident_id, canonical_incident_id FROM incidents')) == \
+        expected_canonical(db_path)
+    conn.close()
+    assert_rollups_match(db_path)
@@ -0,0 +1,56 @@
+"""
+Multi-process scoring against the single-process stages
+"""
+from src.classifiers.mitre_mapper import MITREMapper
+from src.classifiers.parallel import pending_id_ranges, run_parallel
+from src.classifiers.threat_classifier import ThreatClassifier
+from src.database.connection import connect
+from src.database.schema import ThreatDatabase
+from tests.conftest import add_incidents, make_texts
+from tests.test_batch_classification import classifications
+from tests.test_mitre_upsert import stored
+
+
+def databases(tmp_path, count, seed):
+    paths = []
+    for name in ('parallel', 'serial'):
+        path = str(tmp_path / f'{name}.db')
+        ThreatDatabase(path).create_tables()
+        add_incidents(path, make_texts(count, seed=seed))
+        paths.append(path)
+    return paths
+
+
+def test_pending_id_ranges_cover_every_incident(db_path):
+    add_incidents(db_path, make_texts(23, seed=36))
+    conn = connect(db_path)
+    conn.execute("DELETE FROM incidents WHERE id IN (4, 5, 6, 17)")
+    ranges = pending_id_ranges(conn, ThreatClassifier.PENDING_SQL, 2, workers=3, chunk_size=5)
+    per_range = [[row[0] for row in conn.execute('SELECT id FROM incidents WHERE id BETWEEN ? AND ?',
+                                                 (first, last))]
+                 for first, last in ranges]
+    assert sum(per_range, []) == [row[0] for row in conn.execute(
+        'SELECT id FROM incidents WHERE id > 2 ORDER BY id')]
+    assert max(len(ids) for ids in per_range) <= 5
+    conn.rollback()
+    conn.close()
+
+
+def test_parallel_classification_matches_serial(tmp_path):
+    parallel, serial = databases(tmp_path, 90, seed=37)
+    assert run_parallel('classify', parallel, workers=2, chunk_size=13) == 90
+    ThreatClassifier(serial).classify_batch()
+    assert classifications(parallel) == classifications(serial)
+
+    conn = connect(parallel)
+    assert conn.execute("SELECT last_incident_rowid FROM processing_watermarks "
+                        "WHERE stage = ?", (ThreatClassifier.STAGE,)).fetchone()[0] == 90
+    conn.close()
+    assert run_parallel('classify', parallel, workers=2) == 0
+
+
+def test_parallel_mapping_matches_serial(tmp_path):
+    parallel, serial = databases(tmp_path, 90, seed=38)
+    run_parallel('mitre', parallel, workers=2, chunk_size=13)
+    MITREMapper(serial).map_all_unmapped()
+    assert sorted(stored(parallel)) == sorted(stored(serial))
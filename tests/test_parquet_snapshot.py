@@ -0,0 +1,95 @@
+"""
+Incremental Parquet snapshots against a full snapshot of the same database
+"""
+import os
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from src.classifiers.enrichment_pipeline import EnrichmentPipeline
+from src.database.connection import connect, write_connection
+from src.reports.parquet_snapshot import SNAPSHOT_TABLES, ParquetSnapshot, read_snapshot
+from tests.conftest import add_incidents, make_texts
+
+
+def add_spread(db_path, count, start, seed):
+    """Incidents over several months and source types (some without one)"""
+    incident_ids = add_incidents(db_path, make_texts(count, seed=seed), start=start)
+    with write_connection(db_path) as conn:
+        conn.execute("UPDATE incidents SET source_type = CASE id % 3 WHEN 0 THEN 'cve' "
+                     "WHEN 1 THEN NULL ELSE source_type END WHERE id > ?", (start,))
+    return incident_ids
+
+
+def snapshot_tables(output_dir):
+    """table -> DataFrame sorted on every column, for the tables written"""
+    tables = {}
+    for table in SNAPSHOT_TABLES:
+        if not os.path.isdir(os.path.join(output_dir, table)):
+            continue
+        frame = read_snapshot(table, output_dir).astype(str)
+        tables[table] = frame.sort_values(sorted(frame.columns)).reset_index(drop=True)
+    return tables
+
+
+def assert_same_snapshot(incremental_dir, full_dir):
+    incremental, full = snapshot_tables(incremental_dir), snapshot_tables(full_dir)
+    assert set(incremental) == set(full)
+    for table, frame in full.items():
+        assert incremental[table][sorted(frame.columns)].equals(frame[sorted(frame.columns)]), table
+
+
+def test_incremental_matches_full_after_changes(tmp_path, db_path):
+    add_spread(db_path, 200, 0, seed=23)
+    EnrichmentPipeline(db_path).run()
+    incremental = ParquetSnapshot(db_path, str(tmp_path / 'incremental'))
+    incremental.snapshot()
+
+    add_spread(db_path, 60, 200, seed=24)
+    with write_connection(db_path) as conn:
+        conn.execute("UPDATE incidents SET severity = 'critical' WHERE id IN (3, 40, 77)")
+        conn.execute("UPDATE threat_classifications SET tech_category = 'changed' "
+                     "WHERE incident_id IN ('inc-5', 'inc-9')")
+        conn.execute("DELETE FROM mitre_mappings WHERE incident_id = 'inc-12'")
+        for table in ('threat_classifications', 'mitre_mappings', 'incidents'):
+            conn.execute(f"DELETE FROM {table} WHERE incident_id = 'inc-11'")
+        # Moves the incident to another month partition
+        conn.execute("UPDATE incidents SET date_discovered = '2024-12-01 00:00:00' WHERE id = 20")
+
+    # The new incidents wait for the enrichers; the changed partitions do not
+    incremental.snapshot()
+    full_dir = str(tmp_path / 'partial')
+    ParquetSnapshot(db_path, full_dir).snapshot(full=True)
+    assert_same_snapshot(str(tmp_path / 'incremental'), full_dir)
+    assert len(read_snapshot('incidents', full_dir)) == 199
+
+    EnrichmentPipeline(db_path).run()
+    incremental.snapshot()
+    full_dir = str(tmp_path / 'full')
+    ParquetSnapshot(db_path, full_dir).snapshot(full=True)
+    assert_same_snapshot(str(tmp_path / 'incremental'), full_dir)
+
+    # And the full snapshot is the database
+    conn = connect(db_path)
+    for table in ('incidents', 'threat_classifications', 'mitre_mappings'):
+        stored = {row[0] for row in conn.execute(f'SELECT incident_id FROM {table}')}
+        assert set(read_snapshot(table, full_dir)['incident_id']) == stored, table
+    severities = dict(conn.execute('SELECT incident_id, severity FROM incidents'))
+    conn.close()
+    written = read_snapshot('incidents', full_dir)
+    assert {incident_id: severity if isinstance(severity, str) else None
+            for incident_id, severity in zip(written['incident_id'], written['severity'])} == severities
+
+
+def test_unchanged_database_writes_nothing(tmp_path, db_path):
+    add_spread(db_path, 50, 0, seed=25)
+    EnrichmentPipeline(db_path).run()
+    output_dir = str(tmp_path / 'snapshot')
+    snapshot = ParquetSnapshot(db_path, output_dir)
+    snapshot.snapshot()
+    files = sorted(os.path.join(root, name) for root, _, names in os.walk(output_dir) for name in names)
+
+    snapshot.snapshot()
+    assert sorted(os.path.join(root, name)
+                  for root, _, names in os.walk(output_dir) for name in names) == files
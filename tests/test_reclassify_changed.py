@@ -0,0 +1,48 @@
+"""
+Cached reclassification against classifying the current texts from scratch
+"""
+import sqlite3
+
+from src.classifiers.threat_classifier import ThreatClassifier
+from src.database.connection import connect, write_connection
+from src.database.schema import ThreatDatabase
+from tests.conftest import add_incidents, make_texts
+from tests.test_batch_classification import classifications
+
+
+def test_only_stale_rows_are_recomputed(tmp_path, db_path):
+    add_incidents(db_path, make_texts(40, seed=8))
+    classifier = ThreatClassifier(db_path)
+    classifier.classify_batch()
+    assert classifier.reclassify_changed() == 0
+
+    edits = make_texts(6, seed=9)
+    with write_connection(db_path) as conn:
+        conn.executemany('UPDATE incidents SET title = ?, description = ? WHERE incident_id = ?',
+                         [(title, description, f'inc-{i}') for i, (title, description) in enumerate(edits)])
+        # Classified under an older taxonomy, or before fingerprints existed
+        conn.execute("UPDATE threat_classifications SET tech_taxonomy_hash = 'old' "
+                     "WHERE incident_id IN ('inc-10', 'inc-11')")
+        conn.execute("UPDATE threat_classifications SET procedural_taxonomy_hash = NULL, "
+                     "text_hash = NULL WHERE incident_id = 'inc-12'")
+        # Same text, different classification: left alone (not stale)
+        conn.execute("UPDATE threat_classifications SET tech_category = 'manual' "
+                     "WHERE incident_id = 'inc-20'")
+
+    assert classifier.reclassify_changed(chunk_size=7) == 9
+    assert classifier.reclassify_changed() == 0
+
+    # Baseline: the current texts classified into an empty database
+    fresh_path = str(tmp_path / 'fresh.db')
+    ThreatDatabase(fresh_path).create_tables()
+    conn = connect(db_path)
+    conn.row_factory = sqlite3.Row
+    texts = [(row['title'], row['description'])
+             for row in conn.execute('SELECT title, description FROM incidents ORDER BY id')]
+    conn.close()
+    add_incidents(fresh_path, texts)
+    ThreatClassifier(fresh_path).classify_batch()
+
+    untouched = [row for row in classifications(db_path) if row[0] != 'inc-20']
+    assert untouched == [row for row in classifications(fresh_path) if row[0] != 'inc-20']
+    assert [row[1] for row in classifications(db_path) if row[0] == 'inc-20'] == ['manual']
@@ -0,0 +1,113 @@
+"""
+Batched article saving against inserting articles one at a time
+"""
+from datetime import datetime
+import random
+import sqlite3
+
+import pytest
+
+from src.collectors.ingest import canonical_url
+from src.collectors.rss_collector import RSSCollector
+from src.database.connection import connect, write_connection
+from src.database.near_duplicates import BUCKET_TABLE
+from src.database.schema import ThreatDatabase
+from tests.conftest import make_texts
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://Example.com/a?utm_source=rss&id=2&b=1#top', 'https://example.com/a?b=1&id=2'),
+    ('HTTPS://example.com:443/a', 'https://example.com/a'),
+    ('http://example.com:8080', 'http://example.com:8080/'),
+    ('https://example.com/a?fbclid=x&gclid=y', 'https://example.com/a'),
+    ('https://example.com/a?q=', 'https://example.com/a?q='),
+    ('  ', ''),
+])
+def test_canonical_url(url, expected):
+    assert canonical_url(url) == expected
+
+
+def article(url, title, description):
+    return {'url': url, 'title': title, 'description': description,
+            'published': datetime(2025, 1, 1), 'body': description}
+
+
+def save_one_at_a_time(db_path, articles):
+    """The original loop: insert each article, skip it on a duplicate incident_id"""
+    collector = RSSCollector(db_path)
+    saved = 0
+    with write_connection(db_path) as conn:
+        for item in articles:
+            try:
+                conn.execute('''
+                    INSERT INTO incidents (incident_id, title, description, date_discovered,
+                                           source_url, source_type, status)
+                    VALUES (?, ?, ?, ?, ?, 'news', 'active')
+                ''', (collector._generate_incident_id(canonical_url(item['url'])), item['title'],
+                      item['description'], item['published'], canonical_url(item['url'])))
+                saved += 1
+            except sqlite3.IntegrityError:
+                continue
+    return saved
+
+
+def stored(db_path):
+    conn = connect(db_path)
+    rows = conn.execute('''
+        SELECT incident_id, title, description, source_url, source_type, canonical_incident_id
+        FROM incidents ORDER BY incident_id
+    ''').fetchall()
+    conn.close()
+    return rows
+
+
+def test_batches_match_one_at_a_time(tmp_path):
+    paths = [str(tmp_path / f'{name}.db') for name in ('batched', 'baseline')]
+    for path in paths:
+        ThreatDatabase(path).create_tables()
+
+    rng = random.Random(31)
+    texts = make_texts(60, seed=32, words=30)
+    pool = [article(f'https://news{i % 4}.example/story/{i}', *text) for i, text in enumerate(texts)]
+    for batch in range(5):
+        articles = rng.sample(pool, 25)
+        # Tracking variants and feeds repeating an article
+        articles += [dict(item, url=item['url'] + '?utm_source=feed') for item in articles[:5]]
+        articles += articles[5:8]
+        assert RSSCollector(paths[0]).save_to_database(articles) == save_one_at_a_time(paths[1], articles)
+        assert stored(paths[0]) == stored(paths[1])
+
+
+def test_ids_hashed_from_raw_urls_are_known(db_path):
+    collector = RSSCollector(db_path)
+    url = 'https://example.com/a?utm_medium=rss'
+    title, description = make_texts(1, seed=33, words=30)[0]
+    with write_connection(db_path) as conn:
+        conn.execute("INSERT INTO incidents (incident_id, title, date_discovered, source_type) "
+                     "VALUES (?, ?, '2024-01-01', 'news')", (collector._generate_incident_id(url), title))
+    assert collector.save_to_database([article(url, title, description)]) == 0
+
+
+def test_copies_are_linked_and_only_canonical_items_indexed(db_path):
+    story = ('ransomware gang hits major payment processor leaking card data of '
+             'millions of customers across europe')
+    collector = RSSCollector(db_path)
+    assert collector.save_to_database([
+        article('https://a.example/1', story, 'x'),
+        article('https://a.example/1?utm_source=x', story, 'x'),
+        article('https://b.example/2', story + ' today', 'x'),
+        article('https://c.example/3', 'bank merger announced by regulators in london city this week', 'y'),
+    ]) == 3
+    assert collector.save_to_database([
+        article('https://a.example/1', story, 'x'),
+        article('https://d.example/4', story + ' again', 'x'),
+    ]) == 1
+
+    conn = connect(db_path)
+    links = dict(conn.execute('SELECT source_url, canonical_incident_id FROM incidents'))
+    canonical = conn.execute("SELECT incident_id FROM incidents WHERE source_url = 'https://a.example/1'").fetchone()[0]
+    assert links == {'https://a.example/1': None, 'https://b.example/2': canonical,
+                     'https://c.example/3': None, 'https://d.example/4': canonical}
+    assert {row[0] for row in conn.execute(f'SELECT DISTINCT incident_rowid FROM {BUCKET_TABLE}')} == \
+        {row[0] for row in conn.execute('SELECT id FROM incidents WHERE canonical_incident_id IS NULL')}
+    conn.close()
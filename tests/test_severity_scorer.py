@@ -0,0 +1,76 @@
+"""
+Severity scoring against checking SEVERITY_RULES one rule at a time
+"""
+import random
+import re
+
+import pytest
+
+from config.taxonomy import SEVERITY_RULES
+from src.classifiers.keyword_matcher import incident_text
+from src.classifiers.severity_scorer import SeverityScorer
+from src.database.connection import connect, write_connection
+from tests.conftest import add_incidents, make_texts
+
+
+def has_word(text, keyword):
+    return re.search(rf'(?<!\w){re.escape(keyword)}(?!\w)', text) is not None
+
+
+def baseline_severity(text, cvss_score):
+    """Most severe rule with a keyword in the text or a CVSS minimum reached"""
+    keyword_level = next((level for level, rule in SEVERITY_RULES.items()
+                          if any(has_word(text, kw) for kw in rule['keywords'])), None)
+    cvss_level = None
+    if cvss_score is not None:
+        cvss_level = next((level for level, rule in SEVERITY_RULES.items()
+                           if cvss_score >= rule['cvss_min']), None)
+    levels = [level for level in (keyword_level, cvss_level) if level]
+    return min(levels, key=list(SEVERITY_RULES).index) if levels else None
+
+
+def test_score_text_matches_rules():
+    scorer = SeverityScorer()
+    rng = random.Random(41)
+    for title, description in make_texts(400, seed=42, words=6):
+        text = incident_text({'title': title, 'description': description})
+        cvss_score = rng.choice([None, 0.0, 0.1, 3.9, 4.0, 6.5, 7.0, 8.8, 9.0, 10.0])
+        assert scorer.score_text(text, cvss_score) == baseline_severity(text, cvss_score)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('open source banking sdk', None),
+    ('brute force login attempts', None),
+    ('commerce platform outage', None),
+    ('rce in open source banking sdk', 'critical'),
+    ('pre-auth rce, patch now', 'critical'),
+    ('source code leak after malware infection', 'high'),
+    ('malwares', None),
+    ('anti-phishing advisory', 'medium'),
+])
+def test_keywords_match_whole_words(text, expected):
+    assert SeverityScorer().score_text(text) == expected
+
+
+def test_backfill_only_fills_missing_severities(db_path):
+    add_incidents(db_path, make_texts(80, seed=43, words=6))
+    with write_connection(db_path) as conn:
+        conn.execute("UPDATE incidents SET severity = 'analyst' WHERE id % 4 = 0")
+        conn.execute("UPDATE incidents SET cvss_score = (id % 11) WHERE id % 3 = 0")
+    conn = connect(db_path)
+    expected = {
+        incident_id: severity or baseline_severity(
+            incident_text({'title': title, 'description': description}), cvss_score)
+        for incident_id, title, description, cvss_score, severity in conn.execute(
+            'SELECT incident_id, title, description, cvss_score, severity FROM incidents')
+    }
+    conn.close()
+
+    scorer = SeverityScorer(db_path)
+    assert scorer.backfill(chunk_size=9) == sum(
+        1 for incident_id, severity in expected.items() if severity and severity != 'analyst')
+    assert scorer.backfill() == 0
+
+    conn = connect(db_path)
+    assert dict(conn.execute('SELECT incident_id, severity FROM incidents')) == expected
+    conn.close()
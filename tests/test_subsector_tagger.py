@@ -0,0 +1,66 @@
+"""
+Subsector tagging against counting FINTECH_SUBSECTORS keywords per subsector
+"""
+import pytest
+
+from config.taxonomy import FINTECH_SUBSECTORS
+from src.classifiers.keyword_matcher import incident_text
+from src.classifiers.subsector_tagger import SubsectorTagger
+from src.database.connection import connect, write_connection
+from tests.conftest import add_incidents, make_texts
+from tests.test_severity_scorer import has_word
+
+
+def baseline_subsector(text):
+    """Most distinct keyword matches, then longest match, then FINTECH_SUBSECTORS order"""
+    best, best_key = None, None
+    for subsector, keywords in FINTECH_SUBSECTORS.items():
+        matched = [kw for kw in set(keywords) if has_word(text, kw)]
+        if not matched:
+            continue
+        key = (len(matched), max(len(kw) for kw in matched))
+        if best_key is None or key > best_key:
+            best, best_key = subsector, key
+    return best
+
+
+def test_tag_text_matches_keyword_counts():
+    tagger = SubsectorTagger()
+    for title, description in make_texts(400, seed=44, words=8):
+        text = incident_text({'title': title, 'description': description})
+        assert tagger.tag_text(text) == baseline_subsector(text)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('hackers define new attack', None),
+    ('compound interest on savings', None),
+    ('chimes and squares', None),
+    ('phishing page mimics a payments portal', None),
+    ('exploit drains compound finance pool', 'defi'),
+    ('defi protocol drained', 'defi'),
+    ('stripe, paypal and adyen outage', 'payment_processor'),
+])
+def test_keywords_match_whole_words(text, expected):
+    assert SubsectorTagger().tag_text(text) == expected
+
+
+def test_backfill_only_fills_missing_subsectors(db_path):
+    add_incidents(db_path, make_texts(80, seed=45, words=8))
+    with write_connection(db_path) as conn:
+        conn.execute("UPDATE incidents SET subsector = 'analyst' WHERE id % 4 = 0")
+    conn = connect(db_path)
+    expected = {
+        incident_id: subsector or baseline_subsector(
+            incident_text({'title': title, 'description': description}))
+        for incident_id, title, description, subsector in conn.execute(
+            'SELECT incident_id, title, description, subsector FROM incidents')
+    }
+    conn.close()
+
+    tagger = SubsectorTagger(db_path)
+    tagger.backfill(chunk_size=9)
+    assert tagger.backfill() == 0
+
+    conn = connect(db_path)
+    assert dict(conn.execute('SELECT incident_id, subsector FROM incidents')) == expected
+    conn.close()
@@ -0,0 +1,75 @@
+"""
+Sparse-matrix technique co-occurrence against counting incident sets
+"""
+from itertools import combinations
+import random
+
+import pytest
+
+pytest.importorskip('scipy')
+
+from src.analytics.technique_cooccurrence import TechniqueCooccurrence
+from src.classifiers.mitre_mapper import INSERT_MAPPING_SQL
+from src.database.connection import connect, write_connection
+from tests.conftest import add_incidents, make_texts
+
+TECHNIQUES = ['T1566', 'T1078', 'T1486', 'T1110', 'T1190', 'T1059']
+
+
+def baseline_pairs(db_path):
+    """(technique a, technique b) -> (together, incidents a, incidents b, lift), a < b"""
+    conn = connect(db_path)
+    incidents = {}
+    for technique_id, incident_id in conn.execute('SELECT technique_id, incident_id FROM mitre_mappings'):
+        incidents.setdefault(technique_id, set()).add(incident_id)
+    conn.close()
+    total = len(set().union(*incidents.values())) if incidents else 0
+
+    pairs = {}
+    for a, b in combinations(sorted(incidents), 2):
+        together = len(incidents[a] & incidents[b])
+        if together:
+            pairs[(a, b)] = (together, len(incidents[a]), len(incidents[b]),
+                             together * total / (len(incidents[a]) * len(incidents[b])))
+    return pairs
+
+
+def computed_pairs(db_path):
+    pairs = {}
+    for pair in TechniqueCooccurrence(db_path).pairs():
+        a, b, incidents_a, incidents_b = (pair['technique_a'], pair['technique_b'],
+                                          pair['incidents_a'], pair['incidents_b'])
+        if a > b:
+            a, b, incidents_a, incidents_b = b, a, incidents_b, incidents_a
+        assert pair['confidence_b_given_a'] == pytest.approx(pair['incidents_together'] / pair['incidents_a'])
+        pairs[(a, b)] = (pair['incidents_together'], incidents_a, incidents_b, pytest.approx(pair['lift']))
+    return pairs
+
+
+def add_mappings(db_path, incident_ids, count, rng):
+    with write_connection(db_path) as conn:
+        conn.executemany(INSERT_MAPPING_SQL, [
+            (rng.choice(incident_ids), 'TA0001', 'Initial Access', rng.choice(TECHNIQUES), 'name',
+             rng.choice([None, '001']), None, 0.5, 'automated_keyword', '2025-01-01')
+            for _ in range(count)
+        ])
+
+
+def test_pairs_match_incident_sets(db_path):
+    incident_ids = add_incidents(db_path, make_texts(40, seed=47))
+    rng = random.Random(48)
+    add_mappings(db_path, incident_ids, 90, rng)
+    assert computed_pairs(db_path) == baseline_pairs(db_path)
+
+    # Cached state extended with the new mappings
+    add_mappings(db_path, incident_ids, 30, rng)
+    assert computed_pairs(db_path) == baseline_pairs(db_path)
+
+    # Deletes rebuild it
+    with write_connection(db_path) as conn:
+        conn.execute("DELETE FROM mitre_mappings WHERE technique_id = 'T1566' OR incident_id = 'inc-3'")
+    assert computed_pairs(db_path) == baseline_pairs(db_path)
+
+    with write_connection(db_path) as conn:
+        conn.execute('DELETE FROM mitre_mappings')
+    assert TechniqueCooccurrence(db_path).pairs() == []
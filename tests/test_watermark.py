@@ -0,0 +1,47 @@
+"""
+Watermarked work lookups against the NOT IN scans they replaced
+"""
+from src.classifiers.threat_classifier import ThreatClassifier
+from src.database.connection import connect, write_connection
+from src.database.watermark import get_watermark, incident_ids_with_rows, set_watermark
+from tests.conftest import add_incidents, make_texts
+
+
+def test_watermark_never_moves_backwards(db_path):
+    conn = connect(db_path)
+    assert get_watermark(conn, 'stage') == 0
+    for value, expected in ((5, 5), (3, 5), (9, 9), (9, 9)):
+        set_watermark(conn, 'stage', value)
+        assert get_watermark(conn, 'stage') == expected
+    conn.rollback()
+    conn.close()
+
+
+def test_incident_ids_with_rows_past_the_variable_limit(db_path):
+    incident_ids = add_incidents(db_path, [('title', None)] * 2000)
+    conn = connect(db_path)
+    wanted = incident_ids[::2] + [f'missing-{i}' for i in range(500)]
+    assert incident_ids_with_rows(conn, 'incidents', wanted) == set(incident_ids[::2])
+    assert incident_ids_with_rows(conn, 'incidents', []) == set()
+    conn.close()
+
+
+def test_pending_incidents_match_not_in_scan(db_path):
+    add_incidents(db_path, make_texts(30, seed=50))
+    classifier = ThreatClassifier(db_path)
+    classifier.classify_batch()
+    add_incidents(db_path, make_texts(12, seed=51), start=30)
+    # Classified out of band: the NOT EXISTS guard skips it
+    with write_connection(db_path) as conn:
+        conn.execute("INSERT INTO threat_classifications (incident_id) VALUES ('inc-35')")
+
+    conn = connect(db_path)
+    pending = [row[0] for row in conn.execute(
+        classifier.PENDING_SQL + ' ORDER BY id', (get_watermark(conn, classifier.STAGE),))]
+    baseline = [row[0] for row in conn.execute('''
+        SELECT id FROM incidents
+        WHERE incident_id NOT IN (SELECT DISTINCT incident_id FROM threat_classifications)
+        ORDER BY id
+    ''')]
+    assert pending == baseline
+    conn.close()